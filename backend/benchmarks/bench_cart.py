@@ -0,0 +1,25 @@
+"""
+Benchmarks for resolving carts
+"""
+import pytest
+
+SUBTOTAL_QUERY = "query { cart { subtotalCents itemCount } }"
+CART_PAGE_QUERY = "query { cart { subtotalCents itemCount items { id quantity product { name priceCents } } } }"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("lines", [1, 10, 100])
+def test_cart_subtotal(benchmark, graphql, make_cart, lines):
+    """cart.subtotalCents at 1/10/100 lines"""
+    cart = make_cart(lines)
+    data = benchmark(graphql, SUBTOTAL_QUERY, cart.owner)
+    assert data["cart"]["subtotalCents"] == cart.subtotal_cents
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("lines", [1, 10, 100])
+def test_cart_page(benchmark, graphql, make_cart, lines):
+    """The cart page query with its lines at 1/10/100 lines"""
+    cart = make_cart(lines)
+    data = benchmark(graphql, CART_PAGE_QUERY, cart.owner)
+    assert len(data["cart"]["items"]) == lines
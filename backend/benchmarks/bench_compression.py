@@ -0,0 +1,63 @@
+"""
+Benchmarks for GraphQL responses through the full middleware stack
+
+Each main read operation is requested over the Django test client with no
+compression, gzip and brotli; the time per request includes compression,
+and ``extra_info`` records the bytes that would go on the wire.
+"""
+import json
+
+import pytest
+from graphql_jwt.shortcuts import get_token
+from shop.tests.factories import ProductFactory
+
+OPERATIONS = {
+    "products": "{ products { id name description priceCents imageUrl inventory weightGrams } }",
+    "orders": """
+        { orders { id status totalCents shippingCents createdAt shippingCity shippingCountry
+                   items { quantity priceCents productName } } }
+    """,
+    "adminOrders": """
+        { adminOrders { id status totalCents createdAt payerEmail shippingZone
+                        user { username } items { quantity priceCents product { name } } } }
+    """,
+}
+ORDER_COUNTS = {"products": 0, "orders": 50, "adminOrders": 1000}
+
+
+@pytest.fixture
+def request_operation(client, settings, staff_user, make_orders):
+    settings.RATELIMIT_ENABLE = False
+
+    def prepare(operation):
+        ProductFactory.create_batch(24)
+        orders = make_orders(ORDER_COUNTS[operation], customers=1) if ORDER_COUNTS[operation] else []
+        user = staff_user if operation == "adminOrders" else (orders[0].user if orders else staff_user)
+        body = json.dumps({"query": OPERATIONS[operation]})
+        auth = f"JWT {get_token(user)}"
+
+        def send(encoding):
+            response = client.post(
+                "/graphql/", body, content_type="application/json",
+                HTTP_AUTHORIZATION=auth, HTTP_ACCEPT_ENCODING=encoding,
+            )
+            assert response.status_code == 200
+            return response
+
+        return send
+
+    return prepare
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("encoding", ["identity", "gzip", "br"])
+@pytest.mark.parametrize("operation", list(OPERATIONS))
+def test_graphql_response(benchmark, request_operation, operation, encoding):
+    """One GraphQL read with the given Accept-Encoding"""
+    send = request_operation(operation)
+    rounds = 3 if operation == "adminOrders" else 20
+    response = benchmark.pedantic(send, args=(encoding,), rounds=rounds, warmup_rounds=1)
+
+    benchmark.extra_info["wire_bytes"] = len(response.content)
+    if encoding != "identity":
+        assert response["Content-Encoding"] == encoding
@@ -0,0 +1,45 @@
+"""
+Benchmarks for building and sending order emails (locmem backend)
+"""
+import pytest
+from shop.emails import (
+    build_shipment_notification,
+    send_admin_order_notification,
+    send_order_confirmation,
+    send_shipment_notifications,
+)
+from shop.models import Order
+from shop.tests.factories import OrderFactory, OrderItemFactory
+
+
+@pytest.fixture
+def placed_order():
+    order = OrderFactory()
+    OrderItemFactory.create_batch(5, order=order)
+    # Loaded the way send_order_placed_emails loads it, so only body building is timed
+    order = Order.objects.select_related("user").prefetch_related("items__product").get(pk=order.pk)
+    list(order.items.all())
+    return order
+
+
+@pytest.mark.django_db
+def test_order_confirmation(benchmark, placed_order, mailoutbox):
+    assert benchmark(send_order_confirmation, placed_order)
+
+
+@pytest.mark.django_db
+def test_admin_order_notification(benchmark, placed_order, mailoutbox):
+    assert benchmark(send_admin_order_notification, placed_order)
+
+
+@pytest.mark.django_db
+def test_build_shipment_notification(benchmark, placed_order):
+    message = benchmark(build_shipment_notification, placed_order)
+    assert str(placed_order.pk) in message.subject
+
+
+@pytest.mark.django_db
+def test_shipment_notification_batch(benchmark, make_orders, mailoutbox):
+    """One batched send for 100 shipped orders"""
+    order_ids = [order.pk for order in make_orders(100)]
+    assert benchmark(send_shipment_notifications, order_ids) == 100
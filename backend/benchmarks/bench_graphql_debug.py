@@ -0,0 +1,43 @@
+"""
+Benchmarks for the per-request cost of DjangoDebugMiddleware
+
+The same GraphQL reads are executed against the schema with the middleware
+of ``GRAPHQL_DEBUG="always"`` (every resolver wrapped and every SQL
+statement recorded) and of ``"staff"`` on a request that does not ask for
+capture (JWT middleware only), so the difference is what production saves
+per request. HTTP, JSON and view overhead are left out on purpose; they are
+the same either way and would hide the difference.
+"""
+import pytest
+from graphene_django.debug import DjangoDebugMiddleware
+from graphql_jwt.middleware import JSONWebTokenMiddleware
+from shop.tests.factories import ProductFactory
+
+OPERATIONS = {
+    "products": "{ products { id name description priceCents imageUrl inventory weightGrams } }",
+    "adminOrders": """
+        { adminOrders { id status totalCents createdAt payerEmail shippingZone
+                        user { username } items { quantity priceCents product { name } } } }
+    """,
+}
+MIDDLEWARE = {
+    "always": [DjangoDebugMiddleware, JSONWebTokenMiddleware],
+    "staff": [JSONWebTokenMiddleware],
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("mode", list(MIDDLEWARE))
+@pytest.mark.parametrize("operation", list(OPERATIONS))
+def test_graphql_debug_middleware(benchmark, graphql, staff_user, make_orders, operation, mode):
+    """One staff GraphQL read with debug capture always on vs opt-in (not requested)"""
+    ProductFactory.create_batch(24)
+    if operation == "adminOrders":
+        make_orders(1000)
+
+    def execute():
+        # Fresh middleware and context per run, as each HTTP request gets
+        return graphql(OPERATIONS[operation], staff_user, middleware=[m() for m in MIDDLEWARE[mode]])
+
+    rounds = 10 if operation == "adminOrders" else 50
+    benchmark.pedantic(execute, rounds=rounds, warmup_rounds=1)
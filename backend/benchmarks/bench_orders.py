@@ -0,0 +1,58 @@
+"""
+Benchmarks for order listings and checkout
+"""
+import pytest
+from shop.carts import recalculate_cart_totals
+from shop.models import CartItem
+
+ADMIN_ORDERS_QUERY = """
+    query {
+        adminOrders {
+            id status totalCents createdAt
+            user { username }
+            items { quantity priceCents product { name } }
+        }
+    }
+"""
+
+CHECKOUT_MUTATION = """
+    mutation {
+        checkout(
+            paymentReference: "EMT-BENCH"
+            payerEmail: "bench@example.com"
+            shippingAddress1: "1 Sugar Bush Rd"
+            shippingCity: "Thessalon"
+            shippingCountry: "CA"
+            shippingRegion: "ON"
+            shippingPostal: "P0R 1B0"
+        ) {
+            order { id totalCents }
+        }
+    }
+"""
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", [1_000, 10_000])
+def test_admin_orders(benchmark, graphql, make_orders, staff_user, count):
+    """adminOrders at 1k/10k orders with two items each"""
+    make_orders(count)
+    data = benchmark.pedantic(graphql, args=(ADMIN_ORDERS_QUERY, staff_user), rounds=3, iterations=1)
+    assert len(data["adminOrders"]) == count
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("lines", [1, 10])
+def test_checkout(benchmark, graphql, make_cart, lines):
+    """checkout of a 1/10-line cart (emails are deferred past the benchmark's transaction)"""
+    cart = make_cart(lines)
+    contents = list(cart.items.values_list("product_id", "quantity"))
+
+    def refill_cart():
+        CartItem.objects.bulk_create(CartItem(cart=cart, product_id=pk, quantity=qty) for pk, qty in contents)
+        recalculate_cart_totals(cart_ids=[cart.pk])
+        return (CHECKOUT_MUTATION, cart.owner), {}
+
+    cart.items.all().delete()
+    data = benchmark.pedantic(graphql, setup=refill_cart, rounds=20, iterations=1)
+    assert data["checkout"]["order"]["totalCents"] > 0
@@ -0,0 +1,41 @@
+"""
+Benchmarks for receipt downloads
+
+Receipts are rendered by pdf-service; the backend builds the request payload
+and streams the stored PDF back, which is what is measured here.
+"""
+import httpx
+import pytest
+from graphql_jwt.shortcuts import get_token
+from shop import receipts
+from shop.tests.factories import OrderFactory, OrderItemFactory
+
+PDF = b"%PDF-1.4 " + b"\0" * (48 * 1024)
+
+
+@pytest.fixture
+def order():
+    order = OrderFactory()
+    OrderItemFactory.create_batch(10, order=order)
+    return order
+
+
+@pytest.mark.django_db
+def test_receipt_payload(benchmark, order):
+    """Building the pdf-service payload for a 10-item order"""
+    payload = benchmark(receipts.build_receipt_request, order.pk, order.user)
+    assert len(payload["items"]) == 10
+
+
+@pytest.mark.django_db
+def test_download_receipt(benchmark, client, monkeypatch, order):
+    """download_receipt streaming a stored 48KB receipt through the backend"""
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=PDF))
+    monkeypatch.setattr(receipts, "_sync_client", lambda: httpx.Client(transport=transport))
+    headers = {"HTTP_AUTHORIZATION": f"JWT {get_token(order.user)}"}
+
+    def download():
+        response = client.get(f"/api/receipts/download/{order.pk}/", **headers)
+        return b"".join(response.streaming_content)
+
+    assert benchmark(download) == PDF
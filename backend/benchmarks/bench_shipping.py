@@ -0,0 +1,27 @@
+"""
+Benchmarks for shipping estimates
+"""
+import pytest
+from shop.shipping import DEFAULT_RATES, RateTable, estimate_shipping, get_rate_table
+
+DESTINATIONS = {
+    "local": ("CA", "ON", "P0R 1B0"),
+    "ontario": ("CA", "ON", "M5V 2T6"),
+    "canada": ("CA", "BC", "V6B 1A1"),
+    "international": ("GB", "", "SW1A 1AA"),
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("zone", DESTINATIONS)
+def test_estimate_shipping(benchmark, zone):
+    """estimate_shipping against a compiled rate table"""
+    country, region, postal = DESTINATIONS[zone]
+    get_rate_table()
+    benchmark(estimate_shipping, country, region, postal, 2000)
+
+
+def test_rate_table_lookup(benchmark):
+    """RateTable.lookup on already-normalized codes (the uncached trie walk)"""
+    table = RateTable(DEFAULT_RATES)
+    assert benchmark(table.lookup, "CA", "ON", "P0R1B0") == (499, "LOCAL_RADIUS")
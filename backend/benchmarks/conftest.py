@@ -0,0 +1,76 @@
+"""
+Shared fixtures for the micro-benchmarks
+"""
+import pytest
+from graphene.test import Client as GrapheneClient
+from shop.carts import recalculate_cart_totals
+from shop.models import Order, OrderItem
+from shop.tests.factories import (
+    CartFactory,
+    CartItemFactory,
+    OrderFactory,
+    OrderItemFactory,
+    ProductFactory,
+    StaffUserFactory,
+    UserFactory,
+)
+from syrupstore.schema import schema
+
+
+class MockContext:
+    """Mock request context for GraphQL benchmarks"""
+    def __init__(self, user=None):
+        self.user = user
+
+
+@pytest.fixture
+def graphql():
+    """Execute a query as ``user``, failing the benchmark on GraphQL errors"""
+    client = GrapheneClient(schema)
+
+    def execute(query, user=None, variables=None, middleware=None):
+        result = client.execute(
+            query, variables=variables, context_value=MockContext(user=user), middleware=middleware
+        )
+        assert "errors" not in result, result["errors"]
+        return result["data"]
+
+    return execute
+
+
+@pytest.fixture
+def staff_user():
+    return StaffUserFactory()
+
+
+@pytest.fixture
+def make_cart():
+    """A user's cart holding ``lines`` distinct products, totals up to date"""
+    def make(lines, user=None):
+        cart = CartFactory(owner=user or UserFactory())
+        for product in ProductFactory.create_batch(lines, inventory=10 ** 6):
+            CartItemFactory(cart=cart, product=product, quantity=2)
+        recalculate_cart_totals(cart_ids=[cart.pk])
+        cart.refresh_from_db()
+        return cart
+
+    return make
+
+
+@pytest.fixture
+def make_orders():
+    """``count`` orders with two items each, spread over a few customers"""
+    def make(count, customers=20):
+        users = UserFactory.create_batch(customers)
+        products = ProductFactory.create_batch(10)
+        orders = Order.objects.bulk_create(
+            OrderFactory.build(user=users[n % customers]) for n in range(count)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItemFactory.build(order=order, product=products[(order.pk + k) % len(products)])
+            for order in orders
+            for k in range(2)
+        )
+        return orders
+
+    return make
@@ -0,0 +1,31 @@
+#!/bin/bash
+# Micro-benchmarks for hot backend paths (pytest-benchmark).
+#
+#   ./benchmarks/run.sh                 # run and print timings
+#   ./benchmarks/run.sh baseline        # run and save as the new baseline
+#   ./benchmarks/run.sh compare         # compare with the latest baseline; fail on regressions
+#
+# Baselines are stored per machine in benchmarks/.benchmarks/. The compare
+# threshold defaults to a 20% slower median and can be set with
+# BENCHMARK_FAIL (pytest-benchmark --benchmark-compare-fail syntax).
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+cd "$SCRIPT_DIR" || exit 1
+
+MODE="${1:-run}"
+[ $# -gt 0 ] && shift
+
+case "$MODE" in
+    run)
+        pytest "$@"
+        ;;
+    baseline)
+        pytest --benchmark-save=baseline "$@"
+        ;;
+    compare)
+        pytest --benchmark-compare --benchmark-compare-fail="${BENCHMARK_FAIL:-median:20%}" "$@"
+        ;;
+    *)
+        echo "Usage: $0 [run|baseline|compare] [pytest args...]" >&2
+        exit 2
+        ;;
+esac
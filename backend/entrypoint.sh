@@ -2,6 +2,8 @@
 set -e
 
 python manage.py migrate --noinput
+# Table behind the "shared" cache when REDIS_URL is unset; a no-op otherwise
+python manage.py createcachetable
 python manage.py collectstatic --noinput
 
 if [ -n "$DJANGO_SUPERUSER_USERNAME" ] && [ -n "$DJANGO_SUPERUSER_EMAIL" ] && [ -n "$DJANGO_SUPERUSER_PASSWORD" ]; then
@@ -13,4 +15,8 @@ else
 	echo '⚠️  Superuser env vars not set; skipping.'
 fi
 
-exec gunicorn syrupstore.wsgi:application --bind 0.0.0.0:8000
+if [ "$SERVER_MODE" = "asgi" ]; then
+	exec uvicorn syrupstore.asgi:application --host 0.0.0.0 --port 8000 --workers "${WEB_CONCURRENCY:-1}"
+else
+	exec gunicorn syrupstore.wsgi:application --bind 0.0.0.0:8000
+fi
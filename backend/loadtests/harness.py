@@ -0,0 +1,124 @@
+"""
+Shared plumbing for the load-test scripts: throwaway databases, booting the
+backend under gunicorn or uvicorn, and latency summaries.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def run_manage(env, *args, **kwargs):
+    return subprocess.run(
+        [sys.executable, "manage.py", *args],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+        **kwargs,
+    )
+
+
+def run_setup_script(env, script):
+    """Run ``script`` in ``manage.py shell`` and parse the JSON it prints last."""
+    output = run_manage(env, "shell", "-c", script).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@contextmanager
+def backend_env(postgres=False, **overrides):
+    """
+    Environment for a migrated backend: a temporary SQLite file, or with
+    ``postgres`` the ``DB_*`` variables already set (point them at a scratch
+    database; it is migrated and written to).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "RATELIMIT_ENABLE": "false",
+            "DJANGO_DEBUG": "true",
+            "EMAIL_BACKEND": "django.core.mail.backends.dummy.EmailBackend",
+            **overrides,
+        }
+        if not postgres:
+            env["DB_ENGINE"] = "django.db.backends.sqlite3"
+            env["DB_NAME"] = str(Path(tmp) / "loadtest.sqlite3")
+        run_manage(env, "migrate", "--noinput")
+        yield env
+
+
+def server_command(mode, port, workers):
+    if mode == "wsgi":
+        return [
+            sys.executable, "-m", "gunicorn", "syrupstore.wsgi:application",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--timeout", "120",
+        ]
+    return [
+        sys.executable, "-m", "uvicorn", "syrupstore.asgi:application",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]
+
+
+@contextmanager
+def running_server(mode, workers, env):
+    """Boot the backend in ``mode`` (``wsgi`` or ``asgi``) and yield its base URL."""
+    port = free_port()
+    server = subprocess.Popen(
+        server_command(mode, port, workers),
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def latency_summary(latencies):
+    """p50/p95/p99 in milliseconds for latencies given in seconds."""
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None}
+    return {f"p{pct}": round(percentile(latencies, pct) * 1000, 1) for pct in (50, 95, 99)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
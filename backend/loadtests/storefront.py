@@ -0,0 +1,233 @@
+"""
+Measure how much storefront traffic one backend pod handles.
+
+Every virtual customer repeats a shopping session against a locally booted
+backend until ``--duration`` runs out::
+
+    products -> shippingEstimate -> addToCart x1-3 -> cart
+             -> checkout (for --checkout-ratio of sessions) -> orders
+
+The server runs with ``QUERY_COUNT_HEADER`` so each response reports its DB
+query count. One JSON report is printed (or written to ``--output``) with
+throughput, checkouts per second, overall and per-operation p50/p95/p99
+latency and per-operation query counts, tagged with the git revision so
+runs can be compared across commits::
+
+    cd backend
+    python loadtests/storefront.py --concurrency 20 --duration 60 --workers 4
+    python loadtests/storefront.py --postgres   # migrates and uses the DB_* database
+
+SQLite serialises writers, so concurrent checkouts there start failing with
+"database is locked" (reported under each operation's ``errors``); use
+``--postgres`` for checkout capacity. The load generator shares the machine
+with the server; on small hosts give the server most of the cores
+(``taskset``) so the client is not the limit.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from harness import backend_env, git_revision, latency_summary, run_setup_script, running_server
+
+PRODUCTS = "query { products { id name priceCents inventory } }"
+SHIPPING_ESTIMATE = """
+query($country: String!, $region: String!, $postal: String!, $weight: Int) {
+  shippingEstimate(country: $country, region: $region, postal: $postal, weightGrams: $weight) { cents zone }
+}
+"""
+ADD_TO_CART = """
+mutation($id: ID!, $quantity: Int) {
+  addToCart(productId: $id, quantity: $quantity) { cart { id itemCount subtotalCents } }
+}
+"""
+CART = "query { cart { id subtotalCents items { id quantity product { name priceCents } } } }"
+CHECKOUT = """
+mutation($ref: String!, $email: String!, $address: String!, $city: String!,
+         $country: String!, $region: String!, $postal: String!) {
+  checkout(paymentReference: $ref, payerEmail: $email, shippingAddress1: $address, shippingCity: $city,
+           shippingCountry: $country, shippingRegion: $region, shippingPostal: $postal) {
+    order { id totalCents shippingCents }
+  }
+}
+"""
+ORDERS = "query { orders { id status totalCents items { quantity product { name } } } }"
+
+# (country, region, postal, city) with rough customer shares
+DESTINATIONS = [
+    (("CA", "ON", "P0R 1B0", "Thessalon"), 30),
+    (("CA", "ON", "M5V 2T6", "Toronto"), 25),
+    (("CA", "QC", "H2X 1Y4", "Montreal"), 15),
+    (("CA", "BC", "V6B 1A1", "Vancouver"), 10),
+    (("US", "NY", "10001", "New York"), 12),
+    (("GB", "", "SW1A 1AA", "London"), 8),
+]
+
+SETUP_SCRIPT = """
+import json
+from django.contrib.auth import get_user_model
+from graphql_jwt.shortcuts import get_token
+from shop.models import Product
+User = get_user_model()
+users = []
+for n in range({customers}):
+    user = User(username=f"loadtest-{{n}}", email=f"loadtest-{{n}}@example.com")
+    user.set_unusable_password()
+    users.append(user)
+User.objects.bulk_create(users, ignore_conflicts=True)
+Product.objects.bulk_create(
+    Product(name=f"Maple Syrup Grade {{n}}", price_cents=1500 + 100 * n, inventory=10 ** 9,
+            weight_grams=1000 + 250 * (n % 4), is_active=True)
+    for n in range({products})
+)
+print(json.dumps({{
+    "tokens": [get_token(user) for user in User.objects.filter(username__startswith="loadtest-")],
+    "product_ids": list(Product.objects.filter(is_active=True).values_list("pk", flat=True)),
+}}))
+"""
+
+
+class Customer:
+    """One virtual customer replaying shopping sessions with its own JWT."""
+
+    def __init__(self, client, url, token, product_ids, rng, checkout_ratio, record):
+        self.client = client
+        self.url = url
+        self.headers = {"Authorization": f"JWT {token}"}
+        self.product_ids = product_ids
+        self.rng = rng
+        self.checkout_ratio = checkout_ratio
+        self.record = record
+
+    async def call(self, op, query, variables=None):
+        started = time.perf_counter()
+        error, queries = None, None
+        try:
+            response = await self.client.post(
+                self.url, json={"query": query, "variables": variables or {}}, headers=self.headers
+            )
+            queries = response.headers.get("X-DB-Queries")
+            errors = response.json().get("errors")
+            if errors:
+                error = errors[0].get("message", "GraphQL error")
+            elif response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+        except (httpx.HTTPError, ValueError) as e:
+            error = type(e).__name__
+        self.record(op, time.perf_counter() - started, error, int(queries) if queries else None)
+
+    async def session(self):
+        (country, region, postal, city), = self.rng.choices(
+            [d for d, _ in DESTINATIONS], weights=[w for _, w in DESTINATIONS]
+        )
+        await self.call("products", PRODUCTS)
+        await self.call("shippingEstimate", SHIPPING_ESTIMATE, {
+            "country": country, "region": region, "postal": postal, "weight": 1000 * self.rng.randint(1, 4),
+        })
+        for product_id in self.rng.sample(self.product_ids, self.rng.randint(1, min(3, len(self.product_ids)))):
+            await self.call("addToCart", ADD_TO_CART, {"id": product_id, "quantity": self.rng.randint(1, 3)})
+        await self.call("cart", CART)
+        if self.rng.random() < self.checkout_ratio:
+            await self.call("checkout", CHECKOUT, {
+                "ref": f"EMT-{self.rng.getrandbits(32):08x}",
+                "email": "loadtest@example.com",
+                "address": "1 Sugar Bush Rd",
+                "city": city,
+                "country": country,
+                "region": region,
+                "postal": postal,
+            })
+            await self.call("orders", ORDERS)
+
+
+async def drive(url, setup, args):
+    samples = defaultdict(list)
+
+    def record(op, latency, error, queries):
+        samples[op].append((latency, error, queries))
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + args.duration
+
+        async def run(index):
+            customer = Customer(
+                client, url, setup["tokens"][index], setup["product_ids"],
+                random.Random(args.seed + index), args.checkout_ratio, record,
+            )
+            while time.perf_counter() < deadline:
+                await customer.session()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    return samples, elapsed
+
+
+def build_report(samples, elapsed, args):
+    operations = {}
+    for op, rows in sorted(samples.items()):
+        queries = [q for _, _, q in rows if q is not None]
+        errors = Counter(error for _, error, _ in rows if error)
+        operations[op] = {
+            "count": len(rows),
+            "failures": sum(errors.values()),
+            "errors": dict(errors.most_common(3)),
+            "latency_ms": latency_summary([latency for latency, _, _ in rows]),
+            "db_queries": {
+                "mean": round(statistics.mean(queries), 1) if queries else None,
+                "max": max(queries) if queries else None,
+            },
+        }
+
+    everything = [row for rows in samples.values() for row in rows]
+    checkouts = sum(not error for _, error, _ in samples.get("checkout", ()))
+    return {
+        "revision": git_revision(),
+        "server": args.server,
+        "workers": args.workers,
+        "database": "postgres" if args.postgres else "sqlite",
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "elapsed_s": round(elapsed, 3),
+        "requests": len(everything),
+        "failures": sum(bool(error) for _, error, _ in everything),
+        "throughput_rps": round(len(everything) / elapsed, 1),
+        "checkouts_per_s": round(checkouts / elapsed, 2),
+        "latency_ms": latency_summary([latency for latency, _, _ in everything]),
+        "operations": operations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual customers shopping at once")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load for")
+    parser.add_argument("--checkout-ratio", type=float, default=0.3, help="Share of sessions that check out")
+    parser.add_argument("--products", type=int, default=12)
+    parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn/uvicorn worker processes")
+    parser.add_argument("--postgres", action="store_true", help="Use the DB_* database instead of a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    with backend_env(postgres=args.postgres, QUERY_COUNT_HEADER="true") as env:
+        setup = run_setup_script(env, SETUP_SCRIPT.format(customers=args.concurrency, products=args.products))
+        with running_server(args.server, args.workers, env) as base_url:
+            samples, elapsed = asyncio.run(drive(f"{base_url}/graphql/", setup, args))
+
+    report = json.dumps(build_report(samples, elapsed, args), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
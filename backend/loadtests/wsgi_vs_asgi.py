@@ -0,0 +1,141 @@
+"""
+Compare how many slow pdf-service calls one pod can keep in flight under
+WSGI (gunicorn sync workers) and ASGI (uvicorn + AsyncGraphQLView).
+
+The script builds a throwaway SQLite database with one customer and order,
+starts a fake pdf-service that answers ``/generate-receipt`` after
+``--pdf-latency`` seconds, then for each server mode boots the backend,
+fires ``--requests`` ``generateReceipt`` mutations with ``--concurrency``
+clients and prints one JSON report per mode::
+
+    cd backend
+    python loadtests/wsgi_vs_asgi.py --concurrency 200 --requests 1000 --pdf-latency 0.5
+
+With sync workers each in-flight call pins a whole worker, so throughput is
+capped at ``wsgi_workers / pdf_latency``; the ASGI worker awaits the calls
+and is bounded by the client concurrency instead.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+import httpx
+
+from harness import backend_env, free_port, latency_summary, run_setup_script, running_server
+
+MUTATION = "mutation($id: ID!) { generateReceipt(orderId: $id) { success message } }"
+
+SETUP_SCRIPT = """
+import json
+from django.contrib.auth import get_user_model
+from graphql_jwt.shortcuts import get_token
+from shop.models import Order
+user = get_user_model().objects.create_user("loadtest", "loadtest@example.com", "LoadTest!2024")
+order = Order.objects.create(user=user, total_cents=2799, shipping_cents=799, shipping_address1="1 Sugar Bush Rd")
+print(json.dumps({"order_id": order.pk, "token": get_token(user)}))
+"""
+
+
+def start_fake_pdf_service(port, latency):
+    """Serve ``POST /generate-receipt`` after ``latency`` seconds on a background event loop."""
+    body = json.dumps({"filename": "receipt.pdf"}).encode()
+
+    async def handle(reader, writer):
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in headers.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        await reader.readexactly(length)
+        await asyncio.sleep(latency)
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+        writer.close()
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=4096)
+        async with server:
+            await server.serve_forever()
+
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+
+
+async def drive(url, token, order_id, total, concurrency):
+    latencies = []
+    failures = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal failures
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    response = await client.post(
+                        url,
+                        json={"query": MUTATION, "variables": {"id": order_id}},
+                        headers={"Authorization": f"JWT {token}"},
+                    )
+                    ok = response.status_code == 200 and response.json()["data"]["generateReceipt"]["success"]
+                except (httpx.HTTPError, KeyError, TypeError, ValueError):
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                failures += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, failures, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--pdf-latency", type=float, default=0.5, help="Seconds the fake pdf-service takes")
+    parser.add_argument("--wsgi-workers", type=int, default=4, help="gunicorn sync workers per pod")
+    parser.add_argument("--asgi-workers", type=int, default=1, help="uvicorn workers per pod")
+    parser.add_argument("--modes", default="wsgi,asgi")
+    args = parser.parse_args()
+
+    pdf_port = free_port()
+    start_fake_pdf_service(pdf_port, args.pdf_latency)
+
+    with backend_env(PDF_SERVICE_URL=f"http://127.0.0.1:{pdf_port}") as env:
+        setup = run_setup_script(env, SETUP_SCRIPT)
+
+        for mode in args.modes.split(","):
+            workers = args.wsgi_workers if mode == "wsgi" else args.asgi_workers
+            with running_server(mode, workers, env) as base_url:
+                latencies, failures, elapsed = asyncio.run(
+                    drive(f"{base_url}/graphql/", setup["token"], setup["order_id"], args.requests, args.concurrency)
+                )
+
+            print(json.dumps({
+                "mode": mode,
+                "workers": workers,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "failures": failures,
+                "pdf_latency_s": args.pdf_latency,
+                "elapsed_s": round(elapsed, 3),
+                "throughput_rps": round(args.requests / elapsed, 1),
+                # Little's law: requests the pod actually kept in flight on average
+                "in_flight": round(args.requests / elapsed * statistics.mean(latencies), 1),
+                "latency_ms": latency_summary(latencies),
+            }))
+
+
+if __name__ == "__main__":
+    main()
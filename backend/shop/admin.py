@@ -1,5 +1,8 @@
-from django.contrib import admin
-from .models import Product, Cart, CartItem, Order, OrderItem
+from django.contrib import admin, messages
+from .models import Product, Cart, CartItem, Order, OrderItem, ShippingRate, ArchivedOrder, ArchivedOrderItem
+from .orders import CONFLICT, UPDATED, bulk_update_order_status
+from .paginators import EstimatedCountPaginator
+from .search import search_orders, search_products
 
 # Admin site customization for simplicity
 admin.site.site_header = "Maple Syrup Store Admin"
@@ -9,10 +12,15 @@ admin.site.index_title = "Manage Your Store"
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "price_cents", "inventory", "is_active")
+    list_display = ("id", "name", "price_cents", "inventory", "weight_grams", "is_active")
     search_fields = ("name",)
     list_filter = ("is_active",)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_products(search_term, queryset), False
+
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -49,9 +57,45 @@ class OrderAdmin(admin.ModelAdmin):
         "created_at",
     )
     list_filter = ("status", "created_at")
+    list_select_related = ("user",)
     search_fields = ("user__username", "payer_email", "payment_reference")
-    readonly_fields = ("created_at",)
+    readonly_fields = ("created_at", "shipping_summary")
+    ordering = ("-created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [OrderItemInline]
+    actions = ["mark_paid", "mark_shipped", "mark_delivered", "mark_cancelled"]
+
+    def _transition(self, request, queryset, status):
+        outcomes = bulk_update_order_status(queryset.values_list("pk", flat=True), status)
+        updated = sum(1 for outcome, _ in outcomes.values() if outcome == UPDATED)
+        conflicts = [str(pk) for pk, (outcome, _) in outcomes.items() if outcome == CONFLICT]
+        self.message_user(request, f"{updated} order(s) marked {status}.", messages.SUCCESS)
+        if conflicts:
+            self.message_user(
+                request,
+                f"Skipped orders changed by someone else: {', '.join(conflicts)}",
+                messages.WARNING,
+            )
+
+    @admin.action(description="Mark selected orders as Paid")
+    def mark_paid(self, request, queryset):
+        self._transition(request, queryset, "PAID")
+
+    @admin.action(description="Mark selected orders as Shipped")
+    def mark_shipped(self, request, queryset):
+        self._transition(request, queryset, "SHIPPED")
+
+    @admin.action(description="Mark selected orders as Delivered")
+    def mark_delivered(self, request, queryset):
+        self._transition(request, queryset, "DELIVERED")
+
+    @admin.action(description="Mark selected orders as Cancelled")
+    def mark_cancelled(self, request, queryset):
+        self._transition(request, queryset, "CANCELLED")
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_orders(search_term, queryset), False
     
     def display_total(self, obj):
         return f"${obj.total_cents / 100:.2f}"
@@ -62,18 +106,40 @@ class OrderAdmin(admin.ModelAdmin):
     display_shipping.short_description = "Shipping"
     
     def shipping_address(self, obj):
-        parts = []
-        if obj.shipping_address1:
-            parts.append(obj.shipping_address1)
-        if obj.shipping_address2:
-            parts.append(obj.shipping_address2)
-        if obj.shipping_city:
-            parts.append(obj.shipping_city)
-        if obj.shipping_region:
-            parts.append(obj.shipping_region)
-        if obj.shipping_country:
-            parts.append(obj.shipping_country)
-        if obj.shipping_postal:
-            parts.append(obj.shipping_postal)
-        return ", ".join(parts) if parts else "N/A"
+        return obj.shipping_summary or "N/A"
     shipping_address.short_description = "Ship To"
+
+
+@admin.register(ShippingRate)
+class ShippingRateAdmin(admin.ModelAdmin):
+    list_display = ("id", "zone", "country", "region", "postal_prefix", "min_weight_grams", "cents", "is_active")
+    list_filter = ("zone", "is_active")
+    list_editable = ("cents", "is_active")
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    fields = ("product_name", "quantity", "price_cents")
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Read-only view of orders moved out by ``manage.py archive_orders``."""
+
+    list_display = ("id", "user", "status", "total_cents", "payer_email", "created_at", "archived_at")
+    list_filter = ("status",)
+    list_select_related = ("user",)
+    search_fields = ("user__username", "payer_email", "payment_reference")
+    ordering = ("-created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
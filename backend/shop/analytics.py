@@ -0,0 +1,192 @@
+"""
+Daily sales rollups.
+
+``DailySalesRollup`` rows are adjusted in place whenever an order enters or
+leaves a counted status, so sales reports never aggregate ``Order`` or
+``OrderItem`` live. Orders are bucketed by the day they were placed (in
+``TIME_ZONE``), which makes the rollups fully derivable from the order
+tables (live and archived): ``rebuild_rollups`` recomputes any date range
+from scratch.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+from .models import ArchivedOrder, ArchivedOrderItem, DailySalesRollup, Order, OrderItem
+
+# Statuses whose orders count as sales
+COUNTED_STATUSES = frozenset({"PAID", "SHIPPED", "DELIVERED"})
+
+REBUILD_CHUNK_DAYS = 31
+
+_rollups_frozen = ContextVar("rollups_frozen", default=False)
+
+
+def is_counted(status) -> bool:
+    return status in COUNTED_STATUSES
+
+
+def rollups_frozen() -> bool:
+    return _rollups_frozen.get()
+
+
+@contextmanager
+def freeze_rollups():
+    """Leave rollups untouched by order deletes that are not lost sales (archival)."""
+    token = _rollups_frozen.set(True)
+    try:
+        yield
+    finally:
+        _rollups_frozen.reset(token)
+
+
+def _zone_totals(orders):
+    return (
+        orders.annotate(day=TruncDate("created_at"))
+        .values("day", "shipping_zone")
+        .annotate(
+            order_count=Count("pk"),
+            revenue=Sum("total_cents"),
+            shipping=Sum("shipping_cents"),
+        )
+        .order_by()
+    )
+
+
+def _product_totals(items):
+    return (
+        items.annotate(day=TruncDate("order__created_at"))
+        .values("day", "product_name")
+        .annotate(
+            unit_count=Sum("quantity"),
+            revenue=Sum(F("quantity") * F("price_cents")),
+        )
+        .order_by()
+    )
+
+
+def _add(totals, key, **values):
+    current = totals.setdefault(key, dict.fromkeys(("orders", "units", "revenue_cents", "shipping_cents"), 0))
+    for field, value in values.items():
+        current[field] += value or 0
+
+
+def _collect_totals(orders, items, totals=None):
+    """Aggregate orders/items into ``{(day, kind, key): {field: value}}``."""
+    totals = {} if totals is None else totals
+    for row in _zone_totals(orders):
+        _add(
+            totals,
+            (row["day"], DailySalesRollup.KIND_ZONE, row["shipping_zone"]),
+            orders=row["order_count"],
+            revenue_cents=row["revenue"],
+            shipping_cents=row["shipping"],
+        )
+    for row in _product_totals(items):
+        _add(
+            totals,
+            (row["day"], DailySalesRollup.KIND_PRODUCT, row["product_name"]),
+            units=row["unit_count"],
+            revenue_cents=row["revenue"],
+        )
+    return totals
+
+
+@transaction.atomic
+def apply_order_sales(order_ids, sign=1):
+    """
+    Add (``sign=1``) or remove (``sign=-1``) the given orders' sales.
+
+    Missing rollup rows are created empty first, then every affected row gets
+    one relative ``UPDATE ... SET x = x + delta``. Rows are touched in sorted
+    key order so concurrent adjustments lock them in a consistent order.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+    totals = _collect_totals(
+        Order.objects.filter(pk__in=order_ids),
+        OrderItem.objects.filter(order_id__in=order_ids),
+    )
+    if not totals:
+        return 0
+
+    DailySalesRollup.objects.bulk_create(
+        [DailySalesRollup(day=day, kind=kind, key=key) for day, kind, key in totals],
+        ignore_conflicts=True,
+    )
+    for (day, kind, key), values in sorted(totals.items()):
+        deltas = {field: F(field) + sign * value for field, value in values.items() if value}
+        if deltas:
+            DailySalesRollup.objects.filter(day=day, kind=kind, key=key).update(**deltas)
+    return len(totals)
+
+
+def record_status_change(order_ids, old_status, new_status):
+    """Adjust rollups for orders that moved from ``old_status`` to ``new_status``."""
+    was_counted, now_counted = is_counted(old_status), is_counted(new_status)
+    if was_counted == now_counted:
+        return 0
+    return apply_order_sales(order_ids, sign=1 if now_counted else -1)
+
+
+@transaction.atomic
+def rebuild_rollups(date_from, date_to):
+    """Recompute the rollups for ``date_from``..``date_to`` inclusive from the order tables."""
+    DailySalesRollup.objects.filter(day__gte=date_from, day__lte=date_to).delete()
+    totals = {}
+    for order_model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        orders = order_model.objects.filter(
+            status__in=COUNTED_STATUSES,
+            created_at__date__gte=date_from,
+            created_at__date__lte=date_to,
+        )
+        _collect_totals(orders, item_model.objects.filter(order__in=orders), totals)
+    DailySalesRollup.objects.bulk_create(
+        [
+            DailySalesRollup(day=day, kind=kind, key=key, **values)
+            for (day, kind, key), values in sorted(totals.items())
+        ]
+    )
+    return len(totals)
+
+
+def iter_date_chunks(date_from, date_to, days=REBUILD_CHUNK_DAYS):
+    """Yield inclusive ``(start, end)`` ranges of at most ``days`` days."""
+    start = date_from
+    while start <= date_to:
+        end = min(start + timedelta(days=days - 1), date_to)
+        yield start, end
+        start = end + timedelta(days=1)
+
+
+def sales_report(date_from, date_to):
+    """Summarize the rollups for ``date_from``..``date_to`` inclusive."""
+    rollups = DailySalesRollup.objects.filter(day__gte=date_from, day__lte=date_to)
+    zones = rollups.filter(kind=DailySalesRollup.KIND_ZONE)
+    products = rollups.filter(kind=DailySalesRollup.KIND_PRODUCT)
+    return {
+        "days": list(
+            zones.values("day")
+            .annotate(
+                order_count=Sum("orders"),
+                revenue=Sum("revenue_cents"),
+                shipping=Sum("shipping_cents"),
+            )
+            .order_by("day")
+        ),
+        "products": list(
+            products.values("key")
+            .annotate(unit_count=Sum("units"), revenue=Sum("revenue_cents"))
+            .order_by("-unit_count", "key")
+        ),
+        "zones": list(
+            zones.values("key")
+            .annotate(order_count=Sum("orders"), revenue=Sum("revenue_cents"))
+            .order_by("-order_count", "key")
+        ),
+    }
@@ -0,0 +1,91 @@
+"""
+Order archival.
+
+Orders that reached a final status (DELIVERED or CANCELLED) more than
+``settings.ORDER_ARCHIVE_AFTER_DAYS`` ago are moved into ``ArchivedOrder`` /
+``ArchivedOrderItem`` in batches, one transaction per batch, keeping their
+original ids. The live tables (and their indexes) then only carry recent and
+open orders. Archived rows are still counted by the sales rollups and are
+read back on demand for a customer's order history and receipts. Their status
+is final, so they never appear in the order status stream.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import freeze_rollups
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ARCHIVABLE_STATUSES = ("DELIVERED", "CANCELLED")
+ARCHIVE_BATCH_SIZE = 500
+
+_ORDER_FIELDS = [field.attname for field in ArchivedOrder._meta.concrete_fields if field.name != "archived_at"]
+_ITEM_FIELDS = [field.attname for field in ArchivedOrderItem._meta.concrete_fields]
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_orders(cutoff):
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+
+
+@transaction.atomic
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move up to ``batch_size`` archivable orders (oldest ids first) into the archive.
+
+    The selected rows are locked so a concurrent status change cannot slip
+    between the copy and the delete. Returns the number of orders archived.
+    """
+    ids = list(
+        archivable_orders(cutoff)
+        .select_for_update(skip_locked=True)
+        .order_by("pk")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+
+    ArchivedOrder.objects.bulk_create(
+        ArchivedOrder(**row) for row in Order.objects.filter(pk__in=ids).values(*_ORDER_FIELDS)
+    )
+    ArchivedOrderItem.objects.bulk_create(
+        ArchivedOrderItem(**row) for row in OrderItem.objects.filter(order_id__in=ids).values(*_ITEM_FIELDS)
+    )
+    # Archived sales still count, so the delete must not touch the rollups.
+    with freeze_rollups():
+        Order.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(cutoff, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None):
+    """Archive batches until none are left (or ``max_batches`` ran); yields each batch's size."""
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        archived = archive_batch(cutoff, batch_size)
+        if not archived:
+            return
+        batches += 1
+        yield archived
+
+
+def archived_order_history(user):
+    """A user's archived orders, newest first (slice it to paginate)."""
+    return ArchivedOrder.objects.filter(user=user).order_by("-created_at", "-pk")
+
+
+def get_order_or_archived(**lookup):
+    """``Order.objects.get(**lookup)``, falling back to the archive."""
+    try:
+        return Order.objects.get(**lookup)
+    except Order.DoesNotExist:
+        try:
+            return ArchivedOrder.objects.get(**lookup)
+        except ArchivedOrder.DoesNotExist:
+            raise Order.DoesNotExist("Order matching query does not exist.") from None
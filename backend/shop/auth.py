@@ -0,0 +1,92 @@
+"""
+JWT authentication with cached user lookups.
+
+``graphql_jwt`` resolves the token's user with a ``SELECT`` on every
+authenticated request (and again on every ``authenticate()`` call made while
+handling it). ``CachedJSONWebTokenBackend`` keeps the signature and expiry
+checks but memoizes the user on the request and, across requests, in the
+process's cache under ``(user_id, iat)`` for ``settings.JWT_USER_CACHE_TTL``
+seconds.
+
+Cached users are tagged with a per-user epoch that ``invalidate_cached_user``
+bumps whenever the user row changes (password, staff flags, deactivation).
+Epochs live in the ``shared`` cache, which every worker reads on each request,
+so those changes apply to the very next request whichever process serves it.
+"""
+import uuid
+from calendar import timegm
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from graphql_jwt import utils as jwt_utils
+from graphql_jwt.backends import JSONWebTokenBackend
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.utils import get_credentials, get_payload, get_user_by_payload
+
+USER_KEY = "jwt-user:{user_id}:{iat}"
+EPOCH_KEY = "jwt-user-epoch:{user_id}"
+USER_CACHE = "default"
+EPOCH_CACHE = "shared"
+
+# Request attribute holding the (token, user) resolved earlier in the request
+_REQUEST_MEMO = "_jwt_cached_user"
+
+
+def jwt_payload(user, context=None):
+    """``graphql_jwt``'s payload plus the user id and issue time the cache is keyed by."""
+    payload = jwt_utils.jwt_payload(user, context)
+    payload["userId"] = user.pk
+    payload.setdefault("origIat", timegm(datetime.utcnow().utctimetuple()))
+    return payload
+
+
+def invalidate_cached_user(user_id):
+    """Make every cached copy of this user stale."""
+    caches[EPOCH_CACHE].set(EPOCH_KEY.format(user_id=user_id), uuid.uuid4().hex, None)
+
+
+def _load_user(payload):
+    user_id, iat = payload.get("userId"), payload.get("origIat")
+    if user_id is None or iat is None:
+        # Issued before user ids were embedded: plain lookup by username.
+        return get_user_by_payload(payload)
+
+    user_key = USER_KEY.format(user_id=user_id, iat=iat)
+    epoch_key = EPOCH_KEY.format(user_id=user_id)
+    epoch = caches[EPOCH_CACHE].get(epoch_key)
+    cached = caches[USER_CACHE].get(user_key)
+    if cached is not None:
+        cached_epoch, user = cached
+        if cached_epoch == epoch and user.get_username() == jwt_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER(payload):
+            return user
+
+    user = get_user_by_payload(payload)
+    if user is not None and user.pk == user_id:
+        caches[USER_CACHE].set(user_key, (epoch, user), settings.JWT_USER_CACHE_TTL)
+    return user
+
+
+def user_from_token(token, request=None):
+    """Verify ``token`` and return its user; raises ``JSONWebTokenError`` if invalid."""
+    return _load_user(get_payload(token, request))
+
+
+class CachedJSONWebTokenBackend(JSONWebTokenBackend):
+    """``JSONWebTokenBackend`` with per-request and short-lived cross-request user caching."""
+
+    def authenticate(self, request=None, **kwargs):
+        if request is None or getattr(request, "_jwt_token_auth", False):
+            return None
+
+        token = get_credentials(request, **kwargs)
+        if token is None:
+            return None
+
+        memo = getattr(request, _REQUEST_MEMO, None)
+        if memo is not None and memo[0] == token:
+            return memo[1]
+
+        user = user_from_token(token, request)
+        setattr(request, _REQUEST_MEMO, (token, user))
+        return user
@@ -0,0 +1,63 @@
+"""
+Denormalized cart totals.
+
+``Cart.subtotal_cents`` and ``Cart.item_count`` are kept current by the cart
+mutations through ``apply_cart_delta`` (a single F() update), so reading a
+cart's totals never touches its items. Bulk line changes go through
+``upsert_cart_lines`` (one INSERT ... ON CONFLICT). Anything that changes totals behind
+the mutations' back -- product price changes, product deletion, bulk
+imports -- reconciles with ``recalculate_cart_totals``.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Cart, CartItem
+
+
+def apply_cart_delta(cart, subtotal_delta=0, item_delta=0):
+    """Adjust a cart's stored totals in place and refresh the instance."""
+    Cart.objects.filter(pk=cart.pk).update(
+        subtotal_cents=F("subtotal_cents") + subtotal_delta,
+        item_count=F("item_count") + item_delta,
+        updated_at=timezone.now(),
+    )
+    cart.refresh_from_db(fields=["subtotal_cents", "item_count", "updated_at"])
+
+
+def reset_cart_totals(cart):
+    Cart.objects.filter(pk=cart.pk).update(subtotal_cents=0, item_count=0, updated_at=timezone.now())
+    cart.refresh_from_db(fields=["subtotal_cents", "item_count", "updated_at"])
+
+
+def upsert_cart_lines(cart, quantities):
+    """Write ``{product_id: quantity}`` lines onto a cart with a single upsert."""
+    CartItem.objects.bulk_create(
+        [CartItem(cart=cart, product_id=product_id, quantity=qty) for product_id, qty in quantities.items()],
+        update_conflicts=True,
+        unique_fields=["cart", "product"],
+        update_fields=["quantity"],
+    )
+
+
+def recalculate_cart_totals(cart_ids=None, product_ids=None):
+    """
+    Recompute stored totals from cart items in one UPDATE.
+
+    Limit to ``cart_ids``, or to carts holding any of ``product_ids``; with
+    neither, every cart is reconciled. Returns the number of carts updated.
+    """
+    lines = CartItem.objects.filter(cart=OuterRef("pk")).values("cart")
+    subtotal = lines.annotate(total=Sum(F("quantity") * F("product__price_cents"))).values("total")
+    count = lines.annotate(total=Count("id")).values("total")
+
+    carts = Cart.objects.all()
+    if cart_ids is not None:
+        carts = carts.filter(pk__in=cart_ids)
+    if product_ids is not None:
+        carts = carts.filter(pk__in=CartItem.objects.filter(product_id__in=product_ids).values("cart_id"))
+    return carts.update(
+        subtotal_cents=Coalesce(Subquery(subtotal), Value(0)),
+        item_count=Coalesce(Subquery(count), Value(0)),
+        updated_at=timezone.now(),
+    )
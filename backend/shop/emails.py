@@ -1,8 +1,10 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection, send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+from .models import Order
+
 
 def send_order_confirmation(order):
     """Send order confirmation email to customer"""
@@ -140,8 +142,15 @@ View in admin: http://localhost:8000/admin/shop/order/{order.id}/change/
         return False
 
 
-def send_shipment_notification(order):
-    """Send shipment notification to customer"""
+def send_order_placed_emails(order_id):
+    """Send the customer confirmation and admin notification for a new order"""
+    order = Order.objects.select_related("user").prefetch_related("items__product").get(pk=order_id)
+    send_order_confirmation(order)
+    send_admin_order_notification(order)
+
+
+def build_shipment_notification(order):
+    """Build the shipment notification email for an order"""
     subject = f"Order #{order.id} Has Shipped - Maple Syrup Store"
     
     message = f"""
@@ -172,15 +181,32 @@ Thank you for your purchase!
 - Maple Syrup Store Team
     """
     
+    return EmailMessage(
+        subject,
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [order.user.email] if order.user.email else [order.payer_email],
+    )
+
+
+def send_shipment_notification(order):
+    """Send shipment notification to customer"""
     try:
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [order.user.email] if order.user.email else [order.payer_email],
-            fail_silently=False,
-        )
+        build_shipment_notification(order).send(fail_silently=False)
         return True
     except Exception as e:
         print(f"Failed to send shipment email: {e}")
         return False
+
+
+def send_shipment_notifications(order_ids):
+    """Send shipment notifications for many orders over a single SMTP connection"""
+    orders = Order.objects.select_related("user").filter(pk__in=order_ids)
+    messages = [build_shipment_notification(order) for order in orders]
+    if not messages:
+        return 0
+    try:
+        return get_connection(fail_silently=False).send_messages(messages)
+    except Exception as e:
+        print(f"Failed to send shipment emails: {e}")
+        return 0
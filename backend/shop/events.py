@@ -0,0 +1,182 @@
+"""
+Order status events behind the ``/api/orders/events/`` SSE stream.
+
+Status changes are published once their transaction commits. On PostgreSQL
+they go out with ``NOTIFY order_status`` so every backend process hears
+them; each process runs one ``LISTEN`` thread that hands notifications to
+the streams it is serving. Other databases (SQLite in development and
+tests) skip NOTIFY and deliver straight to subscribers in the same process.
+
+``EventSource`` cannot send headers, so the stream authenticates with a
+``?ticket=``: a signed, single-purpose token valid for
+``ORDER_EVENTS_TICKET_MAX_AGE`` seconds, never the long-lived JWT, which
+would end up in access logs.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "order_status"
+TICKET_SALT = "shop.order-stream"
+
+# Events buffered per stream before a slow client starts missing updates;
+# it catches up from the snapshot sent when it reconnects.
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Seconds between LISTEN connection health checks / reconnect attempts
+LISTEN_POLL_SECONDS = 5.0
+
+
+def issue_stream_ticket(user):
+    """A short-lived signed ticket opening ``user``'s order event stream."""
+    return signing.dumps({"user": user.pk}, salt=TICKET_SALT)
+
+
+def stream_ticket_user(ticket):
+    """The active user a stream ticket was issued to, or None if invalid or expired."""
+    try:
+        payload = signing.loads(ticket, salt=TICKET_SALT, max_age=settings.ORDER_EVENTS_TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=payload.get("user"), is_active=True).first()
+
+
+class _Broker:
+    """Per-process registry of open streams, keyed by user id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def add(self, user_id, loop, queue):
+        with self._lock:
+            self._subscribers[user_id].add((loop, queue))
+
+    def remove(self, user_id, loop, queue):
+        with self._lock:
+            streams = self._subscribers.get(user_id)
+            if streams is not None:
+                streams.discard((loop, queue))
+                if not streams:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(streams) for streams in self._subscribers.values())
+
+    def deliver(self, event):
+        """Hand ``event`` to the user's streams; safe to call from any thread."""
+        with self._lock:
+            streams = list(self._subscribers.get(event["user_id"], ()))
+        for loop, queue in streams:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Loop already closed; its stream unsubscribes on the way out.
+                pass
+
+
+def _offer(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        pass
+
+
+broker = _Broker()
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _uses_notify():
+    return connection.vendor == "postgresql"
+
+
+def publish_status_changes(changes):
+    """Announce ``(order_id, user_id, status)`` changes once the transaction commits."""
+    events = [{"id": order_id, "user_id": user_id, "status": status} for order_id, user_id, status in changes]
+    if events:
+        transaction.on_commit(lambda: _publish(events))
+
+
+def _publish(events):
+    if not _uses_notify():
+        for event in events:
+            broker.deliver(event)
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+            [CHANNEL, [json.dumps(event) for event in events]],
+        )
+
+
+def ensure_listener():
+    """Start this process's ``LISTEN`` thread if the database supports NOTIFY."""
+    global _listener
+    if not _uses_notify():
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen_forever, name="order-events", daemon=True)
+            _listener.start()
+
+
+def _listen_forever():
+    while True:
+        try:
+            _listen()
+        except Exception:
+            logger.exception("Order event listener failed; reconnecting")
+            time.sleep(LISTEN_POLL_SECONDS)
+
+
+def _listen():
+    # A dedicated connection: LISTEN is per session and must stay out of
+    # Django's request-scoped connection handling.
+    wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+    try:
+        wrapper.ensure_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        raw = wrapper.connection
+        while True:
+            if select.select([raw], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                continue
+            raw.poll()
+            while raw.notifies:
+                notify = raw.notifies.pop(0)
+                try:
+                    broker.deliver(json.loads(notify.payload))
+                except (ValueError, KeyError):
+                    logger.warning("Ignoring malformed order event %r", notify.payload)
+    finally:
+        wrapper.close()
+
+
+@asynccontextmanager
+async def subscribe(user_id):
+    """Queue of the user's order status events for as long as the block runs."""
+    ensure_listener()
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    broker.add(user_id, loop, queue)
+    try:
+        yield queue
+    finally:
+        broker.remove(user_id, loop, queue)
@@ -0,0 +1,116 @@
+"""
+Streaming order exports for bookkeeping.
+
+Orders are read with a server-side cursor (``QuerySet.iterator``) and turned
+into CSV or NDJSON one row at a time, so memory use stays flat no matter how
+many orders are exported. Shared by the staff export view and the
+``export_orders`` management command.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Order, OrderItem
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = ("csv", "ndjson")
+
+CSV_COLUMNS = [
+    "id",
+    "created_at",
+    "status",
+    "username",
+    "payer_email",
+    "payment_method",
+    "payment_reference",
+    "subtotal_cents",
+    "shipping_cents",
+    "total_cents",
+    "shipping_zone",
+    "ship_to",
+    "items",
+]
+
+
+class ExportError(ValueError):
+    """Raised for invalid export filters."""
+
+
+def _day_start(value, name):
+    try:
+        day = parse_date(value) if isinstance(value, str) else value
+    except ValueError:
+        day = None
+    if day is None:
+        raise ExportError(f"Invalid {name} date, expected YYYY-MM-DD")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(status=None, date_from=None, date_to=None):
+    """Orders to export, oldest first; ``date_to`` is inclusive."""
+    queryset = Order.objects.select_related("user").prefetch_related(
+        Prefetch("items", queryset=OrderItem.objects.only("order_id", "product_name", "quantity", "price_cents"))
+    )
+    if status:
+        if status not in {choice[0] for choice in Order.STATUS_CHOICES}:
+            raise ExportError("Invalid order status")
+        queryset = queryset.filter(status=status)
+    if date_from:
+        queryset = queryset.filter(created_at__gte=_day_start(date_from, "from"))
+    if date_to:
+        queryset = queryset.filter(created_at__lt=_day_start(date_to, "to") + timedelta(days=1))
+    return queryset.order_by("created_at", "id")
+
+
+def iter_order_records(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    for order in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            "id": order.id,
+            "created_at": order.created_at.isoformat(),
+            "status": order.status,
+            "username": order.user.username,
+            "payer_email": order.payer_email,
+            "payment_method": order.payment_method,
+            "payment_reference": order.payment_reference,
+            "subtotal_cents": order.total_cents - order.shipping_cents,
+            "shipping_cents": order.shipping_cents,
+            "total_cents": order.total_cents,
+            "shipping_zone": order.shipping_zone,
+            "ship_to": order.shipping_summary,
+            "items": [
+                {"name": item.product_name, "quantity": item.quantity, "price_cents": item.price_cents}
+                for item in order.items.all()
+            ],
+        }
+
+
+class _LineBuffer:
+    """File-like object whose write() hands back the written line."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(records):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in records:
+        record["items"] = "; ".join(f"{item['name']} x{item['quantity']}" for item in record["items"])
+        yield writer.writerow([record[column] for column in CSV_COLUMNS])
+
+
+def iter_ndjson(records):
+    for record in records:
+        yield json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def iter_export(fmt, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unsupported export format: {fmt}")
+    records = iter_order_records(queryset, chunk_size=chunk_size)
+    return iter_csv(records) if fmt == "csv" else iter_ndjson(records)
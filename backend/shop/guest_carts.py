@@ -0,0 +1,78 @@
+"""
+Guest carts for anonymous visitors.
+
+A guest cart is a ``{product_id: quantity}`` dict stored in the ``shared``
+cache (Redis or the database cache table, seen by every worker) under a
+random id, addressed by a signed token the client keeps and sends back. Guest
+carts never touch the cart tables; they expire after ``GUEST_CART_TTL``
+seconds without changes and are folded into the user's persistent ``Cart``
+with one bulk upsert when the visitor logs in or registers.
+"""
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import transaction
+
+from .carts import recalculate_cart_totals, upsert_cart_lines
+from .models import Cart, Product
+
+GUEST_CART_SALT = "shop.guest-cart"
+GUEST_CART_KEY_PREFIX = "guest-cart:"
+GUEST_CART_CACHE = "shared"
+
+
+def new_guest_cart_token() -> str:
+    return signing.dumps(uuid.uuid4().hex, salt=GUEST_CART_SALT)
+
+
+def _cache_key(token: str) -> str:
+    try:
+        cart_id = signing.loads(token, salt=GUEST_CART_SALT)
+    except signing.BadSignature:
+        raise Exception("Invalid guest cart token")
+    return f"{GUEST_CART_KEY_PREFIX}{cart_id}"
+
+
+def get_guest_cart_lines(token: str) -> dict[int, int]:
+    return caches[GUEST_CART_CACHE].get(_cache_key(token)) or {}
+
+
+def save_guest_cart_lines(token: str, lines: dict[int, int]) -> None:
+    key = _cache_key(token)
+    if lines:
+        caches[GUEST_CART_CACHE].set(key, lines, settings.GUEST_CART_TTL)
+    else:
+        caches[GUEST_CART_CACHE].delete(key)
+
+
+def clear_guest_cart(token: str) -> None:
+    caches[GUEST_CART_CACHE].delete(_cache_key(token))
+
+
+@transaction.atomic
+def merge_guest_cart(user, token: str):
+    """
+    Add a guest cart's lines onto ``user``'s cart and discard the guest cart.
+
+    Quantities for products already in the cart are summed. Inactive or
+    deleted products are dropped. Returns the cart, or ``None`` if the guest
+    cart was empty or expired.
+    """
+    lines = get_guest_cart_lines(token)
+    if not lines:
+        return None
+
+    active = set(Product.objects.filter(pk__in=lines, is_active=True).values_list("pk", flat=True))
+    lines = {product_id: qty for product_id, qty in lines.items() if product_id in active}
+    cart, _ = Cart.objects.get_or_create(owner=user)
+    if lines:
+        existing = dict(cart.items.filter(product_id__in=lines).values_list("product_id", "quantity"))
+        upsert_cart_lines(
+            cart,
+            {product_id: qty + existing.get(product_id, 0) for product_id, qty in lines.items()},
+        )
+        recalculate_cart_totals(cart_ids=[cart.pk])
+    clear_guest_cart(token)
+    return cart
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.archive import ARCHIVE_BATCH_SIZE, archivable_orders, archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move delivered/cancelled orders past the retention window into the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help=f"Archive orders placed more than this many days ago (default {settings.ORDER_ARCHIVE_AFTER_DAYS})",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+            help=f"Orders moved per transaction (default {ARCHIVE_BATCH_SIZE})",
+        )
+        parser.add_argument("--max-batches", type=int, help="Stop after this many batches")
+        parser.add_argument("--dry-run", action="store_true", help="Only count archivable orders")
+
+    def handle(self, *args, **options):
+        if options["days"] < 0:
+            raise CommandError("--days must not be negative")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        cutoff = archive_cutoff(options["days"])
+        if options["dry_run"]:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f"{count} orders placed before {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        total = 0
+        for archived in archive_orders(cutoff, options["batch_size"], options["max_batches"]):
+            total += archived
+            self.stdout.write(f"Archived {archived} orders ({total} so far)")
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} orders placed before {cutoff:%Y-%m-%d}"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, ExportError, export_queryset, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream orders as CSV or NDJSON for bookkeeping"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--status", help="Only orders with this status")
+        parser.add_argument("--from", dest="date_from", help="First day to include (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="date_to", help="Last day to include (YYYY-MM-DD)")
+        parser.add_argument("--output", "-o", help="Write to this file instead of stdout")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            queryset = export_queryset(
+                status=options["status"],
+                date_from=options["date_from"],
+                date_to=options["date_to"],
+            )
+            rows = iter_export(options["format"], queryset, chunk_size=options["chunk_size"])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if not options["output"]:
+            for row in rows:
+                self.stdout.write(row, ending="")
+            return
+
+        count = 0
+        with open(options["output"], "w", newline="", encoding="utf-8") as out:
+            for row in rows:
+                out.write(row)
+                count += 1
+        if options["format"] == "csv":
+            count -= 1  # header row
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} orders to {options['output']}"))
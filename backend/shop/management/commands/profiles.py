@@ -0,0 +1,67 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from syrupstore.profiling import collapsed_stacks, issue_token, load_profile, profile_ids
+
+
+class Command(BaseCommand):
+    help = "List and download staff request profiles, or issue an X-Profile-Token"
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest="action", required=True)
+        actions.add_parser("list", help="List the stored profiles, newest first")
+
+        get = actions.add_parser("get", help="Write one profile out")
+        get.add_argument("profile_id")
+        get.add_argument(
+            "--format",
+            choices=["speedscope", "collapsed"],
+            default="speedscope",
+            help="speedscope JSON (default) or collapsed stacks for flamegraph.pl",
+        )
+        get.add_argument("--output", "-o", help="Write to this file instead of stdout")
+
+        token = actions.add_parser("token", help="Issue a profiling token for a staff user")
+        token.add_argument("username")
+
+    def handle(self, *args, **options):
+        getattr(self, f"handle_{options['action']}")(options)
+
+    def handle_list(self, options):
+        ids = profile_ids()
+        if not ids:
+            self.stdout.write("No stored profiles")
+            return
+        for profile_id in reversed(ids):
+            profile = load_profile(profile_id)
+            if profile is None:  # trimmed while listing
+                continue
+            meta = profile["metadata"]
+            operations = ",".join(meta["operations"]) or "-"
+            self.stdout.write(
+                f"{profile_id}  {meta['method']} {meta['path']} {operations}  "
+                f"{meta['status']}  {meta['duration_ms']}ms  {meta['samples']} samples  {meta['user']}"
+            )
+
+    def handle_get(self, options):
+        profile = load_profile(options["profile_id"])
+        if profile is None:
+            raise CommandError(f"No stored profile {options['profile_id']}")
+        content = collapsed_stacks(profile) if options["format"] == "collapsed" else json.dumps(profile)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(content)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(content, ending="" if content.endswith("\n") else "\n")
+
+    def handle_token(self, options):
+        user = get_user_model().objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"No user {options['username']}")
+        try:
+            self.stdout.write(issue_token(user))
+        except ValueError as e:
+            raise CommandError(str(e))
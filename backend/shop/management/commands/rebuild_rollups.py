@@ -0,0 +1,49 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from shop.analytics import REBUILD_CHUNK_DAYS, iter_date_chunks, rebuild_rollups
+from shop.models import ArchivedOrder, Order
+
+
+class Command(BaseCommand):
+    help = "Recompute daily sales rollups from live and archived orders, one date range per transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last day (YYYY-MM-DD)")
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=REBUILD_CHUNK_DAYS,
+            help=f"Days rebuilt per transaction (default {REBUILD_CHUNK_DAYS})",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_days"] < 1:
+            raise CommandError("--chunk-days must be at least 1")
+
+        date_from, date_to = options["date_from"], options["date_to"]
+        if date_from is None or date_to is None:
+            # Archived orders keep their sales in the rollups too
+            bounds = [
+                model.objects.aggregate(first=Min("created_at"), last=Max("created_at"))
+                for model in (Order, ArchivedOrder)
+            ]
+            firsts = [b["first"] for b in bounds if b["first"] is not None]
+            if not firsts:
+                self.stdout.write("No orders to roll up")
+                return
+            date_from = date_from or timezone.localdate(min(firsts))
+            date_to = date_to or timezone.localdate(max(b["last"] for b in bounds if b["last"] is not None))
+        if date_to < date_from:
+            raise CommandError("--to must not be before --from")
+
+        rows = 0
+        for start, end in iter_date_chunks(date_from, date_to, options["chunk_days"]):
+            written = rebuild_rollups(start, end)
+            rows += written
+            self.stdout.write(f"{start}..{end}: {written} rollup rows")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup rows for {date_from}..{date_to}"))
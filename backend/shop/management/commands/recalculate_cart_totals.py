@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from shop.carts import recalculate_cart_totals
+
+
+class Command(BaseCommand):
+    help = "Reconcile denormalized cart subtotals and item counts with cart items"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--product",
+            type=int,
+            action="append",
+            dest="product_ids",
+            help="Only carts holding this product id (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        updated = recalculate_cart_totals(product_ids=options["product_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Recalculated totals for {updated} carts"))
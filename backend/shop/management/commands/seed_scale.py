@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from shop.analytics import iter_date_chunks, rebuild_rollups
+from shop.models import Order
+from shop.seeding import SEED_BATCH_SIZE, SEED_PASSWORD, ScaleSeeder
+
+
+class Command(BaseCommand):
+    help = "Generate a large synthetic data set (users, carts, orders, order items) for performance work"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000, help="Customers to create (default 100000)")
+        parser.add_argument("--orders", type=int, default=1_000_000, help="Orders to create (default 1000000)")
+        parser.add_argument("--products", type=int, default=24, help="Catalogue products to create (default 24)")
+        parser.add_argument(
+            "--cart-ratio", type=float, default=0.1, help="Share of new customers with an open cart (default 0.1)"
+        )
+        parser.add_argument("--days", type=int, default=730, help="Spread orders over this many days (default 730)")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed yields the same data")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=SEED_BATCH_SIZE,
+            help=f"Rows written per statement and orders per transaction (default {SEED_BATCH_SIZE})",
+        )
+        parser.add_argument("--copy", action="store_true", help="Load with COPY instead of INSERT (PostgreSQL only)")
+        parser.add_argument("--skip-rollups", action="store_true", help="Do not rebuild daily sales rollups afterwards")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["products"] < 1:
+            raise CommandError("--users and --products must be at least 1")
+        if options["orders"] < 0:
+            raise CommandError("--orders must not be negative")
+        if not 0 <= options["cart_ratio"] <= 1:
+            raise CommandError("--cart-ratio must be between 0 and 1")
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        seeder = ScaleSeeder(
+            users=options["users"],
+            orders=options["orders"],
+            products=options["products"],
+            cart_ratio=options["cart_ratio"],
+            days=options["days"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            use_copy=options["copy"],
+            log=self.stdout.write,
+        )
+        started = time.monotonic()
+        try:
+            counts = seeder.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            "Created " + ", ".join(f"{count} {label}" for label, count in counts.items())
+            + f" in {time.monotonic() - started:.1f}s (password for every user: {SEED_PASSWORD})"
+        ))
+
+        if options["skip_rollups"] or not counts["orders"]:
+            return
+        # bulk_create and COPY skip the signals that keep rollups current.
+        bounds = Order.objects.aggregate(first=Min("created_at"), last=Max("created_at"))
+        date_from, date_to = timezone.localdate(bounds["first"]), timezone.localdate(bounds["last"])
+        rows = sum(rebuild_rollups(start, end) for start, end in iter_date_chunks(date_from, date_to))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup rows for {date_from}..{date_to}"))
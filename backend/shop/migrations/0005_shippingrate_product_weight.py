@@ -0,0 +1,62 @@
+from django.db import migrations, models
+
+
+DEFAULT_RATES = [
+    {"zone": "INTERNATIONAL", "country": "", "region": "", "postal_prefix": "", "cents": 2999},
+    {"zone": "CANADA", "country": "CA", "region": "", "postal_prefix": "", "cents": 1299},
+    {"zone": "ONTARIO", "country": "CA", "region": "ON", "postal_prefix": "", "cents": 799},
+    {"zone": "LOCAL_RADIUS", "country": "CA", "region": "ON", "postal_prefix": "P0R", "cents": 499},
+]
+
+
+def seed_default_rates(apps, schema_editor):
+    ShippingRate = apps.get_model("shop", "ShippingRate")
+    if not ShippingRate.objects.exists():
+        ShippingRate.objects.bulk_create(ShippingRate(**rate) for rate in DEFAULT_RATES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0004_normalize_orderitem_product_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShippingRate",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("zone", models.CharField(max_length=32)),
+                ("country", models.CharField(blank=True, max_length=64)),
+                ("region", models.CharField(blank=True, max_length=64)),
+                ("postal_prefix", models.CharField(blank=True, max_length=16)),
+                ("min_weight_grams", models.PositiveIntegerField(default=0)),
+                ("cents", models.PositiveIntegerField()),
+                ("is_active", models.BooleanField(default=True)),
+            ],
+            options={
+                "ordering": ("country", "region", "postal_prefix", "min_weight_grams"),
+            },
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="weight_grams",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING_PAYMENT", "Pending Payment"),
+                    ("PAID", "Paid"),
+                    ("SHIPPED", "Shipped"),
+                    ("DELIVERED", "Delivered"),
+                    ("CANCELLED", "Cancelled"),
+                ],
+                default="PENDING_PAYMENT",
+                max_length=32,
+            ),
+        ),
+        migrations.RunPython(seed_default_rates, migrations.RunPython.noop),
+    ]
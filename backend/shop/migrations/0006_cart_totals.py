@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model("shop", "Cart")
+    CartItem = apps.get_model("shop", "CartItem")
+    lines = CartItem.objects.filter(cart=OuterRef("pk")).values("cart")
+    Cart.objects.update(
+        subtotal_cents=Coalesce(
+            Subquery(lines.annotate(total=Sum(F("quantity") * F("product__price_cents"))).values("total")),
+            Value(0),
+        ),
+        item_count=Coalesce(Subquery(lines.annotate(total=Count("id")).values("total")), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0005_shippingrate_product_weight"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="item_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="subtotal_cents",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+SHIPPING_FIELDS = [
+    "shipping_address1",
+    "shipping_address2",
+    "shipping_city",
+    "shipping_region",
+    "shipping_country",
+    "shipping_postal",
+]
+
+
+def backfill_shipping_summary(apps, schema_editor):
+    Order = apps.get_model("shop", "Order")
+    batch = []
+    for order in Order.objects.only("id", *SHIPPING_FIELDS).iterator(chunk_size=2000):
+        order.shipping_summary = ", ".join(filter(None, [getattr(order, f) for f in SHIPPING_FIELDS]))
+        batch.append(order)
+        if len(batch) >= 2000:
+            Order.objects.bulk_update(batch, ["shipping_summary"])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ["shipping_summary"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0006_cart_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="shipping_summary",
+            field=models.CharField(blank=True, max_length=700),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["-created_at"], name="order_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["status", "-created_at"], name="order_status_created_idx"),
+        ),
+        migrations.RunPython(backfill_shipping_summary, migrations.RunPython.noop),
+    ]
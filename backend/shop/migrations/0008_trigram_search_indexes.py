@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# (index name, model label, column); the user table belongs to auth but its
+# username is searched from the order admin, so it is indexed here too.
+TRIGRAM_INDEXES = [
+    ("shop_product_name_trgm", "shop.Product", "name"),
+    ("shop_order_payer_email_trgm", "shop.Order", "payer_email"),
+    ("shop_order_payment_ref_trgm", "shop.Order", "payment_reference"),
+    ("shop_user_username_trgm", settings.AUTH_USER_MODEL, "username"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, label, column in TRIGRAM_INDEXES:
+        table = apps.get_model(label)._meta.db_table
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {schema_editor.quote_name(table)} "
+            f"USING gin ({schema_editor.quote_name(column)} gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("shop", "0007_order_shipping_summary"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('kind', models.CharField(choices=[('ZONE', 'Shipping zone'), ('PRODUCT', 'Product')], max_length=16)),
+                ('key', models.CharField(blank=True, max_length=200)),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue_cents', models.BigIntegerField(default=0)),
+                ('shipping_cents', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('day', 'kind', 'key'),
+                'unique_together': {('day', 'kind', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_daily_sales_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('total_cents', models.PositiveIntegerField(default=0)),
+                ('shipping_cents', models.PositiveIntegerField(default=0)),
+                ('shipping_zone', models.CharField(blank=True, max_length=32)),
+                ('shipping_address1', models.CharField(blank=True, max_length=200)),
+                ('shipping_address2', models.CharField(blank=True, max_length=200)),
+                ('shipping_city', models.CharField(blank=True, max_length=100)),
+                ('shipping_country', models.CharField(blank=True, max_length=64)),
+                ('shipping_region', models.CharField(blank=True, max_length=64)),
+                ('shipping_postal', models.CharField(blank=True, max_length=32)),
+                ('shipping_summary', models.CharField(blank=True, max_length=700)),
+                ('status', models.CharField(choices=[('PENDING_PAYMENT', 'Pending Payment'), ('PAID', 'Paid'), ('SHIPPED', 'Shipped'), ('DELIVERED', 'Delivered'), ('CANCELLED', 'Cancelled')], max_length=32)),
+                ('payment_method', models.CharField(choices=[('EMT', 'Email Money Transfer')], default='EMT', max_length=16)),
+                ('payment_reference', models.CharField(blank=True, max_length=120)),
+                ('payer_email', models.EmailField(blank=True, max_length=254)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('product_name', models.CharField(blank=True, max_length=200)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('price_cents', models.PositiveIntegerField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='shop.archivedorder')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shop.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', '-created_at'], name='archivedorder_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# PostgreSQL compiles ``__icontains`` to ``UPPER(col::text) LIKE UPPER(%s)``,
+# which the plain column indexes of 0008 cannot serve. Index that expression
+# instead; the product name keeps its plain index for trigram similarity.
+# (index name, model label, column)
+UPPER_TRIGRAM_INDEXES = [
+    ("shop_product_name_upper_trgm", "shop.Product", "name"),
+    ("shop_order_payer_email_upper_trgm", "shop.Order", "payer_email"),
+    ("shop_order_payment_ref_upper_trgm", "shop.Order", "payment_reference"),
+    ("shop_user_username_upper_trgm", settings.AUTH_USER_MODEL, "username"),
+]
+# Plain-column indexes of 0008 that nothing queries any more
+REPLACED_INDEXES = [
+    ("shop_order_payer_email_trgm", "shop.Order", "payer_email"),
+    ("shop_order_payment_ref_trgm", "shop.Order", "payment_reference"),
+    ("shop_user_username_trgm", settings.AUTH_USER_MODEL, "username"),
+]
+
+
+def _create(apps, schema_editor, indexes, expression):
+    for name, label, column in indexes:
+        table = apps.get_model(label)._meta.db_table
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {schema_editor.quote_name(table)} "
+            f"USING gin ({expression.format(schema_editor.quote_name(column))} gin_trgm_ops)"
+        )
+
+
+def _drop(schema_editor, indexes):
+    for name, _, _ in indexes:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def create_upper_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    _create(apps, schema_editor, UPPER_TRIGRAM_INDEXES, "(UPPER({}::text))")
+    _drop(schema_editor, REPLACED_INDEXES)
+
+
+def restore_plain_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    _create(apps, schema_editor, REPLACED_INDEXES, "{}")
+    _drop(schema_editor, UPPER_TRIGRAM_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("shop", "0010_order_archive"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_indexes, restore_plain_indexes),
+    ]
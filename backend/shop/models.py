@@ -11,6 +11,15 @@ class Product(models.Model):
     image_url = models.URLField(blank=True)
     is_active = models.BooleanField(default=True)
     inventory = models.PositiveIntegerField(default=0)
+    weight_grams = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored price so a save can tell whether carts holding
+        # this product need their subtotals reconciled.
+        instance._loaded_price_cents = instance.__dict__.get("price_cents")
+        return instance
 
     def __str__(self):
         return self.name
@@ -18,6 +27,8 @@ class Product(models.Model):
 
 class Cart(models.Model):
     owner = models.OneToOneField(User, on_delete=models.CASCADE, related_name="cart")
+    subtotal_cents = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
@@ -59,15 +70,48 @@ class Order(models.Model):
     shipping_country = models.CharField(max_length=64, blank=True)
     shipping_region = models.CharField(max_length=64, blank=True)
     shipping_postal = models.CharField(max_length=32, blank=True)
+    # Denormalized one-line ship-to address for list views; kept in sync by save()
+    shipping_summary = models.CharField(max_length=700, blank=True)
     status = models.CharField(max_length=32, choices=STATUS_CHOICES, default="PENDING_PAYMENT")
     payment_method = models.CharField(max_length=16, choices=PAYMENT_METHOD_CHOICES, default="EMT")
     payment_reference = models.CharField(max_length=120, blank=True)
     payer_email = models.EmailField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="order_created_idx"),
+            models.Index(fields=["status", "-created_at"], name="order_status_created_idx"),
+        ]
+
     def __str__(self):
         return f"Order({self.id})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so a save can tell whether sales rollups
+        # need adjusting.
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def build_shipping_summary(self):
+        return ", ".join(filter(None, [
+            self.shipping_address1,
+            self.shipping_address2,
+            self.shipping_city,
+            self.shipping_region,
+            self.shipping_country,
+            self.shipping_postal,
+        ]))
+
+    def save(self, *args, **kwargs):
+        self.shipping_summary = self.build_shipping_summary()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and any(f.startswith("shipping_") for f in update_fields):
+            kwargs["update_fields"] = {*update_fields, "shipping_summary"}
+        super().save(*args, **kwargs)
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
@@ -78,3 +122,111 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"OrderItem({self.order_id})"
+
+
+class ArchivedOrder(models.Model):
+    """
+    An old DELIVERED/CANCELLED order moved out of ``Order`` by ``shop.archive``.
+
+    Fields mirror ``Order`` (the original id is kept as the primary key) so
+    archived rows can be rendered anywhere an order is expected.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_orders")
+    total_cents = models.PositiveIntegerField(default=0)
+    shipping_cents = models.PositiveIntegerField(default=0)
+    shipping_zone = models.CharField(max_length=32, blank=True)
+    shipping_address1 = models.CharField(max_length=200, blank=True)
+    shipping_address2 = models.CharField(max_length=200, blank=True)
+    shipping_city = models.CharField(max_length=100, blank=True)
+    shipping_country = models.CharField(max_length=64, blank=True)
+    shipping_region = models.CharField(max_length=64, blank=True)
+    shipping_postal = models.CharField(max_length=32, blank=True)
+    shipping_summary = models.CharField(max_length=700, blank=True)
+    status = models.CharField(max_length=32, choices=Order.STATUS_CHOICES)
+    payment_method = models.CharField(max_length=16, choices=Order.PAYMENT_METHOD_CHOICES, default="EMT")
+    payment_reference = models.CharField(max_length=120, blank=True)
+    payer_email = models.EmailField(blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="archivedorder_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"ArchivedOrder({self.id})"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name="+")
+    product_name = models.CharField(max_length=200, blank=True)
+    quantity = models.PositiveIntegerField(default=1)
+    price_cents = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"ArchivedOrderItem({self.order_id})"
+
+
+class ShippingRate(models.Model):
+    """
+    One row of the shipping rate table.
+
+    Blank country/region/postal_prefix act as wildcards; the most specific
+    matching row wins (postal prefix > region > country > catch-all), and
+    within a row set the highest ``min_weight_grams`` not above the parcel
+    weight is used. Rows are compiled into an in-memory lookup by
+    ``shop.shipping`` so estimates never query this table directly.
+    """
+
+    zone = models.CharField(max_length=32)
+    country = models.CharField(max_length=64, blank=True)
+    region = models.CharField(max_length=64, blank=True)
+    postal_prefix = models.CharField(max_length=16, blank=True)
+    min_weight_grams = models.PositiveIntegerField(default=0)
+    cents = models.PositiveIntegerField()
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ("country", "region", "postal_prefix", "min_weight_grams")
+
+    def __str__(self):
+        scope = "/".join(filter(None, [self.country, self.region, self.postal_prefix])) or "*"
+        return f"ShippingRate({scope} {self.zone} {self.cents})"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Pre-aggregated sales for one day, by shipping zone or by product.
+
+    ``ZONE`` rows hold order counts and order totals per shipping zone;
+    ``PRODUCT`` rows hold units and line revenue per product name. Only orders
+    in a counted status (paid onwards, not cancelled) contribute, keyed by the
+    day the order was placed. Maintained by ``shop.analytics``.
+    """
+
+    KIND_ZONE = "ZONE"
+    KIND_PRODUCT = "PRODUCT"
+    KIND_CHOICES = [
+        (KIND_ZONE, "Shipping zone"),
+        (KIND_PRODUCT, "Product"),
+    ]
+
+    day = models.DateField()
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    key = models.CharField(max_length=200, blank=True)
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue_cents = models.BigIntegerField(default=0)
+    shipping_cents = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("day", "kind", "key")
+        ordering = ("day", "kind", "key")
+
+    def __str__(self):
+        return f"DailySalesRollup({self.day} {self.kind} {self.key})"
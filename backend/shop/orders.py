@@ -0,0 +1,81 @@
+"""
+Order status transitions shared by the GraphQL API and the admin.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .analytics import record_status_change
+from .emails import send_shipment_notifications
+from .events import publish_status_changes
+from .models import Order
+from .tasks import enqueue
+
+# Per-order outcomes reported by bulk_update_order_status
+UPDATED = "UPDATED"
+UNCHANGED = "UNCHANGED"
+CONFLICT = "CONFLICT"
+NOT_FOUND = "NOT_FOUND"
+
+ORDER_STATUSES = {choice[0] for choice in Order.STATUS_CHOICES}
+
+
+@transaction.atomic
+def bulk_update_order_status(order_ids, status):
+    """
+    Move many orders to ``status`` with one UPDATE per current status.
+
+    Orders that need a change are locked (``SELECT ... FOR UPDATE``, in id
+    order) and re-checked against the status read, so an order changed
+    concurrently since it was read is reported as a conflict instead of being
+    overwritten, and only rows this call moved count as updated. Shipment
+    emails for orders that became SHIPPED are enqueued as a single batch after
+    commit, status events go out to open order streams, and sales rollups are
+    adjusted in the same transaction. Returns ``{order_id: (outcome,
+    current_status)}`` in the order the ids were given.
+    """
+    if status not in ORDER_STATUSES:
+        raise Exception("Invalid order status")
+
+    order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
+    current, owners = {}, {}
+    for order_id, old_status, user_id in Order.objects.filter(pk__in=order_ids).values_list("pk", "status", "user_id"):
+        current[order_id] = old_status
+        owners[order_id] = user_id
+
+    candidates = [order_id for order_id, old_status in current.items() if old_status != status]
+    locked = dict(
+        Order.objects.select_for_update().filter(pk__in=candidates).order_by("pk").values_list("pk", "status")
+    )
+
+    results = {}
+    by_status = defaultdict(list)
+    for order_id in candidates:
+        if order_id in locked and locked[order_id] == current[order_id]:
+            by_status[current[order_id]].append(order_id)
+        else:
+            results[order_id] = (CONFLICT, locked.get(order_id))
+
+    shipped = []
+    for old_status, ids in by_status.items():
+        # Locked and re-checked above, so every row moves.
+        Order.objects.filter(pk__in=ids).update(status=status)
+        for order_id in ids:
+            results[order_id] = (UPDATED, status)
+        record_status_change(ids, old_status, status)
+        publish_status_changes((order_id, owners[order_id], status) for order_id in ids)
+        if status == "SHIPPED":
+            shipped.extend(ids)
+
+    if shipped:
+        enqueue(send_shipment_notifications, shipped)
+
+    ordered = {}
+    for order_id in order_ids:
+        if order_id in results:
+            ordered[order_id] = results[order_id]
+        elif order_id in current:
+            ordered[order_id] = (UNCHANGED, status)
+        else:
+            ordered[order_id] = (NOT_FOUND, None)
+    return ordered
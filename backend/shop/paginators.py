@@ -0,0 +1,53 @@
+"""
+Paginators for large admin changelists.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Below this many (estimated) rows an exact COUNT(*) is cheap enough to run.
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids ``COUNT(*)`` on big tables under PostgreSQL.
+
+    Unfiltered querysets use the planner's ``pg_class.reltuples`` estimate;
+    filtered ones use the row estimate from ``EXPLAIN``. If the estimate is
+    below ``ESTIMATED_COUNT_THRESHOLD`` (or the backend is not PostgreSQL),
+    the exact count is used so small result sets stay accurate.
+    """
+
+    threshold = ESTIMATED_COUNT_THRESHOLD
+
+    def _estimate(self):
+        queryset = self.object_list
+        if not hasattr(queryset, "query"):
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+            else:
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        if queryset.query.where:
+            return int(row[0][0]["Plan"]["Plan Rows"])
+        # reltuples is -1 for a table that has never been analyzed
+        return row[0] if row[0] >= 0 else None
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate()
+        if estimate is not None and estimate >= self.threshold:
+            return estimate
+        return super().count
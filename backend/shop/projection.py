@@ -0,0 +1,98 @@
+"""
+Shape list querysets to the fields a GraphQL query actually selects.
+
+``project_queryset(queryset, info)`` walks the selection set of the field
+being resolved and applies:
+
+- ``only()`` with the selected model columns (plus the primary key and any
+  foreign keys needed for joins), so unrequested text and address columns
+  stay in the database;
+- ``select_related`` for selected forward foreign keys, narrowed the same way;
+- ``prefetch_related`` with a projected ``Prefetch`` queryset for selected
+  reverse relations (``items``), recursively.
+
+GraphQL field names are matched to model fields by their snake_case form.
+A selected field that is not a model field (a custom resolver) may read any
+attribute, so every column of that model is loaded. Fragments are merged;
+``@skip``/``@include`` are ignored, which can only load more, never less.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def _merge_selections(nodes, fragments, merged=None):
+    """``{field name: [selection sets]}`` for the fields selected under ``nodes``."""
+    merged = {} if merged is None else merged
+    for node in nodes:
+        if node.selection_set is None:
+            continue
+        for selection in node.selection_set.selections:
+            if isinstance(selection, FieldNode):
+                sets = merged.setdefault(selection.name.value, [])
+                if selection.selection_set is not None:
+                    sets.append(selection)
+            elif isinstance(selection, InlineFragmentNode):
+                _merge_selections([selection], fragments, merged)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = fragments.get(selection.name.value)
+                if fragment is not None:
+                    _merge_selections([fragment], fragments, merged)
+    return merged
+
+
+def _plan(model, nodes, fragments, prefix, plan):
+    """Add ``model``'s columns, joins and prefetches (under ``prefix``) to ``plan``."""
+    opts = model._meta
+    columns = {opts.pk.name}
+    load_everything = False
+
+    for name, children in _merge_selections(nodes, fragments).items():
+        if name.startswith("__"):
+            continue
+        try:
+            field = opts.get_field(to_snake_case(name))
+        except FieldDoesNotExist:
+            load_everything = True
+            continue
+
+        if field.concrete and (field.many_to_one or field.one_to_one):
+            columns.add(field.name)
+            if children:
+                plan["select_related"].append(prefix + field.name)
+                _plan(field.related_model, children, fragments, f"{prefix}{field.name}__", plan)
+        elif field.one_to_many and children:
+            related = project(field.related_model._default_manager.all(), children, fragments, keep=[field.field.name])
+            plan["prefetch"].append(Prefetch(prefix + field.get_accessor_name(), queryset=related))
+        elif field.concrete and not field.is_relation:
+            columns.add(field.name)
+        else:
+            # Many-to-many and reverse one-to-one: leave them to the default resolver.
+            load_everything = True
+
+    if load_everything:
+        columns.update(f.name for f in opts.concrete_fields)
+    plan["only"].extend(prefix + column for column in sorted(columns))
+
+
+def project(queryset, nodes, fragments, keep=()):
+    """Apply the projection for selection ``nodes`` to ``queryset``."""
+    plan = {"only": [], "select_related": [], "prefetch": []}
+    _plan(queryset.model, nodes, fragments, "", plan)
+    queryset = queryset.only(*plan["only"], *keep)
+    if plan["select_related"]:
+        queryset = queryset.select_related(*plan["select_related"])
+    if plan["prefetch"]:
+        queryset = queryset.prefetch_related(*plan["prefetch"])
+    return queryset
+
+
+def project_queryset(queryset, info, keep=()):
+    """
+    Narrow ``queryset`` to what the current GraphQL field selects.
+
+    ``keep`` names extra fields to load regardless (e.g. ones used for
+    ordering in Python).
+    """
+    return project(queryset, info.field_nodes, info.fragments, keep=keep)
@@ -0,0 +1,117 @@
+"""
+Receipt generation through pdf-service.
+
+The request payload is built from the database synchronously; the HTTP call
+comes in a blocking flavour (``request_receipt``, for WSGI workers) and an
+async one (``arequest_receipt``) so ASGI workers can keep many slow
+pdf-service calls in flight from a single process.
+
+pdf-service keeps generated receipts in its storage backend and serves them
+from ``GET /receipt/{order_id}/pdf``; ``open_receipt_pdf`` streams that
+response so downloads are proxied instead of re-rendered.
+"""
+import os
+
+import httpx
+
+from .models import Order
+
+RECEIPT_TIMEOUT = 30.0
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def pdf_service_url():
+    return os.getenv("PDF_SERVICE_URL", "http://pdf-service:8000")
+
+
+def build_receipt_request(order_id, user):
+    """Payload for ``POST /generate-receipt``; raises ``Order.DoesNotExist`` for other users' orders."""
+    order = Order.objects.prefetch_related("items__product").get(pk=order_id, user=user)
+    return receipt_payload(order, user)
+
+
+def receipt_payload(order, user):
+    """Payload for ``POST /generate-receipt`` from a live or archived order."""
+    shipping_address = f"{order.shipping_address1}"
+    if order.shipping_address2:
+        shipping_address += f", {order.shipping_address2}"
+
+    return {
+        "order_id": order.id,
+        "user_email": order.payer_email or user.email,
+        "total_cents": order.total_cents,
+        "shipping_cents": order.shipping_cents,
+        "created_at": order.created_at.strftime("%B %d, %Y"),
+        "items": [
+            {
+                # The name stored at checkout; the product may since be renamed or deleted
+                "name": (item.product_name or "").strip() or (item.product.name if item.product else "Unknown Product"),
+                "quantity": item.quantity,
+                "price_cents": item.price_cents,
+            }
+            for item in order.items.all()
+        ],
+        "shipping_address": shipping_address,
+        "shipping_city": order.shipping_city,
+        "shipping_country": order.shipping_country,
+    }
+
+
+def _sync_client():
+    return httpx.Client(timeout=RECEIPT_TIMEOUT)
+
+
+def _async_client():
+    return httpx.AsyncClient(timeout=RECEIPT_TIMEOUT)
+
+
+def request_receipt(payload) -> httpx.Response:
+    with _sync_client() as client:
+        return client.post(f"{pdf_service_url()}/generate-receipt", json=payload)
+
+
+async def arequest_receipt(payload) -> httpx.Response:
+    async with _async_client() as client:
+        return await client.post(f"{pdf_service_url()}/generate-receipt", json=payload)
+
+
+class ReceiptDownload:
+    """A streamed ``GET /receipt/{id}/pdf`` response; iterate it for the body, or ``close()`` it."""
+
+    def __init__(self, client, response):
+        self.client = client
+        self.response = response
+
+    @property
+    def status_code(self):
+        return self.response.status_code
+
+    @property
+    def headers(self):
+        return self.response.headers
+
+    def __iter__(self):
+        try:
+            yield from self.response.iter_bytes(DOWNLOAD_CHUNK_SIZE)
+        finally:
+            self.close()
+
+    def close(self):
+        self.response.close()
+        self.client.close()
+
+
+def open_receipt_pdf(order_id, byte_range=None) -> ReceiptDownload:
+    """Start streaming a stored receipt, forwarding an HTTP ``Range`` header if given."""
+    client = _sync_client()
+    # Unencoded, so the forwarded Content-Length/Content-Range match the bytes relayed
+    headers = {"Accept-Encoding": "identity"}
+    if byte_range:
+        headers["Range"] = byte_range
+    try:
+        request = client.build_request("GET", f"{pdf_service_url()}/receipt/{order_id}/pdf", headers=headers)
+        return ReceiptDownload(client, client.send(request, stream=True))
+    except BaseException:
+        client.close()
+        raise
@@ -1,16 +1,40 @@
+import asyncio
+
 import graphene
+import graphql_jwt
 from graphene_django import DjangoObjectType
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from graphql_jwt.decorators import login_required
 from django.db import transaction
-
-from .models import Product, Cart, CartItem, Order, OrderItem
-from .shipping import calculate_shipping_cents, estimate_shipping
-from .emails import send_order_confirmation, send_admin_order_notification, send_shipment_notification
+from asgiref.sync import sync_to_async
+
+from .models import Product, Cart, CartItem, Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+from .analytics import sales_report
+from .archive import archived_order_history
+from .carts import apply_cart_delta, recalculate_cart_totals, reset_cart_totals, upsert_cart_lines
+from .projection import project_queryset
+from .orders import UNCHANGED, UPDATED, bulk_update_order_status
+from .guest_carts import get_guest_cart_lines, merge_guest_cart, new_guest_cart_token, save_guest_cart_lines
+from .search import MAX_SEARCH_RESULTS, search_products
+from .receipts import arequest_receipt, build_receipt_request, request_receipt
+from .shipping import aestimate_shipping, calculate_shipping_cents, estimate_shipping
+from .events import issue_stream_ticket
+from .emails import send_order_placed_emails, send_shipment_notifications
+from .tasks import enqueue
 
 User = get_user_model()
 
 
+def running_async():
+    """True when resolving on an event loop (AsyncGraphQLView), where I/O should be awaited."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
 def require_staff(info):
     user = info.context.user
     if not user.is_authenticated or not user.is_staff:
@@ -27,7 +51,7 @@ class UserType(DjangoObjectType):
 class ProductType(DjangoObjectType):
     class Meta:
         model = Product
-        fields = ("id", "name", "description", "price_cents", "image_url", "inventory", "is_active")
+        fields = ("id", "name", "description", "price_cents", "image_url", "inventory", "weight_grams", "is_active")
 
 
 class CartItemType(DjangoObjectType):
@@ -37,14 +61,32 @@ class CartItemType(DjangoObjectType):
 
 
 class CartType(DjangoObjectType):
-    subtotal_cents = graphene.Int()
-
     class Meta:
         model = Cart
-        fields = ("id", "owner", "items", "updated_at")
+        fields = ("id", "owner", "items", "subtotal_cents", "item_count", "updated_at")
+
+
+class GuestCartItemType(graphene.ObjectType):
+    product = graphene.Field(ProductType, required=True)
+    quantity = graphene.Int(required=True)
+
+
+class GuestCartType(graphene.ObjectType):
+    token = graphene.String(required=True)
+    items = graphene.List(graphene.NonNull(GuestCartItemType), required=True)
+    subtotal_cents = graphene.Int(required=True)
+    item_count = graphene.Int(required=True)
 
-    def resolve_subtotal_cents(self, info):
-        return sum(i.product.price_cents * i.quantity for i in self.items.all())
+
+def build_guest_cart(token, lines):
+    products = Product.objects.filter(pk__in=lines, is_active=True).order_by("pk")
+    items = [GuestCartItemType(product=p, quantity=lines[p.pk]) for p in products]
+    return GuestCartType(
+        token=token,
+        items=items,
+        subtotal_cents=sum(i.product.price_cents * i.quantity for i in items),
+        item_count=len(items),
+    )
 
 
 class OrderItemType(DjangoObjectType):
@@ -52,6 +94,10 @@ class OrderItemType(DjangoObjectType):
         model = OrderItem
         fields = ("id", "product", "product_name", "quantity", "price_cents")
 
+    @classmethod
+    def is_type_of(cls, root, info):
+        return isinstance(root, ArchivedOrderItem) or super().is_type_of(root, info)
+
 
 class OrderType(DjangoObjectType):
     class Meta:
@@ -76,12 +122,69 @@ class OrderType(DjangoObjectType):
             "items",
         )
 
+    @classmethod
+    def is_type_of(cls, root, info):
+        # Archived orders share Order's field names and render as orders.
+        return isinstance(root, ArchivedOrder) or super().is_type_of(root, info)
+
 
 class ShippingEstimateType(graphene.ObjectType):
     cents = graphene.Int(required=True)
     zone = graphene.String(required=True)
 
 
+class DailySalesType(graphene.ObjectType):
+    day = graphene.Date(required=True)
+    orders = graphene.Int(required=True)
+    revenue_cents = graphene.Int(required=True)
+    shipping_cents = graphene.Int(required=True)
+
+
+class ProductSalesType(graphene.ObjectType):
+    product_name = graphene.String(required=True)
+    units = graphene.Int(required=True)
+    revenue_cents = graphene.Int(required=True)
+
+
+class ZoneSalesType(graphene.ObjectType):
+    zone = graphene.String(required=True)
+    orders = graphene.Int(required=True)
+    revenue_cents = graphene.Int(required=True)
+
+
+class SalesReportType(graphene.ObjectType):
+    days = graphene.List(graphene.NonNull(DailySalesType), required=True)
+    products = graphene.List(graphene.NonNull(ProductSalesType), required=True)
+    zones = graphene.List(graphene.NonNull(ZoneSalesType), required=True)
+    orders = graphene.Int(required=True)
+    revenue_cents = graphene.Int(required=True)
+
+
+MAX_SALES_REPORT_DAYS = 366
+
+
+class DestinationInput(graphene.InputObjectType):
+    country = graphene.String(required=True)
+    region = graphene.String(required=True)
+    postal = graphene.String(required=True)
+    weight_grams = graphene.Int(required=False)
+
+
+MAX_SHIPPING_DESTINATIONS = 50
+
+
+async def ashipping_estimate(country, region, postal, weight_grams=0):
+    cents, zone = await aestimate_shipping(country, region, postal, weight_grams or 0)
+    return ShippingEstimateType(cents=cents, zone=zone)
+
+
+async def ashipping_estimates(destinations):
+    return [
+        await ashipping_estimate(d.country, d.region, d.postal, d.weight_grams)
+        for d in destinations
+    ]
+
+
 class RegisterUser(graphene.Mutation):
     user = graphene.Field(UserType)
 
@@ -89,14 +192,30 @@ class RegisterUser(graphene.Mutation):
         username = graphene.String(required=True)
         password = graphene.String(required=True)
         email = graphene.String()
+        guest_cart_token = graphene.String(required=False)
 
-    def mutate(self, info, username, password, email=""):
+    def mutate(self, info, username, password, email="", guest_cart_token=None):
         if User.objects.filter(username=username).exists():
             raise Exception("Username already taken")
         user = User.objects.create_user(username=username, password=password, email=email)
+        if guest_cart_token:
+            merge_guest_cart(user, guest_cart_token)
         return RegisterUser(user=user)
 
 
+class ObtainJSONWebToken(graphql_jwt.ObtainJSONWebToken):
+    """Obtain JSON Web Token mutation, folding in the caller's guest cart"""
+
+    class Arguments:
+        guest_cart_token = graphene.String(required=False)
+
+    @classmethod
+    def resolve(cls, root, info, guest_cart_token=None, **kwargs):
+        if guest_cart_token:
+            merge_guest_cart(info.context.user, guest_cart_token)
+        return super().resolve(root, info, **kwargs)
+
+
 class AddToCart(graphene.Mutation):
     cart = graphene.Field(CartType)
 
@@ -110,11 +229,13 @@ class AddToCart(graphene.Mutation):
         product = Product.objects.get(pk=product_id, is_active=True)
         cart, _ = Cart.objects.get_or_create(owner=user)
         item, created = CartItem.objects.get_or_create(cart=cart, product=product)
+        added = max(1, quantity)
         if created:
-            item.quantity = max(1, quantity)
+            item.quantity = added
         else:
-            item.quantity += max(1, quantity)
+            item.quantity += added
         item.save()
+        apply_cart_delta(cart, product.price_cents * added, 1 if created else 0)
         return AddToCart(cart=cart)
 
 
@@ -129,12 +250,16 @@ class UpdateCartItem(graphene.Mutation):
     def mutate(self, info, item_id, quantity):
         user = info.context.user
         cart = Cart.objects.get(owner=user)
-        item = CartItem.objects.get(pk=item_id, cart=cart)
+        item = CartItem.objects.select_related("product").get(pk=item_id, cart=cart)
+        price = item.product.price_cents
         if quantity <= 0:
             item.delete()
+            apply_cart_delta(cart, -price * item.quantity, -1)
         else:
+            delta = quantity - item.quantity
             item.quantity = quantity
             item.save()
+            apply_cart_delta(cart, price * delta)
         return UpdateCartItem(cart=cart)
 
 
@@ -148,10 +273,98 @@ class RemoveCartItem(graphene.Mutation):
     def mutate(self, info, item_id):
         user = info.context.user
         cart = Cart.objects.get(owner=user)
-        CartItem.objects.filter(pk=item_id, cart=cart).delete()
+        item = CartItem.objects.select_related("product").filter(pk=item_id, cart=cart).first()
+        if item is not None:
+            item.delete()
+            apply_cart_delta(cart, -item.product.price_cents * item.quantity, -1)
         return RemoveCartItem(cart=cart)
 
 
+class CartLineInput(graphene.InputObjectType):
+    product_id = graphene.ID(required=True)
+    quantity = graphene.Int(required=True)
+
+
+MAX_CART_LINES = 100
+
+
+class AddToGuestCart(graphene.Mutation):
+    guest_cart = graphene.Field(GuestCartType)
+
+    class Arguments:
+        product_id = graphene.ID(required=True)
+        quantity = graphene.Int(required=False)
+        token = graphene.String(required=False)
+
+    def mutate(self, info, product_id, quantity=1, token=None):
+        product = Product.objects.get(pk=product_id, is_active=True)
+        token = token or new_guest_cart_token()
+        lines = get_guest_cart_lines(token)
+        if product.pk not in lines and len(lines) >= MAX_CART_LINES:
+            raise Exception(f"A cart holds at most {MAX_CART_LINES} lines")
+        lines[product.pk] = lines.get(product.pk, 0) + max(1, quantity)
+        save_guest_cart_lines(token, lines)
+        return AddToGuestCart(guest_cart=build_guest_cart(token, lines))
+
+
+class UpdateGuestCartItem(graphene.Mutation):
+    guest_cart = graphene.Field(GuestCartType)
+
+    class Arguments:
+        token = graphene.String(required=True)
+        product_id = graphene.ID(required=True)
+        quantity = graphene.Int(required=True)
+
+    def mutate(self, info, token, product_id, quantity):
+        lines = get_guest_cart_lines(token)
+        product_id = int(product_id)
+        if quantity <= 0:
+            lines.pop(product_id, None)
+        elif product_id in lines:
+            lines[product_id] = quantity
+        save_guest_cart_lines(token, lines)
+        return UpdateGuestCartItem(guest_cart=build_guest_cart(token, lines))
+
+
+class SetCartItems(graphene.Mutation):
+    """
+    Apply many cart line changes at once: lines with a positive quantity are
+    upserted, lines with quantity <= 0 are removed. With ``replace`` any line
+    not listed is removed as well.
+    """
+
+    cart = graphene.Field(CartType)
+
+    class Arguments:
+        items = graphene.List(graphene.NonNull(CartLineInput), required=True)
+        replace = graphene.Boolean(required=False)
+
+    @login_required
+    @transaction.atomic
+    def mutate(self, info, items, replace=False):
+        if len(items) > MAX_CART_LINES:
+            raise Exception(f"At most {MAX_CART_LINES} cart lines per request")
+        user = info.context.user
+        quantities = {int(line.product_id): line.quantity for line in items}
+        keep = {product_id: qty for product_id, qty in quantities.items() if qty > 0}
+
+        found = set(Product.objects.filter(pk__in=keep, is_active=True).values_list("pk", flat=True))
+        missing = set(keep) - found
+        if missing:
+            raise Exception(f"Product not found: {', '.join(str(pk) for pk in sorted(missing))}")
+
+        cart, _ = Cart.objects.get_or_create(owner=user)
+        upsert_cart_lines(cart, keep)
+        if replace:
+            cart.items.exclude(product_id__in=keep).delete()
+        else:
+            cart.items.filter(product_id__in=set(quantities) - set(keep)).delete()
+
+        recalculate_cart_totals(cart_ids=[cart.pk])
+        cart.refresh_from_db(fields=["subtotal_cents", "item_count"])
+        return SetCartItems(cart=cart)
+
+
 class Checkout(graphene.Mutation):
     order = graphene.Field(OrderType)
 
@@ -194,7 +407,10 @@ class Checkout(graphene.Mutation):
                 )
 
         subtotal = sum(i.product.price_cents * i.quantity for i in items)
-        shipping_cents, shipping_zone = estimate_shipping(shipping_country, shipping_region, shipping_postal)
+        weight_grams = sum(i.product.weight_grams * i.quantity for i in items)
+        shipping_cents, shipping_zone = estimate_shipping(
+            shipping_country, shipping_region, shipping_postal, weight_grams
+        )
         total = subtotal + shipping_cents
         order = Order.objects.create(
             user=user,
@@ -226,10 +442,10 @@ class Checkout(graphene.Mutation):
             item.product.save()
 
         cart.items.all().delete()
+        reset_cart_totals(cart)
         
         # Send email notifications
-        send_order_confirmation(order)
-        send_admin_order_notification(order)
+        enqueue(send_order_placed_emails, order.pk)
         
         return Checkout(order=order)
 
@@ -243,6 +459,7 @@ class CreateProduct(graphene.Mutation):
         price_cents = graphene.Int(required=True)
         image_url = graphene.String(required=False)
         inventory = graphene.Int(required=False)
+        weight_grams = graphene.Int(required=False)
         is_active = graphene.Boolean(required=False)
 
     def mutate(
@@ -253,6 +470,7 @@ class CreateProduct(graphene.Mutation):
         description="",
         image_url="",
         inventory=0,
+        weight_grams=0,
         is_active=True,
     ):
         require_staff(info)
@@ -262,6 +480,7 @@ class CreateProduct(graphene.Mutation):
             price_cents=price_cents,
             image_url=image_url or "",
             inventory=max(0, inventory or 0),
+            weight_grams=max(0, weight_grams or 0),
             is_active=is_active if is_active is not None else True,
         )
         return CreateProduct(product=product)
@@ -277,6 +496,7 @@ class UpdateProduct(graphene.Mutation):
         price_cents = graphene.Int(required=False)
         image_url = graphene.String(required=False)
         inventory = graphene.Int(required=False)
+        weight_grams = graphene.Int(required=False)
         is_active = graphene.Boolean(required=False)
 
     def mutate(
@@ -288,6 +508,7 @@ class UpdateProduct(graphene.Mutation):
         price_cents=None,
         image_url=None,
         inventory=None,
+        weight_grams=None,
         is_active=None,
     ):
         require_staff(info)
@@ -302,6 +523,8 @@ class UpdateProduct(graphene.Mutation):
             product.image_url = image_url
         if inventory is not None:
             product.inventory = max(0, inventory)
+        if weight_grams is not None:
+            product.weight_grams = max(0, weight_grams)
         if is_active is not None:
             product.is_active = is_active
         product.save()
@@ -339,11 +562,49 @@ class UpdateOrderStatus(graphene.Mutation):
         
         # Send shipment notification when status changes to SHIPPED
         if old_status != "SHIPPED" and status == "SHIPPED":
-            send_shipment_notification(order)
+            enqueue(send_shipment_notifications, [order.pk])
         
         return UpdateOrderStatus(order=order)
 
 
+class OrderStatusResultType(graphene.ObjectType):
+    order_id = graphene.ID(required=True)
+    outcome = graphene.String(required=True)
+    status = graphene.String()
+    ok = graphene.Boolean(required=True)
+
+
+MAX_BULK_ORDERS = 500
+
+
+class BulkUpdateOrderStatus(graphene.Mutation):
+    results = graphene.List(graphene.NonNull(OrderStatusResultType))
+    updated_count = graphene.Int()
+
+    class Arguments:
+        order_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+        status = graphene.String(required=True)
+
+    def mutate(self, info, order_ids, status):
+        require_staff(info)
+        if len(order_ids) > MAX_BULK_ORDERS:
+            raise Exception(f"At most {MAX_BULK_ORDERS} orders per request")
+        outcomes = bulk_update_order_status(order_ids, status)
+        results = [
+            OrderStatusResultType(
+                order_id=order_id,
+                outcome=outcome,
+                status=current_status,
+                ok=outcome in (UPDATED, UNCHANGED),
+            )
+            for order_id, (outcome, current_status) in outcomes.items()
+        ]
+        return BulkUpdateOrderStatus(
+            results=results,
+            updated_count=sum(1 for outcome, _ in outcomes.values() if outcome == UPDATED),
+        )
+
+
 class MarkOrderPaid(graphene.Mutation):
     order = graphene.Field(OrderType)
 
@@ -367,11 +628,8 @@ class GenerateReceipt(graphene.Mutation):
         order_id = graphene.ID(required=True)
 
     def mutate(self, info, order_id):
-        import requests
-        import os
-
         user = info.context.user
-        
+
         # Check authentication
         if not user.is_authenticated:
             return GenerateReceipt(
@@ -379,82 +637,84 @@ class GenerateReceipt(graphene.Mutation):
                 message="Authentication required",
                 filename=None,
             )
-        
-        try:
-            order = Order.objects.get(pk=order_id, user=user)
-        except Order.DoesNotExist:
-            return GenerateReceipt(
-                success=False,
-                message="Order not found",
-                filename=None,
-            )
 
-        pdf_service_url = os.getenv("PDF_SERVICE_URL", "http://pdf-service:8000")
+        if running_async():
+            return GenerateReceipt.amutate(user, order_id)
 
-        # Prepare order data
-        order_items = [
-            {
-                "name": item.product.name if item.product else "Unknown Product",
-                "quantity": item.quantity,
-                "price_cents": item.price_cents,
-            }
-            for item in order.items.all()
-        ]
+        try:
+            receipt_request = build_receipt_request(order_id, user)
+        except Order.DoesNotExist:
+            return GenerateReceipt.not_found()
 
-        # Build shipping address
-        shipping_address = f"{order.shipping_address1}"
-        if order.shipping_address2:
-            shipping_address += f", {order.shipping_address2}"
-
-        receipt_request = {
-            "order_id": order.id,
-            "user_email": order.payer_email or user.email,
-            "total_cents": order.total_cents,
-            "shipping_cents": order.shipping_cents,
-            "created_at": order.created_at.strftime("%B %d, %Y"),
-            "items": order_items,
-            "shipping_address": shipping_address,
-            "shipping_city": order.shipping_city,
-            "shipping_country": order.shipping_country,
-        }
+        try:
+            return GenerateReceipt.from_response(request_receipt(receipt_request))
+        except Exception as e:
+            return GenerateReceipt.failed(e)
 
+    @staticmethod
+    async def amutate(user, order_id):
         try:
-            response = requests.post(
-                f"{pdf_service_url}/generate-receipt",
-                json=receipt_request,
-                timeout=30,
-            )
+            receipt_request = await sync_to_async(build_receipt_request)(order_id, user)
+        except Order.DoesNotExist:
+            return GenerateReceipt.not_found()
 
-            if response.status_code == 200:
-                pdf_data = response.json()
-                return GenerateReceipt(
-                    success=True,
-                    message="Receipt generated successfully",
-                    filename=pdf_data.get("filename"),
-                )
-            else:
-                return GenerateReceipt(
-                    success=False,
-                    message="Failed to generate receipt",
-                    filename=None,
-                )
+        try:
+            return GenerateReceipt.from_response(await arequest_receipt(receipt_request))
         except Exception as e:
+            return GenerateReceipt.failed(e)
+
+    @staticmethod
+    def not_found():
+        return GenerateReceipt(
+            success=False,
+            message="Order not found",
+            filename=None,
+        )
+
+    @staticmethod
+    def failed(error):
+        return GenerateReceipt(
+            success=False,
+            message=f"Error: {str(error)}",
+            filename=None,
+        )
+
+    @staticmethod
+    def from_response(response):
+        if response.status_code == 200:
+            pdf_data = response.json()
             return GenerateReceipt(
-                success=False,
-                message=f"Error: {str(e)}",
-                filename=None,
+                success=True,
+                message="Receipt generated successfully",
+                filename=pdf_data.get("filename"),
             )
+        return GenerateReceipt(
+            success=False,
+            message="Failed to generate receipt",
+            filename=None,
+        )
 
 
-
+MAX_ARCHIVED_ORDERS_PAGE = 50
 
 
 class Query(graphene.ObjectType):
     me = graphene.Field(UserType)
     products = graphene.List(ProductType)
     product = graphene.Field(ProductType, id=graphene.ID(required=True))
+    search_products = graphene.List(
+        graphene.NonNull(ProductType),
+        query=graphene.String(required=True),
+        limit=graphene.Int(required=False),
+    )
     cart = graphene.Field(CartType)
+    guest_cart = graphene.Field(GuestCartType, token=graphene.String(required=True))
     orders = graphene.List(OrderType)
+    archived_orders = graphene.List(
+        graphene.NonNull(OrderType),
+        limit=graphene.Int(required=False),
+        offset=graphene.Int(required=False),
+    )
     admin_products = graphene.List(ProductType)
     admin_orders = graphene.List(OrderType)
     shipping_estimate = graphene.Field(
@@ -462,6 +722,16 @@ class Query(graphene.ObjectType):
         country=graphene.String(required=True),
         region=graphene.String(required=True),
         postal=graphene.String(required=True),
+        weight_grams=graphene.Int(required=False),
+    )
+    shipping_estimates = graphene.List(
+        graphene.NonNull(ShippingEstimateType),
+        destinations=graphene.List(graphene.NonNull(DestinationInput), required=True),
+    )
+    sales_report = graphene.Field(
+        SalesReportType,
+        date_from=graphene.Date(required=True, name="from"),
+        date_to=graphene.Date(required=True, name="to"),
     )
 
     def resolve_me(self, info):
@@ -471,44 +741,122 @@ class Query(graphene.ObjectType):
         return None
 
     def resolve_products(self, info):
-        return Product.objects.filter(is_active=True)
+        return project_queryset(Product.objects.filter(is_active=True), info)
 
     def resolve_product(self, info, id):
         return Product.objects.get(pk=id)
 
+    def resolve_search_products(self, info, query, limit=20):
+        limit = max(1, min(limit or 20, MAX_SEARCH_RESULTS))
+        return search_products(query)[:limit]
+
     @login_required
     def resolve_cart(self, info):
         user = info.context.user
         cart, _ = Cart.objects.get_or_create(owner=user)
         return cart
 
+    def resolve_guest_cart(self, info, token):
+        return build_guest_cart(token, get_guest_cart_lines(token))
+
     @login_required
     def resolve_orders(self, info):
-        user = info.context.user
-        return Order.objects.filter(user=user).order_by("-created_at")
+        return project_queryset(Order.objects.filter(user=info.context.user).order_by("-created_at"), info)
+
+    @login_required
+    def resolve_archived_orders(self, info, limit=20, offset=0):
+        limit = max(1, min(limit or 20, MAX_ARCHIVED_ORDERS_PAGE))
+        offset = max(0, offset or 0)
+        orders = project_queryset(archived_order_history(info.context.user), info)
+        return orders[offset:offset + limit]
 
     def resolve_admin_products(self, info):
         require_staff(info)
-        return Product.objects.all().order_by("-id")
+        return project_queryset(Product.objects.order_by("-id"), info)
 
     def resolve_admin_orders(self, info):
         require_staff(info)
-        return Order.objects.select_related("user").prefetch_related("items__product").order_by("-created_at")
+        return project_queryset(Order.objects.order_by("-created_at"), info)
 
-    def resolve_shipping_estimate(self, info, country, region, postal):
-        cents, zone = estimate_shipping(country, region, postal)
+    def resolve_shipping_estimate(self, info, country, region, postal, weight_grams=0):
+        if running_async():
+            return ashipping_estimate(country, region, postal, weight_grams)
+        cents, zone = estimate_shipping(country, region, postal, weight_grams)
         return ShippingEstimateType(cents=cents, zone=zone)
 
+    def resolve_shipping_estimates(self, info, destinations):
+        if len(destinations) > MAX_SHIPPING_DESTINATIONS:
+            raise Exception(f"At most {MAX_SHIPPING_DESTINATIONS} destinations per request")
+        if running_async():
+            return ashipping_estimates(destinations)
+        estimates = []
+        for destination in destinations:
+            cents, zone = estimate_shipping(
+                destination.country,
+                destination.region,
+                destination.postal,
+                destination.weight_grams or 0,
+            )
+            estimates.append(ShippingEstimateType(cents=cents, zone=zone))
+        return estimates
+
+    def resolve_sales_report(self, info, date_from, date_to):
+        require_staff(info)
+        if date_to < date_from:
+            raise Exception("'to' must not be before 'from'")
+        if (date_to - date_from).days >= MAX_SALES_REPORT_DAYS:
+            raise Exception(f"Sales reports cover at most {MAX_SALES_REPORT_DAYS} days")
+        report = sales_report(date_from, date_to)
+        days = [
+            DailySalesType(
+                day=row["day"],
+                orders=row["order_count"],
+                revenue_cents=row["revenue"],
+                shipping_cents=row["shipping"],
+            )
+            for row in report["days"]
+        ]
+        return SalesReportType(
+            days=days,
+            products=[
+                ProductSalesType(product_name=row["key"], units=row["unit_count"], revenue_cents=row["revenue"])
+                for row in report["products"]
+            ],
+            zones=[
+                ZoneSalesType(zone=row["key"], orders=row["order_count"], revenue_cents=row["revenue"])
+                for row in report["zones"]
+            ],
+            orders=sum(day.orders for day in days),
+            revenue_cents=sum(day.revenue_cents for day in days),
+        )
+
+
+class OrderEventsTicket(graphene.Mutation):
+    ticket = graphene.String()
+    expires_in = graphene.Int()
+
+    @login_required
+    def mutate(self, info):
+        return OrderEventsTicket(
+            ticket=issue_stream_ticket(info.context.user),
+            expires_in=settings.ORDER_EVENTS_TICKET_MAX_AGE,
+        )
+
 
 class Mutation(graphene.ObjectType):
     register_user = RegisterUser.Field()
     add_to_cart = AddToCart.Field()
     update_cart_item = UpdateCartItem.Field()
     remove_cart_item = RemoveCartItem.Field()
+    set_cart_items = SetCartItems.Field()
+    add_to_guest_cart = AddToGuestCart.Field()
+    update_guest_cart_item = UpdateGuestCartItem.Field()
     checkout = Checkout.Field()
     create_product = CreateProduct.Field()
     update_product = UpdateProduct.Field()
     delete_product = DeleteProduct.Field()
     update_order_status = UpdateOrderStatus.Field()
+    bulk_update_order_status = BulkUpdateOrderStatus.Field()
     mark_order_paid = MarkOrderPaid.Field()
     generate_receipt = GenerateReceipt.Field()
+    order_events_ticket = OrderEventsTicket.Field()
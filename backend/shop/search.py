@@ -0,0 +1,62 @@
+"""
+Search backend for products and orders.
+
+On PostgreSQL the searched columns carry ``pg_trgm`` GIN indexes, so
+substring matches and fuzzy word matches are index scans rather than
+sequential scans, and product results are ranked by trigram similarity.
+``__icontains`` compiles to ``UPPER(col::text) LIKE UPPER(%s)``, so those
+indexes are built on that expression (migration 0011_trigram_upper_indexes);
+the product name also keeps the plain-column index from migration
+0008_trigram_search_indexes for ``trigram_word_similar``. Other backends
+(SQLite in tests) fall back to plain case-insensitive substring matching.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Q
+
+from .models import Order, Product
+
+User = get_user_model()
+
+MAX_SEARCH_RESULTS = 100
+
+
+def _uses_trigram_index(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def search_products(term, queryset=None):
+    """Products whose name contains, or on PostgreSQL resembles, ``term``."""
+    if queryset is None:
+        queryset = Product.objects.filter(is_active=True)
+    term = (term or "").strip()
+    if not term:
+        return queryset.none()
+    if _uses_trigram_index(queryset):
+        return (
+            queryset.filter(Q(name__icontains=term) | Q(name__trigram_word_similar=term))
+            .annotate(rank=TrigramWordSimilarity(term, "name"))
+            .order_by("-rank", "name")
+        )
+    return queryset.filter(name__icontains=term).order_by("name")
+
+
+def search_orders(term, queryset=None):
+    """
+    Orders matching ``term`` by customer username, payer email or payment reference.
+
+    The username match is a subquery rather than a join so each branch of the
+    OR can use its own trigram index and no DISTINCT is needed.
+    """
+    if queryset is None:
+        queryset = Order.objects.all()
+    term = (term or "").strip()
+    if not term:
+        return queryset
+    matching_users = User.objects.filter(username__icontains=term).values("pk")
+    return queryset.filter(
+        Q(payer_email__icontains=term)
+        | Q(payment_reference__icontains=term)
+        | Q(user__in=matching_users)
+    )
@@ -0,0 +1,302 @@
+"""
+Synthetic data at production scale for performance work.
+
+``seed_scale`` writes customers, carts, orders and order items with skewed,
+deterministic distributions: a few repeat customers place most orders,
+most orders hold one or two lines, popular products dominate, order dates
+grow denser towards today and status follows order age. Rows are generated
+as plain tuples with explicit primary keys and written in batches, either
+with ``bulk_create`` or, on PostgreSQL, with ``COPY ... FROM STDIN``.
+"""
+import csv
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Cart, CartItem, Order, OrderItem, Product, User
+from .shipping import DEFAULT_RATES
+
+SEED_BATCH_SIZE = 5000
+SEED_PASSWORD = "scale1234"
+
+# (zone, share of orders, [(city, country, region, postal), ...])
+DESTINATIONS = [
+    ("LOCAL_RADIUS", 15, [("Thessalon", "CA", "ON", "P0R 1L0"), ("Blind River", "CA", "ON", "P0R 1B0")]),
+    ("ONTARIO", 40, [("Toronto", "CA", "ON", "M5V 2T6"), ("Ottawa", "CA", "ON", "K1P 1J1"),
+                     ("Sudbury", "CA", "ON", "P3A 1S2")]),
+    ("CANADA", 35, [("Montreal", "CA", "QC", "H2X 1Y4"), ("Vancouver", "CA", "BC", "V6B 1A1"),
+                    ("Calgary", "CA", "AB", "T2P 1J9"), ("Halifax", "CA", "NS", "B3H 1A1")]),
+    ("INTERNATIONAL", 10, [("New York", "US", "NY", "10001"), ("London", "GB", "", "SW1A 1AA"),
+                           ("Paris", "FR", "", "75001")]),
+]
+ZONE_CENTS = {rate["zone"]: rate["cents"] for rate in DEFAULT_RATES}
+
+LINES_PER_ORDER = {1: 50, 2: 25, 3: 12, 4: 7, 5: 3, 6: 2, 8: 1}
+LINE_QUANTITY = {1: 60, 2: 25, 3: 10, 6: 5}
+
+# Status mix by order age in days: the first bracket the age falls under wins
+STATUS_BY_AGE = [
+    (2, {"PENDING_PAYMENT": 50, "PAID": 40, "CANCELLED": 10}),
+    (7, {"PENDING_PAYMENT": 5, "PAID": 30, "SHIPPED": 55, "CANCELLED": 10}),
+    (21, {"SHIPPED": 35, "DELIVERED": 57, "CANCELLED": 8}),
+    (None, {"DELIVERED": 93, "CANCELLED": 7}),
+]
+
+PRODUCT_GRADES = ["Golden Delicate", "Amber Rich", "Dark Robust", "Very Dark Strong", "Maple Butter", "Maple Sugar"]
+PRODUCT_SIZES = [("250ml", 900, 350), ("500ml", 1500, 650), ("1L", 2600, 1250), ("4L", 8900, 4600)]
+
+
+class Weighted:
+    """Fast repeated weighted choice from ``{value: weight}``."""
+
+    def __init__(self, weights):
+        self.values = list(weights)
+        total, self.cumulative = 0, []
+        for weight in weights.values():
+            total += weight
+            self.cumulative.append(total)
+
+    def pick(self, rng):
+        return rng.choices(self.values, cum_weights=self.cumulative)[0]
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max("pk"))["top"] or 0) + 1
+
+
+@contextmanager
+def _explicit_timestamps(*fields):
+    """Let ``bulk_create`` keep the generated values of auto_now/auto_now_add fields."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class ScaleSeeder:
+    """
+    Generate and write one synthetic data set.
+
+    The same ``seed`` and sizes always produce the same rows (ids continue
+    from whatever is already in the tables).
+    """
+
+    def __init__(self, users, orders, products=24, cart_ratio=0.1, days=730, seed=0,
+                 batch_size=SEED_BATCH_SIZE, use_copy=False, now=None, log=None):
+        self.users = users
+        self.orders = orders
+        self.products = products
+        self.cart_ratio = cart_ratio
+        self.days = days
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.now = now or timezone.now()
+        self.rng = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.lines_per_order = Weighted(LINES_PER_ORDER)
+        self.line_quantity = Weighted(LINE_QUANTITY)
+        self.zones = Weighted({index: share for index, (_, share, _) in enumerate(DESTINATIONS)})
+        self.statuses = [(max_age, Weighted(mix)) for max_age, mix in STATUS_BY_AGE]
+
+    # -- writing ---------------------------------------------------------
+
+    def _write(self, model, columns, rows):
+        rows = list(rows)
+        if not rows:
+            return 0
+        with transaction.atomic():
+            if self.use_copy:
+                self._copy(model, columns, rows)
+            else:
+                model.objects.bulk_create(
+                    [model(**dict(zip(columns, row))) for row in rows], batch_size=self.batch_size
+                )
+        return len(rows)
+
+    def _copy(self, model, columns, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(r"\N" if value is None else value for value in row)
+        buffer.seek(0)
+        db_columns = ", ".join(model._meta.get_field(column).column for column in columns)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f"COPY {model._meta.db_table} ({db_columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+            )
+
+    def _write_batched(self, model, columns, rows, label):
+        written, batch = 0, []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                written += self._write(model, columns, batch)
+                batch = []
+        written += self._write(model, columns, batch)
+        self.log(f"{label}: {written}")
+        return written
+
+    # -- generators ------------------------------------------------------
+
+    def _product_rows(self, first_id):
+        for n in range(self.products):
+            grade = PRODUCT_GRADES[n % len(PRODUCT_GRADES)]
+            size, price, weight = PRODUCT_SIZES[(n // len(PRODUCT_GRADES)) % len(PRODUCT_SIZES)]
+            batch = n // (len(PRODUCT_GRADES) * len(PRODUCT_SIZES))
+            name = f"{grade} Maple Syrup {size}" + (f" (Batch {batch + 1})" if batch else "")
+            yield (first_id + n, name, f"Synthetic {grade.lower()} syrup", price, "", True, 10 ** 6, weight)
+
+    def _user_rows(self, first_id, password):
+        for n in range(self.users):
+            user_id = first_id + n
+            joined = self.now - timedelta(days=self.days * self.rng.random())
+            yield (user_id, f"scale{user_id}", f"scale{user_id}@example.com", password,
+                   "", "", False, False, True, joined, None)
+
+    def _pick_user(self, first_user_id):
+        # Squaring skews towards low indices: a minority of customers place most orders.
+        return first_user_id + int(self.users * self.rng.random() ** 2)
+
+    def _pick_product(self):
+        # Popularity falls off with rank (roughly Zipf).
+        return int(len(self.catalog) * self.rng.random() ** 3)
+
+    def _pick_status(self, age_days):
+        for max_age, weighted in self.statuses:
+            if max_age is None or age_days < max_age:
+                return weighted.pick(self.rng)
+
+    def _order_and_item_rows(self, first_order_id, first_item_id, first_user_id):
+        item_id = first_item_id
+        for n in range(self.orders):
+            order_id = first_order_id + n
+            user_id = self._pick_user(first_user_id)
+            age_days = self.days * self.rng.random() ** 1.6
+            created_at = self.now - timedelta(days=age_days)
+            zone, _, places = DESTINATIONS[self.zones.pick(self.rng)]
+            city, country, region, postal = self.rng.choice(places)
+            address = f"{self.rng.randint(1, 9999)} Sugar Bush Rd"
+
+            items, subtotal = [], 0
+            for index in sorted({self._pick_product() for _ in range(self.lines_per_order.pick(self.rng))}):
+                product_id, name, price = self.catalog[index]
+                quantity = self.line_quantity.pick(self.rng)
+                subtotal += price * quantity
+                items.append((item_id, order_id, product_id, name, quantity, price))
+                item_id += 1
+
+            shipping = ZONE_CENTS[zone]
+            summary = ", ".join(filter(None, [address, city, region, country, postal]))
+            yield "order", (
+                order_id, user_id, subtotal + shipping, shipping, zone, address, "", city, country, region, postal,
+                summary, self._pick_status(age_days), "EMT", f"EMT-{order_id:09d}",
+                f"scale{user_id}@example.com", created_at,
+            )
+            for item in items:
+                yield "item", item
+
+    def _cart_rows(self, first_cart_id, first_user_id):
+        cart_id, carts, items = first_cart_id, [], []
+        for n in range(self.users):
+            if self.rng.random() >= self.cart_ratio:
+                continue
+            lines = {self._pick_product(): self.line_quantity.pick(self.rng) for _ in range(self.rng.randint(1, 4))}
+            subtotal = sum(self.catalog[index][2] * quantity for index, quantity in lines.items())
+            updated_at = self.now - timedelta(hours=72 * self.rng.random())
+            carts.append((cart_id, first_user_id + n, subtotal, len(lines), updated_at))
+            items.extend((cart_id, self.catalog[index][0], quantity) for index, quantity in sorted(lines.items()))
+            cart_id += 1
+        return carts, items
+
+    # -- entry point -----------------------------------------------------
+
+    def run(self):
+        """Write everything; returns ``{model label: rows written}``."""
+        if self.use_copy and connection.vendor != "postgresql":
+            raise ValueError("COPY is only available on PostgreSQL")
+
+        counts = {}
+        first_product_id = _next_id(Product)
+        counts["products"] = self._write_batched(
+            Product,
+            ["id", "name", "description", "price_cents", "image_url", "is_active", "inventory", "weight_grams"],
+            self._product_rows(first_product_id),
+            "products",
+        )
+        self.catalog = list(
+            Product.objects.filter(pk__gte=first_product_id).order_by("pk").values_list("pk", "name", "price_cents")
+        )
+
+        first_user_id = _next_id(User)
+        counts["users"] = self._write_batched(
+            User,
+            ["id", "username", "email", "password", "first_name", "last_name",
+             "is_staff", "is_superuser", "is_active", "date_joined", "last_login"],
+            self._user_rows(first_user_id, make_password(SEED_PASSWORD)),
+            "users",
+        )
+
+        carts, cart_items = self._cart_rows(_next_id(Cart), first_user_id)
+        with _explicit_timestamps(Cart._meta.get_field("updated_at")):
+            counts["carts"] = self._write_batched(
+                Cart, ["id", "owner_id", "subtotal_cents", "item_count", "updated_at"], carts, "carts"
+            )
+        counts["cart items"] = self._write_batched(
+            CartItem, ["cart_id", "product_id", "quantity"], cart_items, "cart items"
+        )
+
+        counts.update(self._write_orders(first_user_id))
+        self._reset_sequences()
+        return counts
+
+    def _write_orders(self, first_user_id):
+        order_columns = [
+            "id", "user_id", "total_cents", "shipping_cents", "shipping_zone", "shipping_address1",
+            "shipping_address2", "shipping_city", "shipping_country", "shipping_region", "shipping_postal",
+            "shipping_summary", "status", "payment_method", "payment_reference", "payer_email", "created_at",
+        ]
+        item_columns = ["id", "order_id", "product_id", "product_name", "quantity", "price_cents"]
+
+        written = {"orders": 0, "order items": 0}
+        orders, items = [], []
+
+        def flush():
+            # Orders before their items, in one transaction per batch.
+            with transaction.atomic():
+                written["orders"] += self._write(Order, order_columns, orders)
+                written["order items"] += self._write(OrderItem, item_columns, items)
+            orders.clear()
+            items.clear()
+
+        rows = self._order_and_item_rows(_next_id(Order), _next_id(OrderItem), first_user_id)
+        with _explicit_timestamps(Order._meta.get_field("created_at")):
+            for kind, row in rows:
+                if kind == "order":
+                    if len(orders) >= self.batch_size:
+                        flush()
+                        if written["orders"] % (self.batch_size * 20) == 0:
+                            self.log(f"orders: {written['orders']}")
+                    orders.append(row)
+                else:
+                    items.append(row)
+            flush()
+        self.log(f"orders: {written['orders']}, order items: {written['order items']}")
+        return written
+
+    def _reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(no_style(), [Product, User, Cart, CartItem, Order, OrderItem])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
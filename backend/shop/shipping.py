@@ -1,25 +1,260 @@
+"""
+Shipping rate engine.
+
+Rates live in the ``ShippingRate`` table and are compiled into a ``RateTable``
+(dicts keyed by country/region plus a postal-prefix trie) held in process
+memory, so estimating shipping never touches the database. The compiled
+table is rebuilt only when rates change: saving or deleting a rate bumps a
+version key in the ``shared`` cache once its transaction commits, and every
+process re-checks that key at most every ``RATE_TABLE_CHECK_SECONDS``.
+
+Each compiled table also memoizes results per normalized
+``(country, region, postal_prefix, weight)`` key in a bounded LRU, which is
+discarded along with the table whenever rates change.
+"""
+import logging
+import time
+import uuid
+from bisect import bisect_right
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+RATE_TABLE_CACHE = "shared"
+RATE_TABLE_VERSION_KEY = "shipping:rate-table-version"
+RATE_TABLE_CHECK_SECONDS = 30.0
+ESTIMATE_CACHE_SIZE = 4096
+
+# Built-in rates, used when the ShippingRate table is empty or unreadable
+# (e.g. before migrations have run). Also seeded by migration 0005.
+DEFAULT_RATES = [
+    {"zone": "INTERNATIONAL", "country": "", "region": "", "postal_prefix": "", "cents": 2999},
+    {"zone": "CANADA", "country": "CA", "region": "", "postal_prefix": "", "cents": 1299},
+    {"zone": "ONTARIO", "country": "CA", "region": "ON", "postal_prefix": "", "cents": 799},
+    {"zone": "LOCAL_RADIUS", "country": "CA", "region": "ON", "postal_prefix": "P0R", "cents": 499},
+]
+
+COUNTRY_ALIASES = {
+    "CANADA": "CA",
+}
+
+REGION_ALIASES = {
+    "ALBERTA": "AB",
+    "BRITISH COLUMBIA": "BC",
+    "MANITOBA": "MB",
+    "NEW BRUNSWICK": "NB",
+    "NEWFOUNDLAND AND LABRADOR": "NL",
+    "NOVA SCOTIA": "NS",
+    "NORTHWEST TERRITORIES": "NT",
+    "NUNAVUT": "NU",
+    "ONTARIO": "ON",
+    "PRINCE EDWARD ISLAND": "PE",
+    "QUEBEC": "QC",
+    "SASKATCHEWAN": "SK",
+    "YUKON": "YT",
+}
+
+# Trie nodes are plain dicts keyed by character; the empty string can never be
+# a postal character, so it marks a node that terminates a configured prefix.
+_TERMINAL = ""
+
+
 def _normalize(value: str) -> str:
     return (value or "").strip().upper()
 
 
-def estimate_shipping(country: str, region: str, postal: str) -> tuple[int, str]:
-    country_code = _normalize(country)
-    region_code = _normalize(region)
-    postal_code = _normalize(postal).replace(" ", "")
-    postal_prefix = postal_code[:3]
+def normalize_country(value: str) -> str:
+    code = _normalize(value)
+    return COUNTRY_ALIASES.get(code, code)
+
+
+def normalize_region(value: str) -> str:
+    code = _normalize(value)
+    return REGION_ALIASES.get(code, code)
+
+
+def normalize_postal(value: str) -> str:
+    return _normalize(value).replace(" ", "")
+
+
+class _Tiers:
+    """Weight tiers for one scope: sorted thresholds and matching (cents, zone) results."""
+
+    __slots__ = ("thresholds", "results")
+
+    def __init__(self, rows):
+        self.thresholds = [row[0] for row in rows]
+        self.results = [(row[1], row[2]) for row in rows]
+
+    def pick(self, weight_grams):
+        index = bisect_right(self.thresholds, weight_grams) - 1
+        return self.results[index if index > 0 else 0]
+
+
+def _compile_tiers(rows):
+    # A scope with a single tier compiles straight to its (cents, zone) tuple,
+    # which keeps the common lookup free of any bisecting.
+    rows = sorted(rows, key=lambda row: row[0])
+    if len(rows) == 1:
+        return (rows[0][1], rows[0][2])
+    return _Tiers(rows)
+
+
+def _insert_prefix(trie, prefix, tiers):
+    node = trie
+    for char in prefix:
+        node = node.setdefault(char, {})
+    node[_TERMINAL] = tiers
+
+
+class RateTable:
+    """Compiled, read-only view of a set of shipping rates."""
+
+    def __init__(self, rates):
+        scoped = {}
+        for rate in rates:
+            key = (
+                normalize_country(rate["country"]),
+                normalize_region(rate["region"]),
+                normalize_postal(rate["postal_prefix"]),
+            )
+            scoped.setdefault(key, []).append(
+                (rate.get("min_weight_grams", 0), rate["cents"], rate["zone"])
+            )
+
+        self.by_region = {}
+        self.by_country = {}
+        self.region_postal_tries = {}
+        self.country_postal_tries = {}
+        self.fallback = (DEFAULT_RATES[0]["cents"], DEFAULT_RATES[0]["zone"])
+
+        region_prefixes = {}
+        country_prefixes = {}
+        for (country, region, prefix), rows in scoped.items():
+            tiers = _compile_tiers(rows)
+            if prefix:
+                if region:
+                    region_prefixes.setdefault((country, region), []).append((prefix, tiers))
+                else:
+                    country_prefixes.setdefault(country, []).append((prefix, tiers))
+            elif region:
+                self.by_region[(country, region)] = tiers
+            elif country:
+                self.by_country[country] = tiers
+            else:
+                self.fallback = tiers
+
+        # Country-wide prefixes are folded into every region trie of that
+        # country so a lookup only ever walks one trie; region-specific
+        # prefixes are inserted last and win on an exact tie.
+        for country, prefixes in country_prefixes.items():
+            trie = self.country_postal_tries[country] = {}
+            for prefix, tiers in prefixes:
+                _insert_prefix(trie, prefix, tiers)
+        for (country, region), prefixes in region_prefixes.items():
+            trie = self.region_postal_tries[(country, region)] = {}
+            for prefix, tiers in [*country_prefixes.get(country, ()), *prefixes]:
+                _insert_prefix(trie, prefix, tiers)
+
+        # Only this many postal characters can influence a lookup, so longer
+        # codes are truncated before being used as a memo key.
+        self.prefix_length = max((len(prefix) for _, _, prefix in scoped), default=0)
+        self.cached_lookup = lru_cache(maxsize=ESTIMATE_CACHE_SIZE)(self.lookup)
+
+    def lookup(self, country, region, postal, weight_grams=0):
+        """Resolve already-normalized destination codes to ``(cents, zone)``."""
+        scope = (country, region)
+        tiers = None
+        node = self.region_postal_tries.get(scope) or self.country_postal_tries.get(country)
+        if node is not None:
+            for char in postal:
+                node = node.get(char)
+                if node is None:
+                    break
+                tiers = node.get(_TERMINAL, tiers)
+        if tiers is None:
+            tiers = self.by_region.get(scope) or self.by_country.get(country) or self.fallback
+        if tiers.__class__ is tuple:
+            return tiers
+        return tiers.pick(weight_grams)
+
+
+_DEFAULT_TABLE = RateTable(DEFAULT_RATES)
+_rate_table = None
+_rate_table_version = None
+_next_version_check = 0.0
+
+
+def _load_rate_table():
+    from .models import ShippingRate
+
+    rates = list(
+        ShippingRate.objects.filter(is_active=True).values(
+            "zone", "country", "region", "postal_prefix", "min_weight_grams", "cents"
+        )
+    )
+    return RateTable(rates) if rates else _DEFAULT_TABLE
+
+
+def get_rate_table() -> RateTable:
+    """Return the compiled rate table, rebuilding it if rates have changed."""
+    global _rate_table, _rate_table_version, _next_version_check
+
+    now = time.monotonic()
+    if _rate_table is not None and now < _next_version_check:
+        return _rate_table
+
+    version = caches[RATE_TABLE_CACHE].get(RATE_TABLE_VERSION_KEY)
+    if _rate_table is None or version != _rate_table_version:
+        try:
+            table = _load_rate_table()
+        except Exception as e:
+            # Table missing (not migrated yet) or database unavailable: serve the
+            # built-in rates and retry on the next call.
+            logger.warning("Falling back to default shipping rates: %s", e)
+            return _DEFAULT_TABLE
+        _rate_table = table
+        _rate_table_version = version
+    _next_version_check = now + RATE_TABLE_CHECK_SECONDS
+    return _rate_table
+
+
+def invalidate_rate_table():
+    """Force every process to rebuild its compiled rate table on next use."""
+    global _rate_table
+    caches[RATE_TABLE_CACHE].set(RATE_TABLE_VERSION_KEY, uuid.uuid4().hex, None)
+    _rate_table = None
+
+
+def _fresh_rate_table():
+    """The compiled table if it can be used without checking for changes, else None."""
+    if _rate_table is not None and time.monotonic() < _next_version_check:
+        return _rate_table
+    return None
+
+
+def _estimate(table, country, region, postal, weight_grams):
+    return table.cached_lookup(
+        normalize_country(country),
+        normalize_region(region),
+        normalize_postal(postal)[: table.prefix_length],
+        weight_grams or 0,
+    )
 
-    if country_code not in {"CA", "CANADA"}:
-        return 2999, "INTERNATIONAL"
 
-    if region_code not in {"ON", "ONTARIO"}:
-        return 1299, "CANADA"
+def estimate_shipping(country: str, region: str, postal: str, weight_grams: int = 0) -> tuple[int, str]:
+    return _estimate(get_rate_table(), country, region, postal, weight_grams)
 
-    if postal_prefix == "P0R":
-        return 499, "LOCAL_RADIUS"
 
-    return 799, "ONTARIO"
+async def aestimate_shipping(country: str, region: str, postal: str, weight_grams: int = 0) -> tuple[int, str]:
+    """``estimate_shipping`` for async callers: a rate table refresh runs off the event loop."""
+    table = _fresh_rate_table() or await sync_to_async(get_rate_table)()
+    return _estimate(table, country, region, postal, weight_grams)
 
 
-def calculate_shipping_cents(country: str, region: str, postal: str) -> int:
-    cents, _ = estimate_shipping(country, region, postal)
+def calculate_shipping_cents(country: str, region: str, postal: str, weight_grams: int = 0) -> int:
+    cents, _ = estimate_shipping(country, region, postal, weight_grams)
     return cents
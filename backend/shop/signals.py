@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .analytics import apply_order_sales, is_counted, record_status_change, rollups_frozen
+from .auth import invalidate_cached_user
+from .carts import recalculate_cart_totals
+from .events import publish_status_changes
+from .models import CartItem, Order, Product, ShippingRate
+from .shipping import invalidate_rate_table
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=ShippingRate)
+@receiver(post_delete, sender=ShippingRate)
+def rebuild_shipping_rates(sender, **kwargs):
+    # After commit, or another process could reload the old rows under the new version.
+    transaction.on_commit(invalidate_rate_table)
+
+
+@receiver(post_save, sender=Product)
+def reconcile_carts_on_price_change(sender, instance, created, **kwargs):
+    loaded_price = getattr(instance, "_loaded_price_cents", None)
+    if not created and loaded_price is not None and loaded_price != instance.price_cents:
+        recalculate_cart_totals(product_ids=[instance.pk])
+    instance._loaded_price_cents = instance.price_cents
+
+
+@receiver(pre_delete, sender=Product)
+def remember_carts_holding_product(sender, instance, **kwargs):
+    instance._affected_cart_ids = list(
+        CartItem.objects.filter(product=instance).values_list("cart_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Product)
+def reconcile_carts_on_product_delete(sender, instance, **kwargs):
+    cart_ids = getattr(instance, "_affected_cart_ids", None)
+    if cart_ids:
+        recalculate_cart_totals(cart_ids=cart_ids)
+
+
+@receiver(post_save, sender=Order)
+def order_status_changed(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and "status" not in update_fields:
+        return
+    old_status = None if created else getattr(instance, "_loaded_status", None)
+    record_status_change([instance.pk], old_status, instance.status)
+    if not created and old_status != instance.status:
+        publish_status_changes([(instance.pk, instance.user_id, instance.status)])
+    instance._loaded_status = instance.status
+
+
+@receiver(pre_delete, sender=Order)
+def remove_deleted_order_sales(sender, instance, **kwargs):
+    # Items are still present here; they cascade away right after.
+    if not rollups_frozen() and is_counted(getattr(instance, "_loaded_status", instance.status)):
+        apply_order_sales([instance.pk], sign=-1)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_jwt_user(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which nothing reads from the cached user.
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_cached_user(instance.pk)
+    # Again once committed: another process may have cached the old row under the new epoch meanwhile.
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
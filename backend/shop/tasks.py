@@ -0,0 +1,68 @@
+"""
+Minimal in-process background task runner.
+
+``enqueue`` defers a callable until the current transaction commits and then
+runs it on a small thread pool, so slow side effects (SMTP, rollups) never
+hold up the request that triggered them. With ``SHOP_TASKS_EAGER`` enabled
+(tests) tasks run inline as soon as the transaction commits.
+
+Delivery is at most once. Tasks live only in the worker's memory. When a
+worker exits cleanly (a deploy, or gunicorn recycling it) the pool finishes
+its queued tasks before the process ends, within the server's graceful
+shutdown timeout. Tasks still queued when a worker is killed (SIGKILL, the
+OOM killer, a timeout hit) are lost and never retried. Failed tasks are
+logged, not retried. Anything that must not be lost needs a persistent queue.
+"""
+import atexit
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.SHOP_TASK_WORKERS,
+            thread_name_prefix="shop-task",
+        )
+        atexit.register(shutdown)
+    return _executor
+
+
+def shutdown(wait=True):
+    """Stop the pool; with ``wait``, block until queued tasks have run. Called at interpreter exit."""
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        atexit.unregister(shutdown)
+        executor.shutdown(wait=wait)
+
+
+def _run(func, args, kwargs, eager):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(func, "__name__", func))
+    finally:
+        # Worker threads hold their own DB connections; don't leak them.
+        if not eager:
+            connections.close_all()
+
+
+def enqueue(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` in the background once the transaction commits."""
+
+    def submit():
+        if settings.SHOP_TASKS_EAGER:
+            _run(func, args, kwargs, eager=True)
+        else:
+            _get_executor().submit(_run, func, args, kwargs, False)
+
+    transaction.on_commit(submit)
@@ -4,6 +4,7 @@ Test factories for creating test data
 import factory
 from factory.django import DjangoModelFactory
 from django.contrib.auth import get_user_model
+from shop.carts import recalculate_cart_totals
 from shop.models import Product, Cart, CartItem, Order, OrderItem
 
 User = get_user_model()
@@ -48,11 +49,19 @@ class CartFactory(DjangoModelFactory):
 class CartItemFactory(DjangoModelFactory):
     class Meta:
         model = CartItem
+        skip_postgeneration_save = True
 
     cart = factory.SubFactory(CartFactory)
     product = factory.SubFactory(ProductFactory)
     quantity = 1
 
+    @factory.post_generation
+    def cart_totals(obj, create, extracted, **kwargs):
+        # Items created directly bypass the cart mutations, so reconcile the
+        # denormalized totals the way a bulk import would.
+        if create:
+            recalculate_cart_totals(cart_ids=[obj.cart_id])
+
 
 class OrderFactory(DjangoModelFactory):
     class Meta:
@@ -0,0 +1,113 @@
+"""
+Tests for the Django admin configuration
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from shop.models import Order
+from shop.paginators import EstimatedCountPaginator
+from shop.tests.factories import OrderFactory
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestOrderChangelist:
+    """Test the order changelist stays cheap as orders grow"""
+
+    def test_changelist_query_count_flat(self, admin_client, django_assert_max_num_queries):
+        """Test listing orders does not issue a query per row"""
+        buyers = User.objects.bulk_create([User(username=f"buyer{i}") for i in range(20)])
+        for buyer in buyers:
+            OrderFactory(user=buyer)
+        with django_assert_max_num_queries(12) as captured:
+            response = admin_client.get("/admin/shop/order/")
+        assert response.status_code == 200
+        user_queries = [q for q in captured.captured_queries if 'FROM "auth_user"' in q["sql"]]
+        assert len(user_queries) <= 1
+
+    def test_changelist_shows_shipping_summary(self, admin_client):
+        """Test the Ship To column comes from the stored summary"""
+        OrderFactory(
+            shipping_address1="1 Sugar Bush Rd",
+            shipping_city="Thessalon",
+            shipping_region="ON",
+            shipping_country="CA",
+            shipping_postal="P0R 1L0",
+        )
+        response = admin_client.get("/admin/shop/order/")
+        assert "1 Sugar Bush Rd, Thessalon, ON, CA, P0R 1L0" in response.content.decode()
+
+
+    def test_search_by_username_email_and_reference(self, admin_client):
+        """Test order search covers the customer, payer email and reference"""
+        buyer = User.objects.create(username="sugarshack")
+        by_user = OrderFactory(user=buyer, payer_email="a@example.com", payment_reference="EMT-1")
+        by_email = OrderFactory(payer_email="treasurer@sugarshack.ca", payment_reference="EMT-2")
+        by_reference = OrderFactory(payer_email="b@example.com", payment_reference="SUGARSHACK-42")
+        OrderFactory(payer_email="c@example.com", payment_reference="EMT-3")
+
+        response = admin_client.get("/admin/shop/order/", {"q": "sugarshack"})
+        assert response.status_code == 200
+        found = {o.pk for o in response.context["cl"].result_list}
+        assert found == {by_user.pk, by_email.pk, by_reference.pk}
+
+    def test_mark_shipped_action(self, admin_client, mailoutbox, django_capture_on_commit_callbacks):
+        """Test the bulk admin action transitions orders and batches emails"""
+        orders = OrderFactory.create_batch(3, status="PAID")
+        with django_capture_on_commit_callbacks(execute=True):
+            response = admin_client.post(
+                "/admin/shop/order/",
+                {"action": "mark_shipped", "_selected_action": [o.pk for o in orders]},
+            )
+        assert response.status_code == 302
+        assert Order.objects.filter(status="SHIPPED").count() == 3
+        assert len(mailoutbox) == 3
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestShippingSummary:
+    def test_summary_built_on_save(self):
+        """Test the stored summary skips blank address parts"""
+        order = OrderFactory(
+            shipping_address1="12 Maple Ln",
+            shipping_address2="",
+            shipping_city="Toronto",
+            shipping_region="Ontario",
+            shipping_country="Canada",
+            shipping_postal="M5H 2N2",
+        )
+        assert order.shipping_summary == "12 Maple Ln, Toronto, Ontario, Canada, M5H 2N2"
+
+    def test_summary_follows_update_fields(self):
+        """Test saving only address fields still refreshes the summary"""
+        order = OrderFactory(shipping_city="Toronto")
+        order.shipping_city = "Ottawa"
+        order.save(update_fields=["shipping_city"])
+        order.refresh_from_db()
+        assert "Ottawa" in order.shipping_summary
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestEstimatedCountPaginator:
+    def test_exact_count_without_estimate(self):
+        """Test non-PostgreSQL backends fall back to COUNT(*)"""
+        OrderFactory.create_batch(3)
+        paginator = EstimatedCountPaginator(Order.objects.order_by("pk"), 2)
+        assert paginator.count == 3
+        assert paginator.num_pages == 2
+
+    def test_large_estimate_skips_count(self, monkeypatch, django_assert_num_queries):
+        """Test estimates above the threshold are used as-is"""
+        monkeypatch.setattr(EstimatedCountPaginator, "_estimate", lambda self: 1_000_000)
+        paginator = EstimatedCountPaginator(Order.objects.order_by("pk"), 100)
+        with django_assert_num_queries(0):
+            assert paginator.count == 1_000_000
+
+    def test_small_estimate_counts_exactly(self, monkeypatch):
+        """Test small estimates are replaced by an exact count"""
+        OrderFactory.create_batch(2)
+        monkeypatch.setattr(EstimatedCountPaginator, "_estimate", lambda self: 40)
+        paginator = EstimatedCountPaginator(Order.objects.order_by("pk"), 100)
+        assert paginator.count == 2
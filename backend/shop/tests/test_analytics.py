@@ -0,0 +1,211 @@
+"""
+Tests for daily sales rollups and the sales report
+"""
+from datetime import date, datetime
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from graphene.test import Client as GrapheneClient
+from shop.models import DailySalesRollup, Order
+from shop.orders import bulk_update_order_status
+from shop.tests.factories import OrderFactory, OrderItemFactory, StaffUserFactory, UserFactory
+from syrupstore.schema import schema
+
+
+class MockContext:
+    """Mock request context for GraphQL tests"""
+    def __init__(self, user=None):
+        self.user = user
+
+
+def _placed_order(day, zone="ONTARIO", total=2799, lines=(("Dark Maple Syrup 1L", 2, 1000),)):
+    order = OrderFactory(total_cents=total, shipping_cents=799, shipping_zone=zone)
+    for name, quantity, price in lines:
+        OrderItemFactory(order=order, product_name=name, quantity=quantity, price_cents=price)
+    Order.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(datetime(*day, 12)))
+    return Order.objects.get(pk=order.pk)
+
+
+def _rollup(kind, key, day=date(2026, 3, 1)):
+    return DailySalesRollup.objects.get(day=day, kind=kind, key=key)
+
+
+def _snapshot():
+    return list(
+        DailySalesRollup.objects.exclude(orders=0, units=0).values_list(
+            "day", "kind", "key", "orders", "units", "revenue_cents", "shipping_cents"
+        )
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestIncrementalRollups:
+    def test_pending_orders_are_not_counted(self):
+        """Test unpaid orders do not appear in the rollups"""
+        _placed_order((2026, 3, 1))
+        assert not DailySalesRollup.objects.exists()
+
+    def test_paid_order_is_added(self):
+        """Test marking an order paid adds it to zone and product rollups"""
+        order = _placed_order((2026, 3, 1))
+        order.status = "PAID"
+        order.save()
+
+        zone = _rollup(DailySalesRollup.KIND_ZONE, "ONTARIO")
+        assert (zone.orders, zone.revenue_cents, zone.shipping_cents) == (1, 2799, 799)
+        product = _rollup(DailySalesRollup.KIND_PRODUCT, "Dark Maple Syrup 1L")
+        assert (product.units, product.revenue_cents) == (2, 2000)
+
+    def test_moves_between_counted_statuses_change_nothing(self, django_assert_num_queries):
+        """Test PAID -> SHIPPED leaves the rollups untouched"""
+        order = _placed_order((2026, 3, 1))
+        order.status = "PAID"
+        order.save()
+        before = _snapshot()
+
+        order.status = "SHIPPED"
+        with django_assert_num_queries(1):
+            order.save(update_fields=["status"])
+        assert _snapshot() == before
+
+    def test_cancel_removes_order(self):
+        """Test cancelling a paid order subtracts it again"""
+        order = _placed_order((2026, 3, 1))
+        order.status = "PAID"
+        order.save()
+        order.status = "CANCELLED"
+        order.save()
+
+        assert _rollup(DailySalesRollup.KIND_ZONE, "ONTARIO").orders == 0
+        assert _rollup(DailySalesRollup.KIND_PRODUCT, "Dark Maple Syrup 1L").units == 0
+
+    def test_deleting_counted_order_removes_it(self):
+        """Test deleting a paid order subtracts its sales"""
+        order = _placed_order((2026, 3, 1))
+        order.status = "PAID"
+        order.save()
+        Order.objects.get(pk=order.pk).delete()
+
+        assert _rollup(DailySalesRollup.KIND_ZONE, "ONTARIO").revenue_cents == 0
+
+    def test_bulk_status_update_adjusts_rollups(self):
+        """Test bulk transitions roll up every moved order"""
+        orders = [
+            _placed_order((2026, 3, 1)),
+            _placed_order((2026, 3, 1), zone="CANADA", total=3299),
+            _placed_order((2026, 3, 2)),
+        ]
+        bulk_update_order_status([o.id for o in orders], "PAID")
+
+        assert _rollup(DailySalesRollup.KIND_ZONE, "ONTARIO").orders == 1
+        assert _rollup(DailySalesRollup.KIND_ZONE, "CANADA").revenue_cents == 3299
+        assert _rollup(DailySalesRollup.KIND_PRODUCT, "Dark Maple Syrup 1L").units == 4
+        assert _rollup(DailySalesRollup.KIND_ZONE, "ONTARIO", day=date(2026, 3, 2)).orders == 1
+
+        bulk_update_order_status([o.id for o in orders], "CANCELLED")
+        assert not _snapshot()
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestRebuildRollups:
+    def test_rebuild_matches_incremental(self):
+        """Test a full rebuild reproduces the incrementally maintained rollups"""
+        orders = [
+            _placed_order((2026, 3, 1)),
+            _placed_order((2026, 3, 9), lines=(("Amber Syrup 500ml", 1, 1500), ("Maple Butter", 3, 900))),
+            _placed_order((2026, 4, 20), zone="INTERNATIONAL", total=5000),
+        ]
+        bulk_update_order_status([o.id for o in orders], "PAID")
+        bulk_update_order_status([orders[1].id], "DELIVERED")
+        expected = _snapshot()
+
+        DailySalesRollup.objects.all().delete()
+        call_command("rebuild_rollups", "--chunk-days", "7")
+        assert _snapshot() == expected
+
+    def test_rebuild_replaces_stale_rows_in_range(self):
+        """Test rebuilding a range discards drifted rows but keeps others"""
+        order = _placed_order((2026, 3, 1))
+        order.status = "PAID"
+        order.save()
+        DailySalesRollup.objects.create(day=date(2026, 3, 2), kind=DailySalesRollup.KIND_ZONE, key="CANADA", orders=9)
+        DailySalesRollup.objects.create(day=date(2026, 5, 1), kind=DailySalesRollup.KIND_ZONE, key="CANADA", orders=4)
+
+        call_command("rebuild_rollups", "--from", "2026-03-01", "--to", "2026-03-31")
+
+        assert not DailySalesRollup.objects.filter(day=date(2026, 3, 2)).exists()
+        assert _rollup(DailySalesRollup.KIND_ZONE, "ONTARIO").orders == 1
+        assert DailySalesRollup.objects.get(day=date(2026, 5, 1)).orders == 4
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestSalesReportQuery:
+    query = """
+        query SalesReport($from: Date!, $to: Date!) {
+            salesReport(from: $from, to: $to) {
+                orders
+                revenueCents
+                days { day orders revenueCents shippingCents }
+                products { productName units revenueCents }
+                zones { zone orders revenueCents }
+            }
+        }
+    """
+
+    def test_requires_staff(self):
+        """Test non-staff users cannot read the sales report"""
+        client = GrapheneClient(schema)
+        result = client.execute(
+            self.query,
+            variables={"from": "2026-03-01", "to": "2026-03-31"},
+            context_value=MockContext(user=UserFactory()),
+        )
+        assert "errors" in result
+
+    def test_reads_rollups_only(self, django_assert_num_queries):
+        """Test the report aggregates rollups without touching orders"""
+        orders = [
+            _placed_order((2026, 3, 1)),
+            _placed_order((2026, 3, 1), zone="CANADA", total=3299, lines=(("Maple Butter", 1, 900),)),
+            _placed_order((2026, 3, 3)),
+            _placed_order((2026, 4, 1)),
+        ]
+        bulk_update_order_status([o.id for o in orders], "PAID")
+
+        client = GrapheneClient(schema)
+        context = MockContext(user=StaffUserFactory())
+        with django_assert_num_queries(3) as captured:
+            result = client.execute(
+                self.query,
+                variables={"from": "2026-03-01", "to": "2026-03-31"},
+                context_value=context,
+            )
+        assert "errors" not in result
+        assert all("shop_order" not in q["sql"] for q in captured.captured_queries)
+
+        report = result["data"]["salesReport"]
+        assert report["orders"] == 3
+        assert report["revenueCents"] == 2799 + 3299 + 2799
+        assert report["days"] == [
+            {"day": "2026-03-01", "orders": 2, "revenueCents": 6098, "shippingCents": 1598},
+            {"day": "2026-03-03", "orders": 1, "revenueCents": 2799, "shippingCents": 799},
+        ]
+        assert report["products"][0] == {"productName": "Dark Maple Syrup 1L", "units": 4, "revenueCents": 4000}
+        assert report["zones"] == [
+            {"zone": "ONTARIO", "orders": 2, "revenueCents": 5598},
+            {"zone": "CANADA", "orders": 1, "revenueCents": 3299},
+        ]
+
+    def test_rejects_inverted_range(self):
+        """Test 'to' before 'from' is rejected"""
+        client = GrapheneClient(schema)
+        result = client.execute(
+            self.query,
+            variables={"from": "2026-03-31", "to": "2026-03-01"},
+            context_value=MockContext(user=StaffUserFactory()),
+        )
+        assert "errors" in result
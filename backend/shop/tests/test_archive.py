@@ -0,0 +1,172 @@
+"""
+Tests for order archival
+"""
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from graphene.test import Client as GrapheneClient
+from shop.archive import archive_cutoff, get_order_or_archived
+from shop.models import ArchivedOrder, ArchivedOrderItem, DailySalesRollup, Order, OrderItem
+from shop.tests.factories import OrderFactory, OrderItemFactory, UserFactory
+from syrupstore.schema import schema
+
+
+class MockContext:
+    """Mock request context for GraphQL tests"""
+    def __init__(self, user=None):
+        self.user = user
+
+
+def _order(days_ago, status="DELIVERED", **kwargs):
+    order = OrderFactory(**kwargs)
+    OrderItemFactory(order=order, product_name="Dark Maple Syrup 1L", quantity=2, price_cents=1000)
+    Order.objects.filter(pk=order.pk).update(status=status, created_at=timezone.now() - timedelta(days=days_ago))
+    return Order.objects.get(pk=order.pk)
+
+
+def _rollup_snapshot():
+    return list(DailySalesRollup.objects.values_list("day", "kind", "key", "orders", "units", "revenue_cents"))
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestArchiveOrders:
+    def test_moves_only_old_final_orders(self):
+        """Test only delivered/cancelled orders past the window are archived"""
+        delivered = _order(800)
+        cancelled = _order(900, status="CANCELLED")
+        recent = _order(10)
+        open_order = _order(800, status="SHIPPED")
+
+        call_command("archive_orders", "--days", "730")
+
+        assert set(Order.objects.values_list("pk", flat=True)) == {recent.pk, open_order.pk}
+        assert set(ArchivedOrder.objects.values_list("pk", flat=True)) == {delivered.pk, cancelled.pk}
+        archived = ArchivedOrder.objects.get(pk=delivered.pk)
+        assert archived.payer_email == delivered.payer_email
+        assert archived.created_at == delivered.created_at
+        assert archived.shipping_summary == delivered.shipping_summary
+        assert list(archived.items.values_list("product_name", "quantity")) == [("Dark Maple Syrup 1L", 2)]
+        assert not OrderItem.objects.filter(order_id=delivered.pk).exists()
+
+    def test_archives_in_batches(self):
+        """Test --batch-size and --max-batches bound the work per run"""
+        for _ in range(5):
+            _order(800)
+
+        call_command("archive_orders", "--batch-size", "2", "--max-batches", "2")
+        assert ArchivedOrder.objects.count() == 4
+        assert ArchivedOrderItem.objects.count() == 4
+
+        call_command("archive_orders", "--batch-size", "2")
+        assert ArchivedOrder.objects.count() == 5
+        assert not Order.objects.exists()
+
+    def test_dry_run_changes_nothing(self):
+        """Test --dry-run only reports"""
+        _order(800)
+        call_command("archive_orders", "--dry-run")
+        assert Order.objects.count() == 1
+        assert not ArchivedOrder.objects.exists()
+
+    def test_sales_rollups_survive_archival(self):
+        """Test archiving keeps archived sales in rollups and rebuilds"""
+        order = _order(800, status="PENDING_PAYMENT")
+        order.status = "DELIVERED"
+        order.save()
+        before = _rollup_snapshot()
+        assert before
+
+        call_command("archive_orders")
+        assert _rollup_snapshot() == before
+
+        DailySalesRollup.objects.all().delete()
+        day = timezone.localdate(order.created_at).isoformat()
+        call_command("rebuild_rollups", "--from", day, "--to", day)
+        assert _rollup_snapshot() == before
+
+    def test_default_rebuild_covers_archived_days(self):
+        """Test a plain rebuild_rollups includes days whose orders are all archived"""
+        old = _order(800, status="PENDING_PAYMENT")
+        old.status = "DELIVERED"
+        old.save()
+        recent = _order(10, status="PENDING_PAYMENT")
+        recent.status = "PAID"
+        recent.save()
+        call_command("archive_orders")
+        before = _rollup_snapshot()
+        assert {day for day, *_ in before} == {timezone.localdate(o.created_at) for o in (old, recent)}
+
+        DailySalesRollup.objects.all().delete()
+        call_command("rebuild_rollups")
+        assert sorted(_rollup_snapshot()) == sorted(before)
+
+    def test_default_cutoff_uses_setting(self, settings):
+        """Test the retention window comes from ORDER_ARCHIVE_AFTER_DAYS"""
+        settings.ORDER_ARCHIVE_AFTER_DAYS = 30
+        assert abs(timezone.now() - timedelta(days=30) - archive_cutoff()) < timedelta(seconds=5)
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestArchivedOrderHistory:
+    query = """
+        query($limit: Int, $offset: Int) {
+            orders { id status }
+            archivedOrders(limit: $limit, offset: $offset) {
+                id
+                status
+                items { productName quantity }
+            }
+        }
+    """
+
+    def test_archived_orders_are_separate(self, django_assert_max_num_queries):
+        """Test orders lists live orders and archivedOrders the archive, newest first"""
+        user = UserFactory()
+        oldest = _order(900, user=user)
+        middle = _order(800, user=user, status="CANCELLED")
+        newest = _order(1, user=user, status="PAID")
+        _order(850)  # someone else's
+        call_command("archive_orders")
+
+        client = GrapheneClient(schema)
+        with django_assert_max_num_queries(6):
+            result = client.execute(self.query, context_value=MockContext(user=user))
+
+        assert "errors" not in result
+        assert [o["id"] for o in result["data"]["orders"]] == [str(newest.pk)]
+        archived = result["data"]["archivedOrders"]
+        assert [o["id"] for o in archived] == [str(middle.pk), str(oldest.pk)]
+        assert archived[1]["status"] == "DELIVERED"
+        assert archived[1]["items"] == [{"productName": "Dark Maple Syrup 1L", "quantity": 2}]
+
+    def test_archived_orders_are_paginated(self):
+        """Test archivedOrders pages with limit/offset and caps the page size"""
+        user = UserFactory()
+        orders = [_order(800 - n, user=user) for n in range(3)]
+        call_command("archive_orders")
+        newest_first = [str(o.pk) for o in reversed(orders)]
+
+        client = GrapheneClient(schema)
+        pages = [
+            client.execute(self.query, variables={"limit": 2, "offset": offset}, context_value=MockContext(user=user))
+            for offset in (0, 2)
+        ]
+        assert [[o["id"] for o in page["data"]["archivedOrders"]] for page in pages] == [
+            newest_first[:2], newest_first[2:],
+        ]
+
+        result = client.execute(self.query, variables={"limit": 10_000}, context_value=MockContext(user=user))
+        assert [o["id"] for o in result["data"]["archivedOrders"]] == newest_first
+
+    def test_lookup_falls_back_to_archive(self):
+        """Test single-order lookups find archived orders"""
+        order = _order(800)
+        call_command("archive_orders")
+
+        assert isinstance(get_order_or_archived(id=order.pk, user=order.user), ArchivedOrder)
+        with pytest.raises(Order.DoesNotExist):
+            get_order_or_archived(id=order.pk, user=UserFactory())
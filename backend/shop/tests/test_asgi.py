@@ -0,0 +1,173 @@
+"""
+Tests for the ASGI GraphQL view and async resolvers
+"""
+import json
+import logging
+
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIHandler
+from django.test import AsyncClient, AsyncRequestFactory
+from graphql_jwt.shortcuts import get_token
+from shop import receipts
+from shop.tests.factories import OrderFactory, OrderItemFactory, StaffUserFactory, UserFactory
+from syrupstore.profiling import issue_token, load_profile
+from syrupstore.schema import schema
+from syrupstore.views import AsyncGraphQLView, RateLimitedGraphQLView
+
+
+def _execute(query, variables=None, token=None):
+    request = AsyncRequestFactory().post(
+        "/graphql/",
+        json.dumps({"query": query, "variables": variables or {}}),
+        content_type="application/json",
+        headers={"Authorization": f"JWT {token}"} if token else None,
+    )
+    request.user = AnonymousUser()
+    response = async_to_sync(AsyncGraphQLView.as_view(schema=schema))(request)
+    return response.status_code, json.loads(response.content)
+
+
+@pytest.fixture
+def pdf_service(monkeypatch):
+    """Route pdf-service calls to an in-memory handler"""
+    calls = []
+
+    def handler(request):
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, json={"filename": "receipt-1.pdf"})
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(receipts, "_async_client", lambda: httpx.AsyncClient(transport=transport))
+    monkeypatch.setattr(receipts, "_sync_client", lambda: httpx.Client(transport=transport))
+    return calls
+
+
+@pytest.fixture
+def no_sync_fallback(monkeypatch):
+    """Fail if the request is handed to the synchronous view"""
+    def fail(*args, **kwargs):
+        raise AssertionError("handled by the sync view")
+
+    monkeypatch.setattr(RateLimitedGraphQLView, "dispatch", fail)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.integration
+class TestAsyncGraphQLView:
+    def test_view_is_async(self):
+        """Test the view is dispatched as a coroutine under ASGI"""
+        assert AsyncGraphQLView.view_is_async
+
+    def test_async_operation(self, no_sync_fallback):
+        """Test an operation made of async-aware root fields runs on the loop"""
+        status, result = _execute(
+            'query { shippingEstimate(country: "CA", region: "ON", postal: "P0R 1B0") { cents zone } }'
+        )
+        assert status == 200
+        assert result["data"]["shippingEstimate"] == {"cents": 499, "zone": "LOCAL_RADIUS"}
+
+    def test_sync_operation_falls_back_to_thread(self):
+        """Test ORM-backed operations still resolve through the sync view"""
+        user = UserFactory()
+        status, result = _execute("query { me { username } }", token=get_token(user))
+        assert status == 200
+        assert result["data"]["me"]["username"] == user.username
+
+    def test_validation_errors(self):
+        """Test invalid async operations report errors with a 400"""
+        status, result = _execute("query { shippingEstimate { cents } }")
+        assert status == 400
+        assert "errors" in result
+
+    def test_generate_receipt_awaits_pdf_service(self, pdf_service, no_sync_fallback):
+        """Test generateReceipt calls pdf-service through the async client"""
+        user = UserFactory()
+        order = OrderFactory(user=user)
+        OrderItemFactory(order=order, quantity=2)
+
+        status, result = _execute(
+            "mutation($id: ID!) { generateReceipt(orderId: $id) { success message filename } }",
+            {"id": order.id},
+            token=get_token(user),
+        )
+        assert status == 200
+        assert result["data"]["generateReceipt"] == {
+            "success": True,
+            "message": "Receipt generated successfully",
+            "filename": "receipt-1.pdf",
+        }
+        assert pdf_service[0]["order_id"] == order.id
+        assert pdf_service[0]["items"][0]["quantity"] == 2
+
+    def test_generate_receipt_hides_other_users_orders(self, pdf_service):
+        """Test generateReceipt on the async path still scopes orders to the caller"""
+        order = OrderFactory()
+        status, result = _execute(
+            "mutation($id: ID!) { generateReceipt(orderId: $id) { success message } }",
+            {"id": order.id},
+            token=get_token(UserFactory()),
+        )
+        assert result["data"]["generateReceipt"] == {"success": False, "message": "Order not found"}
+        assert not pdf_service
+
+    def test_generate_receipt_requires_authentication(self, pdf_service):
+        """Test anonymous generateReceipt is refused without calling pdf-service"""
+        status, result = _execute("mutation { generateReceipt(orderId: 1) { success message } }")
+        assert result["data"]["generateReceipt"]["message"] == "Authentication required"
+        assert not pdf_service
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestGenerateReceiptSync:
+    def test_generate_receipt_under_wsgi(self, client, pdf_service):
+        """Test the sync view keeps using the blocking pdf-service client"""
+        user = UserFactory()
+        order = OrderFactory(user=user)
+        response = client.post(
+            "/graphql/",
+            json.dumps({"query": "mutation($id: ID!) { generateReceipt(orderId: $id) { success filename } }",
+                        "variables": {"id": order.id}}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"JWT {get_token(user)}",
+        )
+        assert response.json()["data"]["generateReceipt"] == {"success": True, "filename": "receipt-1.pdf"}
+        assert pdf_service[0]["order_id"] == order.id
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.integration
+class TestAsyncMiddleware:
+    @pytest.fixture(autouse=True)
+    def all_middleware(self, settings):
+        settings.MIDDLEWARE = ["syrupstore.middleware.QueryCountMiddleware", *settings.MIDDLEWARE]
+        settings.RATELIMIT_ENABLE = False
+
+    def _post(self, query, **headers):
+        return async_to_sync(AsyncClient().post)(
+            "/graphql/", json.dumps({"query": query}), content_type="application/json", headers=headers
+        )
+
+    def test_chain_stays_async(self, caplog):
+        """Test no middleware forces the ASGI chain onto a thread"""
+        with caplog.at_level(logging.DEBUG, logger="django.request"):
+            ASGIHandler()
+        assert not [r for r in caplog.records if "adapted" in r.getMessage()]
+
+    def test_headers_and_query_count(self):
+        """Test header, compression and query-count middleware run on the async path"""
+        user = UserFactory()
+        response = self._post("{ me { username } }", Authorization=f"JWT {get_token(user)}")
+        assert response.status_code == 200
+        assert response["X-Content-Type-Options"] == "nosniff"
+        assert int(response["X-DB-Queries"]) >= 1
+
+    def test_profiled_request(self, settings, tmp_path):
+        """Test a profiling token still profiles requests served through the async chain"""
+        settings.PROFILE_DIR = str(tmp_path)
+        response = self._post("{ products { id } }", **{"X-Profile-Token": issue_token(StaffUserFactory())})
+        assert response.status_code == 200
+        assert load_profile(response["X-Profile-Id"])["metadata"]["status"] == 200
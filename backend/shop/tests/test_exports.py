@@ -0,0 +1,114 @@
+"""
+Tests for streaming order exports
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import AsyncClient
+from django.utils import timezone
+from graphql_jwt.shortcuts import get_token
+from shop.models import Order
+from shop.tests.factories import OrderFactory, OrderItemFactory, StaffUserFactory, UserFactory
+
+
+def _set_created(order, year, month, day):
+    Order.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(datetime(year, month, day, 12)))
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestExportView:
+    url = "/api/admin/orders/export/"
+
+    def _staff_headers(self):
+        return {"HTTP_AUTHORIZATION": f"JWT {get_token(StaffUserFactory())}"}
+
+    def test_requires_authentication(self, client):
+        """Test anonymous requests are rejected"""
+        assert client.get(self.url).status_code == 401
+
+    def test_requires_staff(self, client):
+        """Test non-staff users cannot export"""
+        headers = {"HTTP_AUTHORIZATION": f"JWT {get_token(UserFactory())}"}
+        assert client.get(self.url, **headers).status_code == 403
+
+    def test_streams_csv(self, client):
+        """Test CSV export streams a header plus one row per order"""
+        order = OrderFactory(total_cents=2799, shipping_cents=799)
+        OrderItemFactory(order=order, product_name="Dark Maple Syrup 1L", quantity=2)
+        OrderFactory()
+
+        response = client.get(self.url, **self._staff_headers())
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"].startswith("text/csv")
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        assert len(rows) == 2
+        assert rows[0]["id"] == str(order.id)
+        assert rows[0]["subtotal_cents"] == "2000"
+        assert rows[0]["items"] == "Dark Maple Syrup 1L x2"
+
+    def test_ndjson_with_filters(self, client):
+        """Test status and inclusive date filters on NDJSON export"""
+        match = OrderFactory(status="PAID")
+        _set_created(match, 2026, 3, 31)
+        _set_created(OrderFactory(status="PAID"), 2026, 4, 1)
+        _set_created(OrderFactory(status="SHIPPED"), 2026, 3, 15)
+
+        response = client.get(
+            self.url,
+            {"format": "ndjson", "status": "PAID", "from": "2026-03-01", "to": "2026-03-31"},
+            **self._staff_headers(),
+        )
+        assert response.status_code == 200
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [match.id]
+
+    def test_streams_under_asgi(self):
+        """Test ASGI clients get an async stream of batched rows rather than a buffered body"""
+        orders = OrderFactory.create_batch(3)
+        headers = {"Authorization": self._staff_headers()["HTTP_AUTHORIZATION"]}
+
+        async def export():
+            response = await AsyncClient().get(self.url, {"format": "ndjson"}, headers=headers)
+            return response, [chunk async for chunk in response.streaming_content]
+
+        response, chunks = async_to_sync(export)()
+        assert response.is_async
+        lines = b"".join(chunks).decode().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [o.id for o in orders]
+
+    def test_invalid_filter(self, client):
+        """Test bad filter values return 400 before streaming starts"""
+        response = client.get(self.url, {"from": "yesterday"}, **self._staff_headers())
+        assert response.status_code == 400
+        response = client.get(self.url, {"format": "xml"}, **self._staff_headers())
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestExportCommand:
+    def test_export_to_stdout(self):
+        """Test the management command writes NDJSON to stdout"""
+        orders = OrderFactory.create_batch(3)
+        out = io.StringIO()
+        call_command("export_orders", "--format", "ndjson", "--chunk-size", "2", stdout=out)
+        ids = [json.loads(line)["id"] for line in out.getvalue().splitlines()]
+        assert ids == [o.id for o in orders]
+
+    def test_export_to_file(self, tmp_path):
+        """Test exporting CSV to a file reports the order count"""
+        OrderFactory.create_batch(2, status="DELIVERED")
+        OrderFactory(status="CANCELLED")
+        target = tmp_path / "orders.csv"
+        err = io.StringIO()
+        call_command("export_orders", "--status", "DELIVERED", "--output", str(target), stderr=err)
+        assert len(target.read_text().splitlines()) == 3
+        assert "Exported 2 orders" in err.getvalue()
@@ -1,8 +1,12 @@
 """
 Unit tests for Django models
 """
+from datetime import timedelta
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from shop.carts import recalculate_cart_totals
 from shop.models import Product, Cart, CartItem, Order, OrderItem
 from shop.tests.factories import (
     UserFactory,
@@ -73,6 +77,58 @@ class TestCart:
         assert cart.items.count() == 2
 
 
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestCartTotals:
+    def test_totals_follow_price_change(self):
+        """Test changing a product price reconciles carts holding it"""
+        product = ProductFactory(price_cents=1000)
+        cart = CartFactory()
+        CartItemFactory(cart=cart, product=product, quantity=3)
+
+        product.price_cents = 1200
+        product.save()
+
+        cart.refresh_from_db()
+        assert cart.subtotal_cents == 3600
+
+    def test_inventory_change_skips_reconcile(self, django_assert_num_queries):
+        """Test saving a product without a price change does not touch carts"""
+        product = ProductFactory()
+        product = Product.objects.get(pk=product.pk)
+        product.inventory += 1
+        with django_assert_num_queries(1):
+            product.save()
+
+    def test_totals_follow_product_delete(self):
+        """Test deleting a product removes its lines from cart totals"""
+        keep = ProductFactory(price_cents=500)
+        drop = ProductFactory(price_cents=900)
+        cart = CartFactory()
+        CartItemFactory(cart=cart, product=keep)
+        CartItemFactory(cart=cart, product=drop)
+
+        drop.delete()
+
+        cart.refresh_from_db()
+        assert cart.subtotal_cents == 500
+        assert cart.item_count == 1
+
+    def test_recalculate_all_carts(self):
+        """Test bulk recalculation repairs drifted totals"""
+        cart = CartFactory()
+        CartItemFactory(cart=cart, product=ProductFactory(price_cents=700), quantity=2)
+        stale = timezone.now() - timedelta(days=1)
+        Cart.objects.filter(pk=cart.pk).update(subtotal_cents=1, item_count=9, updated_at=stale)
+
+        assert recalculate_cart_totals() == 1
+
+        cart.refresh_from_db()
+        assert cart.subtotal_cents == 1400
+        assert cart.item_count == 1
+        assert cart.updated_at > stale
+
+
 @pytest.mark.django_db
 @pytest.mark.unit
 class TestCartItem:
@@ -0,0 +1,156 @@
+"""
+Tests for the order status SSE stream
+"""
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core import signing
+from django.test import AsyncClient
+from graphql_jwt.shortcuts import get_token
+from graphene.test import Client as GrapheneClient
+from shop.events import broker, issue_stream_ticket, stream_ticket_user
+from shop.models import Order
+from shop.orders import bulk_update_order_status
+from shop.tests.factories import OrderFactory, UserFactory
+from syrupstore.schema import schema
+
+URL = "/api/orders/events/"
+
+
+class MockContext:
+    """Mock request context for GraphQL tests"""
+    def __init__(self, user=None):
+        self.user = user
+
+
+def _parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+def _set_status(order_id, status):
+    order = Order.objects.get(pk=order_id)
+    order.status = status
+    order.save()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.integration
+class TestOrderEventStream:
+    def test_snapshot_then_status_changes(self):
+        """Test the stream opens with current statuses and pushes the caller's changes"""
+        user = UserFactory()
+        order = OrderFactory(user=user)
+        other = OrderFactory()
+
+        async def scenario():
+            response = await AsyncClient().get(URL, {"ticket": issue_stream_ticket(user)})
+            stream = aiter(response.streaming_content)
+            chunks = [await anext(stream), await anext(stream)]
+            await sync_to_async(_set_status)(other.pk, "SHIPPED")
+            await sync_to_async(_set_status)(order.pk, "PAID")
+            chunks.append(await anext(stream))
+            await stream.aclose()
+            return response, chunks
+
+        response, chunks = async_to_sync(scenario)()
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/event-stream"
+        assert chunks[0].startswith(b"retry: ")
+        assert _parse(chunks[1]) == ("snapshot", [{"id": order.pk, "status": "PENDING_PAYMENT"}])
+        assert _parse(chunks[2]) == ("status", {"id": order.pk, "status": "PAID"})
+        assert broker.subscriber_count(user.pk) == 0
+
+    def test_bulk_status_updates_are_pushed(self):
+        """Test bulk transitions reach the owners' streams"""
+        user = UserFactory()
+        orders = [OrderFactory(user=user, status="PAID") for _ in range(2)]
+
+        async def scenario():
+            response = await AsyncClient().get(URL, headers={"Authorization": f"JWT {get_token(user)}"})
+            stream = aiter(response.streaming_content)
+            await anext(stream)
+            await anext(stream)
+            await sync_to_async(bulk_update_order_status)([o.pk for o in orders], "SHIPPED")
+            events = [_parse(await anext(stream)) for _ in orders]
+            await stream.aclose()
+            return events
+
+        assert sorted(async_to_sync(scenario)(), key=lambda e: e[1]["id"]) == [
+            ("status", {"id": o.pk, "status": "SHIPPED"}) for o in orders
+        ]
+
+    def test_keepalive_and_max_duration(self, settings):
+        """Test idle streams send keepalives and end so clients reconnect"""
+        settings.ORDER_EVENTS_KEEPALIVE_SECONDS = 0.05
+        settings.ORDER_EVENTS_MAX_SECONDS = 0.2
+        user = UserFactory()
+
+        async def scenario():
+            response = await AsyncClient().get(URL, {"ticket": issue_stream_ticket(user)})
+            return [chunk async for chunk in response.streaming_content]
+
+        chunks = async_to_sync(scenario)()
+        assert b": keepalive\n\n" in chunks[2:]
+        assert broker.subscriber_count(user.pk) == 0
+
+    def test_requires_authentication(self):
+        """Test anonymous and invalid-ticket requests are refused"""
+        client = AsyncClient()
+        assert async_to_sync(client.get)(URL).status_code == 401
+        assert async_to_sync(client.get)(URL, {"ticket": "not-a-ticket"}).status_code == 401
+
+    def test_jwt_not_accepted_in_url(self):
+        """Test the long-lived JWT is refused in the query string"""
+        token = get_token(UserFactory())
+        client = AsyncClient()
+        assert async_to_sync(client.get)(URL, {"token": token}).status_code == 401
+        assert async_to_sync(client.get)(URL, {"ticket": token}).status_code == 401
+
+    def test_expired_ticket(self, settings, monkeypatch):
+        """Test tickets only open streams within ORDER_EVENTS_TICKET_MAX_AGE"""
+        settings.ORDER_EVENTS_TICKET_MAX_AGE = 60
+        user = UserFactory()
+        ticket = issue_stream_ticket(user)
+        later = time.time() + 61
+        monkeypatch.setattr(signing, "time", SimpleNamespace(time=lambda: later))
+        assert async_to_sync(AsyncClient().get)(URL, {"ticket": ticket}).status_code == 401
+
+    def test_inactive_user_ticket(self):
+        """Test a ticket stops working once its user is deactivated"""
+        user = UserFactory()
+        ticket = issue_stream_ticket(user)
+        user.is_active = False
+        user.save()
+        assert async_to_sync(AsyncClient().get)(URL, {"ticket": ticket}).status_code == 401
+
+    def test_refused_under_wsgi(self, client):
+        """Test the sync server refuses streams instead of pinning a worker"""
+        response = client.get(URL, {"ticket": issue_stream_ticket(UserFactory())})
+        assert response.status_code == 503
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestOrderEventsTicket:
+    MUTATION = "mutation { orderEventsTicket { ticket expiresIn } }"
+
+    def test_issues_ticket_for_user(self, settings):
+        """Test the mutation returns a ticket for the caller"""
+        settings.ORDER_EVENTS_TICKET_MAX_AGE = 60
+        user = UserFactory()
+        result = GrapheneClient(schema).execute(self.MUTATION, context_value=MockContext(user=user))
+        assert "errors" not in result
+        data = result["data"]["orderEventsTicket"]
+        assert data["expiresIn"] == 60
+        assert stream_ticket_user(data["ticket"]) == user
+
+    def test_requires_login(self):
+        """Test anonymous callers get no ticket"""
+        result = GrapheneClient(schema).execute(self.MUTATION, context_value=MockContext(user=AnonymousUser()))
+        assert "errors" in result
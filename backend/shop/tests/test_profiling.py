@@ -0,0 +1,174 @@
+"""
+Tests for staff request profiling (X-Profile-Token, the profile ring buffer and manage.py profiles)
+"""
+import io
+import json
+import threading
+import time
+
+import pytest
+from django.core import signing
+from django.core.management import CommandError, call_command
+from shop.tests.factories import StaffUserFactory, UserFactory
+from syrupstore.profiling import (
+    Sampler,
+    collapsed_stacks,
+    issue_token,
+    load_profile,
+    profile_ids,
+    save_profile,
+    token_user,
+)
+
+QUERY = json.dumps({"query": "query Catalog { products { id } }", "operationName": "Catalog"})
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(settings, tmp_path):
+    settings.PROFILE_DIR = str(tmp_path / "profiles")
+    settings.PROFILE_BUFFER_SIZE = 3
+    settings.RATELIMIT_ENABLE = False
+    return settings.PROFILE_DIR
+
+
+def _profile(name="p"):
+    return {
+        "name": name,
+        "metadata": {"operations": []},
+        "shared": {"frames": [{"name": "main", "file": "/app/a.py", "line": 1},
+                              {"name": "Query.resolve", "file": "/app/b.py", "line": 7}]},
+        "profiles": [{"samples": [[0, 1], [0, 1], [0]], "weights": [1.0, 2.0, 0.5]}],
+    }
+
+
+def _sleeper(seconds):
+    time.sleep(seconds)
+
+
+@pytest.mark.unit
+class TestSampler:
+    def test_samples_the_target_thread(self):
+        """Test the sampler records the stacks of the thread it watches, root first"""
+        worker = threading.Thread(target=_sleeper, args=(0.05,))
+        worker.start()
+        with Sampler(worker.ident, 0.001) as sampler:
+            worker.join()
+
+        profile = sampler.speedscope("sleep", {})["profiles"][0]
+        assert profile["type"] == "sampled"
+        assert len(profile["samples"]) == len(profile["weights"]) > 0
+        names = [frame[0] for frame in sampler.frames]
+        assert "_sleeper" in names
+        assert names[profile["samples"][0][-1]] == "_sleeper"
+
+    def test_collapsed_stacks(self):
+        """Test speedscope samples fold into flamegraph.pl lines weighted in microseconds"""
+        assert collapsed_stacks(_profile()) == (
+            "main (a.py:1);Query.resolve (b.py:7) 3000\n"
+            "main (a.py:1) 500\n"
+        )
+
+
+@pytest.mark.unit
+class TestRingBuffer:
+    def test_keeps_newest_profiles(self):
+        """Test saving past PROFILE_BUFFER_SIZE drops the oldest profiles"""
+        ids = [save_profile(_profile(str(n))) for n in range(5)]
+
+        assert profile_ids() == ids[2:]
+        assert load_profile(ids[0]) is None
+        assert load_profile(ids[4])["name"] == "4"
+
+    def test_rejects_paths(self):
+        """Test profile ids cannot name files outside the buffer"""
+        assert load_profile("../settings") is None
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestProfilingMiddleware:
+    def _post(self, client, **headers):
+        return client.post("/graphql/", QUERY, content_type="application/json", **headers)
+
+    def test_staff_token_profiles_request(self, client):
+        """Test a staff token stores a speedscope profile of the request"""
+        staff = StaffUserFactory()
+        response = self._post(client, HTTP_X_PROFILE_TOKEN=issue_token(staff))
+
+        assert response.status_code == 200
+        profile = load_profile(response["X-Profile-Id"])
+        assert profile["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+        assert profile["name"] == "POST /graphql/ Catalog"
+        assert profile["metadata"]["user"] == staff.username
+        assert profile["metadata"]["status"] == 200
+        assert profile["metadata"]["operations"] == ["Catalog"]
+
+    def test_requests_without_token_are_not_profiled(self, client):
+        """Test ordinary requests pass straight through"""
+        response = self._post(client)
+        assert "X-Profile-Id" not in response
+        assert profile_ids() == []
+
+    def test_invalid_tokens_are_ignored(self, client):
+        """Test tampered tokens and tokens of users no longer staff do not profile"""
+        staff = StaffUserFactory()
+        token = issue_token(staff)
+        assert "X-Profile-Id" not in self._post(client, HTTP_X_PROFILE_TOKEN=token + "x")
+
+        staff.is_staff = False
+        staff.save()
+        assert "X-Profile-Id" not in self._post(client, HTTP_X_PROFILE_TOKEN=token)
+        assert profile_ids() == []
+
+    def test_tokens_expire(self, settings):
+        """Test tokens older than PROFILE_TOKEN_MAX_AGE are refused"""
+        staff = StaffUserFactory()
+        token = issue_token(staff)
+        assert token_user(token) == staff
+        settings.PROFILE_TOKEN_MAX_AGE = -1
+        assert token_user(token) is None
+
+    def test_only_staff_get_tokens(self):
+        """Test tokens cannot be issued to customers"""
+        with pytest.raises(ValueError):
+            issue_token(UserFactory())
+        assert token_user(signing.dumps({"user": UserFactory().pk}, salt="syrupstore.profiling")) is None
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestProfilesCommand:
+    def _call(self, *args):
+        out = io.StringIO()
+        call_command("profiles", *args, stdout=out)
+        return out.getvalue()
+
+    def test_list_and_get(self, client, tmp_path):
+        """Test profiles are listed newest first and written out in both formats"""
+        staff = StaffUserFactory(username="ops")
+        headers = {"HTTP_X_PROFILE_TOKEN": issue_token(staff)}
+        first = client.post("/graphql/", QUERY, content_type="application/json", **headers)["X-Profile-Id"]
+        second = client.get("/livez", **headers)["X-Profile-Id"]
+
+        lines = self._call("list").splitlines()
+        assert [line.split()[0] for line in lines] == [second, first]
+        assert "POST /graphql/ Catalog  200" in lines[1] and lines[1].endswith("ops")
+
+        assert json.loads(self._call("get", first))["metadata"]["path"] == "/graphql/"
+        target = tmp_path / "profile.folded"
+        self._call("get", first, "--format", "collapsed", "--output", str(target))
+        assert target.read_text() == collapsed_stacks(load_profile(first))
+
+    def test_get_missing_profile(self):
+        """Test asking for a profile that left the buffer fails"""
+        with pytest.raises(CommandError, match="No stored profile"):
+            self._call("get", "nope")
+
+    def test_token(self):
+        """Test the command issues tokens for staff only"""
+        staff = StaffUserFactory(username="ops")
+        assert token_user(self._call("token", "ops").strip()) == staff
+
+        UserFactory(username="customer")
+        with pytest.raises(CommandError, match="not staff"):
+            self._call("token", "customer")
@@ -0,0 +1,95 @@
+"""
+Tests for selection-aware queryset projection in GraphQL list resolvers
+"""
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from graphene.test import Client as GrapheneClient
+from shop.models import Order
+from shop.tests.factories import OrderFactory, OrderItemFactory, ProductFactory, StaffUserFactory, UserFactory
+from syrupstore.schema import schema
+
+
+class MockContext:
+    """Mock request context for GraphQL tests"""
+    def __init__(self, user=None):
+        self.user = user
+
+
+def _execute(query, user, django_assert_num_queries, queries):
+    with django_assert_num_queries(queries) as captured:
+        result = GrapheneClient(schema).execute(query, context_value=MockContext(user=user))
+    assert result.get("errors") is None
+    return result["data"], [q["sql"] for q in captured.captured_queries]
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestProjection:
+    def test_products_load_selected_columns(self, django_assert_num_queries):
+        """Test products skip columns the query did not ask for"""
+        ProductFactory.create_batch(3)
+
+        data, sql = _execute(
+            "query { products { id name priceCents } }", UserFactory(), django_assert_num_queries, 1
+        )
+
+        assert len(data["products"]) == 3
+        assert '"price_cents"' in sql[0]
+        assert '"description"' not in sql[0]
+
+    def test_admin_orders_join_only_what_is_selected(self, django_assert_num_queries):
+        """Test adminOrders selects user and items only when asked, in a fixed number of queries"""
+        for _ in range(4):
+            OrderItemFactory.create_batch(2, order=OrderFactory())
+        staff = StaffUserFactory()
+
+        data, sql = _execute(
+            "query { adminOrders { id status user { username } items { quantity product { name } } } }",
+            staff, django_assert_num_queries, 2,
+        )
+        assert len(data["adminOrders"]) == 4
+        assert all(o["user"]["username"] and len(o["items"]) == 2 for o in data["adminOrders"])
+        assert '"shipping_address1"' not in sql[0]
+        assert '"description"' not in sql[1]
+
+        data, sql = _execute("query { adminOrders { id totalCents } }", staff, django_assert_num_queries, 1)
+        assert len(data["adminOrders"]) == 4
+        assert "JOIN" not in sql[0]
+
+    def test_fragments_are_merged(self, django_assert_num_queries):
+        """Test fields requested through fragments are loaded up front"""
+        OrderItemFactory(order=OrderFactory(shipping_city="Thessalon"))
+        query = """
+        query { adminOrders { id ...Where items { id } ... on OrderType { items { productName } } } }
+        fragment Where on OrderType { shippingCity }
+        """
+
+        data, _ = _execute(query, StaffUserFactory(), django_assert_num_queries, 2)
+        order = data["adminOrders"][0]
+        assert order["shippingCity"] == "Thessalon"
+        assert order["items"][0]["productName"]
+
+    def test_order_history_with_archive(self, django_assert_num_queries):
+        """Test live and archived order history load without per-order queries"""
+        user = UserFactory()
+        old = OrderFactory(user=user, status="DELIVERED")
+        OrderItemFactory(order=old)
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=800))
+        call_command("archive_orders")
+        recent = [OrderFactory(user=user) for _ in range(3)]
+        for order in recent:
+            OrderItemFactory.create_batch(2, order=order)
+
+        data, _ = _execute(
+            "query { orders { id status items { quantity product { name } } }"
+            " archivedOrders { id items { quantity product { name } } } }",
+            user, django_assert_num_queries, 4,
+        )
+
+        assert [int(o["id"]) for o in data["orders"]] == [o.pk for o in reversed(recent)]
+        assert [len(o["items"]) for o in data["orders"]] == [2, 2, 2]
+        assert [int(o["id"]) for o in data["archivedOrders"]] == [old.pk]
+        assert len(data["archivedOrders"][0]["items"]) == 1
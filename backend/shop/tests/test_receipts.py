@@ -0,0 +1,159 @@
+"""
+Tests for receipt downloads proxied from pdf-service
+"""
+import json
+from datetime import timedelta
+
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import AsyncClient
+from django.utils import timezone
+from graphql_jwt.shortcuts import get_token
+from shop import receipts
+from shop.models import Order
+from shop.tests.factories import OrderFactory, OrderItemFactory, UserFactory
+
+PDF = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+
+class FakePdfService:
+    """In-memory pdf-service: stores generated receipts and serves byte ranges"""
+
+    def __init__(self):
+        self.stored = {}
+        self.requests = []
+        self.payloads = []
+
+    def __call__(self, request):
+        self.requests.append((request.method, request.url.path, request.headers.get("range")))
+        if request.method == "POST":
+            self.payloads.append(json.loads(request.content))
+            order_id = self.payloads[-1]["order_id"]
+            self.stored[order_id] = PDF
+            return httpx.Response(200, json={"success": True, "filename": f"receipt-order-{order_id}.pdf"})
+
+        order_id = int(request.url.path.split("/")[2])
+        if order_id not in self.stored:
+            return httpx.Response(404, json={"detail": "Receipt not found"})
+        data = self.stored[order_id]
+        byte_range = request.headers.get("range")
+        if byte_range:
+            start, end = (int(n) for n in byte_range[len("bytes="):].split("-"))
+            return httpx.Response(
+                206,
+                content=data[start:end + 1],
+                headers={"Content-Range": f"bytes {start}-{end}/{len(data)}", "Accept-Ranges": "bytes"},
+            )
+        return httpx.Response(200, content=data, headers={"Accept-Ranges": "bytes"})
+
+
+@pytest.fixture
+def pdf_service(monkeypatch):
+    service = FakePdfService()
+    transport = httpx.MockTransport(service)
+    monkeypatch.setattr(receipts, "_sync_client", lambda: httpx.Client(transport=transport))
+    return service
+
+
+def _download(client, order, user=None, **headers):
+    if user is not None:
+        headers["HTTP_AUTHORIZATION"] = f"JWT {get_token(user)}"
+    return client.get(f"/api/receipts/download/{order.pk}/", **headers)
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestReceiptDownload:
+    def test_generates_once_then_streams_stored_receipt(self, client, pdf_service):
+        """Test the first download generates the receipt and later ones just stream it"""
+        order = OrderFactory()
+        OrderItemFactory(order=order)
+
+        first = _download(client, order, order.user)
+        second = _download(client, order, order.user)
+
+        assert first.status_code == second.status_code == 200
+        assert b"".join(first.streaming_content) == PDF
+        assert b"".join(second.streaming_content) == PDF
+        assert first["Content-Type"] == "application/pdf"
+        assert first["Content-Disposition"] == f'attachment; filename="Maple-Syrup-Order-{order.pk}-Receipt.pdf"'
+        assert [r[0] for r in pdf_service.requests] == ["GET", "POST", "GET", "GET"]
+
+    def test_forwards_byte_ranges(self, client, pdf_service):
+        """Test Range requests are passed through and answered with 206"""
+        order = OrderFactory()
+        pdf_service.stored[order.pk] = PDF
+
+        response = _download(client, order, order.user, HTTP_RANGE="bytes=9-18")
+
+        assert response.status_code == 206
+        assert response["Content-Range"] == f"bytes 9-18/{len(PDF)}"
+        assert b"".join(response.streaming_content) == PDF[9:19]
+        assert pdf_service.requests == [("GET", f"/receipt/{order.pk}/pdf", "bytes=9-18")]
+
+    def test_streams_under_asgi(self, pdf_service, monkeypatch):
+        """Test ASGI clients get the PDF in bounded chunks, not one buffered body"""
+        monkeypatch.setattr("shop.views.ASYNC_STREAM_CHUNK_BYTES", 256)
+        monkeypatch.setattr(receipts, "DOWNLOAD_CHUNK_SIZE", 100)
+        order = OrderFactory()
+        pdf_service.stored[order.pk] = PDF
+
+        async def download():
+            response = await AsyncClient().get(
+                f"/api/receipts/download/{order.pk}/", headers={"Authorization": f"JWT {get_token(order.user)}"}
+            )
+            return response, [chunk async for chunk in response.streaming_content]
+
+        response, chunks = async_to_sync(download)()
+        assert response.is_async
+        assert response["Content-Length"] == str(len(PDF))
+        assert b"".join(chunks) == PDF
+        assert len(chunks) > 1 and all(len(chunk) < 356 for chunk in chunks)
+
+    def test_archived_orders_download(self, client, pdf_service):
+        """Test receipts for archived orders are still generated and served"""
+        order = OrderFactory(status="DELIVERED")
+        OrderItemFactory(order=order)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=800))
+        call_command("archive_orders")
+
+        response = _download(client, order, order.user)
+        assert response.status_code == 200
+        assert b"".join(response.streaming_content) == PDF
+
+    def test_items_keep_their_checkout_names(self, client, pdf_service):
+        """Test lines are named as ordered, even after the product is renamed or deleted"""
+        order = OrderFactory()
+        renamed = OrderItemFactory(order=order, product_name="Amber Syrup 500ml")
+        renamed.product.name = "Amber Syrup 500ml (2027 harvest)"
+        renamed.product.save()
+        deleted = OrderItemFactory(order=order, product_name="Dark Syrup 1L")
+        deleted.product.delete()
+        OrderItemFactory(order=order, product__name="Maple Candy", product_name="")
+
+        assert _download(client, order, order.user).status_code == 200
+        names = [item["name"] for item in pdf_service.payloads[0]["items"]]
+        assert sorted(names) == ["Amber Syrup 500ml", "Dark Syrup 1L", "Maple Candy"]
+
+    def test_requires_owner(self, client, pdf_service):
+        """Test anonymous and other users' requests never reach pdf-service"""
+        order = OrderFactory()
+
+        assert _download(client, order).status_code == 401
+        assert _download(client, order, HTTP_AUTHORIZATION="JWT forged").status_code == 401
+        assert _download(client, order, UserFactory()).status_code == 404
+        assert not pdf_service.requests
+
+    def test_pdf_service_down(self, client, monkeypatch):
+        """Test an unreachable pdf-service yields a 502"""
+        def refuse(request):
+            raise httpx.ConnectError("connection refused")
+
+        monkeypatch.setattr(receipts, "_sync_client", lambda: httpx.Client(transport=httpx.MockTransport(refuse)))
+        order = OrderFactory()
+
+        response = _download(client, order, order.user)
+        assert response.status_code == 502
+        assert response.json() == {"error": "Receipt service unavailable"}
@@ -5,6 +5,7 @@ import pytest
 import json
 from graphene.test import Client as GrapheneClient
 from django.contrib.auth import get_user_model
+from django.db import connection
 from syrupstore.schema import schema
 from shop.models import Product, Cart, CartItem, Order
 from shop.tests.factories import (
@@ -76,6 +77,83 @@ class TestProductQueries:
         assert data["priceCents"] == 1999
 
 
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestSearchProducts:
+    """Test the product search query"""
+
+    def test_search_matches_substring(self):
+        """Test active products containing the term are returned"""
+        ProductFactory(name="Dark Maple Syrup")
+        ProductFactory(name="Light Maple Syrup")
+        ProductFactory(name="Maple Candy")
+        ProductFactory(name="Dark Maple Syrup 4L", is_active=False)
+
+        client = GrapheneClient(schema)
+        result = client.execute(
+            'query { searchProducts(query: "syrup") { name } }',
+            context_value=MockContext(),
+        )
+        assert result.get("errors") is None
+        names = [p["name"] for p in result["data"]["searchProducts"]]
+        assert names == ["Dark Maple Syrup", "Light Maple Syrup"]
+
+    def test_search_respects_limit(self):
+        """Test the result count is capped by limit"""
+        ProductFactory.create_batch(5, name="Maple Butter")
+
+        client = GrapheneClient(schema)
+        result = client.execute(
+            'query { searchProducts(query: "butter", limit: 2) { id } }',
+            context_value=MockContext(),
+        )
+        assert result.get("errors") is None
+        assert len(result["data"]["searchProducts"]) == 2
+
+    def test_blank_search_returns_nothing(self):
+        """Test an empty term does not dump the catalog"""
+        ProductFactory()
+
+        client = GrapheneClient(schema)
+        result = client.execute('query { searchProducts(query: "  ") { id } }', context_value=MockContext())
+        assert result["data"]["searchProducts"] == []
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="trigram indexes are PostgreSQL-only")
+class TestSearchIndexes:
+    """Test product and order search are served by the trigram indexes"""
+
+    def _plan(self, queryset):
+        # Tiny test tables would otherwise always be scanned sequentially
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_product_search_uses_indexes(self):
+        """Test both the substring and the similarity branch hit an index"""
+        from shop.search import search_products
+
+        queryset = search_products("syrup")
+        assert 'UPPER("shop_product"."name"::text)' in str(queryset.query)
+        plan = self._plan(queryset)
+        assert "shop_product_name_upper_trgm" in plan
+        assert "shop_product_name_trgm" in plan
+
+    def test_order_search_uses_indexes(self):
+        """Test the username, payer email and reference matches each hit an index"""
+        from shop.search import search_orders
+
+        plan = self._plan(search_orders("sugarshack"))
+        for index in (
+            "shop_order_payer_email_upper_trgm",
+            "shop_order_payment_ref_upper_trgm",
+            "shop_user_username_upper_trgm",
+        ):
+            assert index in plan
+
+
 @pytest.mark.django_db
 @pytest.mark.integration
 class TestUserMutations:
@@ -167,6 +245,41 @@ class TestCartMutations:
         assert cart_data["items"][0]["quantity"] == 2
         assert cart_data["items"][0]["product"]["name"] == product.name
 
+    def test_add_to_cart_maintains_totals(self):
+        """Test adding products keeps the stored subtotal and item count current"""
+        user = UserFactory()
+        syrup = ProductFactory(price_cents=2000)
+        candy = ProductFactory(price_cents=500)
+
+        client = GrapheneClient(schema)
+        mutation = """
+            mutation AddToCart($productId: ID!, $quantity: Int) {
+                addToCart(productId: $productId, quantity: $quantity) {
+                    cart { subtotalCents itemCount }
+                }
+            }
+        """
+
+        context = MockContext(user=user)
+        client.execute(mutation, variables={"productId": syrup.id, "quantity": 2}, context_value=context)
+        client.execute(mutation, variables={"productId": candy.id, "quantity": 1}, context_value=context)
+        result = client.execute(mutation, variables={"productId": syrup.id, "quantity": 1}, context_value=context)
+        assert result.get("errors") is None
+        assert result["data"]["addToCart"]["cart"] == {"subtotalCents": 6500, "itemCount": 2}
+
+    def test_cart_totals_read_without_items(self, django_assert_num_queries):
+        """Test the cart badge is served from the cart row alone"""
+        user = UserFactory()
+        cart = CartFactory(owner=user)
+        CartItemFactory.create_batch(5, cart=cart, quantity=2)
+
+        client = GrapheneClient(schema)
+        query = "query { cart { subtotalCents itemCount } }"
+        with django_assert_num_queries(1):
+            result = client.execute(query, context_value=MockContext(user=user))
+        assert result.get("errors") is None
+        assert result["data"]["cart"]["itemCount"] == 5
+
     def test_update_cart_item(self):
         """Test updating cart item quantity"""
         user = UserFactory()
@@ -192,6 +305,9 @@ class TestCartMutations:
         assert result.get("errors") is None
         items = result["data"]["updateCartItem"]["cart"]["items"]
         assert items[0]["quantity"] == 5
+        cart.refresh_from_db()
+        assert cart.subtotal_cents == product.price_cents * 5
+        assert cart.item_count == 1
 
     def test_remove_cart_item(self):
         """Test removing an item from cart"""
@@ -215,6 +331,252 @@ class TestCartMutations:
         assert result.get("errors") is None
         items = result["data"]["removeCartItem"]["cart"]["items"]
         assert len(items) == 0
+        cart.refresh_from_db()
+        assert cart.subtotal_cents == 0
+        assert cart.item_count == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestSetCartItems:
+    """Test the batch cart mutation"""
+
+    mutation = """
+        mutation SetCartItems($items: [CartLineInput!]!, $replace: Boolean) {
+            setCartItems(items: $items, replace: $replace) {
+                cart {
+                    subtotalCents
+                    itemCount
+                    items { quantity product { id } }
+                }
+            }
+        }
+    """
+
+    def _execute(self, user, items, replace=None):
+        client = GrapheneClient(schema)
+        return client.execute(
+            self.mutation,
+            variables={"items": items, "replace": replace},
+            context_value=MockContext(user=user),
+        )
+
+    def test_upserts_and_removes_lines(self):
+        """Test new lines are added, existing ones overwritten and zero lines removed"""
+        user = UserFactory()
+        cart = CartFactory(owner=user)
+        kept = ProductFactory(price_cents=1000)
+        dropped = ProductFactory(price_cents=500)
+        added = ProductFactory(price_cents=250)
+        CartItemFactory(cart=cart, product=kept, quantity=1)
+        CartItemFactory(cart=cart, product=dropped, quantity=1)
+
+        result = self._execute(user, [
+            {"productId": kept.id, "quantity": 3},
+            {"productId": dropped.id, "quantity": 0},
+            {"productId": added.id, "quantity": 2},
+        ])
+        assert result.get("errors") is None
+        data = result["data"]["setCartItems"]["cart"]
+        assert data["subtotalCents"] == 3500
+        assert data["itemCount"] == 2
+        quantities = {int(i["product"]["id"]): i["quantity"] for i in data["items"]}
+        assert quantities == {kept.id: 3, added.id: 2}
+
+    def test_replace_removes_unlisted_lines(self):
+        """Test replace mode leaves exactly the listed lines"""
+        user = UserFactory()
+        cart = CartFactory(owner=user)
+        CartItemFactory(cart=cart, quantity=4)
+        product = ProductFactory(price_cents=900)
+
+        result = self._execute(user, [{"productId": product.id, "quantity": 1}], replace=True)
+        assert result.get("errors") is None
+        assert result["data"]["setCartItems"]["cart"]["itemCount"] == 1
+        assert list(cart.items.values_list("product_id", flat=True)) == [product.id]
+
+    def test_inactive_product_rejected(self):
+        """Test unknown or inactive products abort the whole batch"""
+        user = UserFactory()
+        active = ProductFactory()
+        inactive = ProductFactory(is_active=False)
+
+        result = self._execute(user, [
+            {"productId": active.id, "quantity": 1},
+            {"productId": inactive.id, "quantity": 1},
+        ])
+        assert result.get("errors") is not None
+        assert "Product not found" in str(result["errors"])
+        assert not CartItem.objects.filter(cart__owner=user).exists()
+
+    def test_query_count_independent_of_lines(self, django_assert_max_num_queries):
+        """Test a large batch costs a fixed number of queries"""
+        user = UserFactory()
+        CartFactory(owner=user)
+        products = ProductFactory.create_batch(15)
+
+        items = [{"productId": p.id, "quantity": 2} for p in products]
+        client = GrapheneClient(schema)
+        with django_assert_max_num_queries(8):
+            result = client.execute(
+                """
+                mutation SetCartItems($items: [CartLineInput!]!) {
+                    setCartItems(items: $items) { cart { itemCount } }
+                }
+                """,
+                variables={"items": items},
+                context_value=MockContext(user=user),
+            )
+        assert result.get("errors") is None
+        assert result["data"]["setCartItems"]["cart"]["itemCount"] == 15
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestGuestCart:
+    """Test anonymous cache-backed carts and their merge on login"""
+
+    add_mutation = """
+        mutation AddToGuestCart($productId: ID!, $quantity: Int, $token: String) {
+            addToGuestCart(productId: $productId, quantity: $quantity, token: $token) {
+                guestCart { token subtotalCents itemCount items { quantity product { id } } }
+            }
+        }
+    """
+
+    def _add(self, product, quantity=1, token=None):
+        client = GrapheneClient(schema)
+        result = client.execute(
+            self.add_mutation,
+            variables={"productId": product.id, "quantity": quantity, "token": token},
+            context_value=MockContext(),
+        )
+        assert result.get("errors") is None
+        return result["data"]["addToGuestCart"]["guestCart"]
+
+    def test_guest_cart_does_not_write_to_database(self, django_assert_num_queries):
+        """Test anonymous cart changes only read products"""
+        product = ProductFactory(price_cents=1500)
+        with django_assert_num_queries(2):
+            cart = self._add(product, quantity=2)
+        assert cart["token"]
+        assert cart["subtotalCents"] == 3000
+        assert cart["itemCount"] == 1
+        assert not Cart.objects.exists()
+
+    def test_guest_cart_accumulates_by_token(self):
+        """Test later additions with the same token land in the same cart"""
+        syrup = ProductFactory(price_cents=1000)
+        candy = ProductFactory(price_cents=300)
+        token = self._add(syrup)["token"]
+        self._add(syrup, token=token)
+        cart = self._add(candy, token=token)
+        assert cart["subtotalCents"] == 2300
+        assert cart["itemCount"] == 2
+
+    def test_guest_cart_lives_in_shared_cache(self):
+        """Test guest carts stay out of the per-process default cache"""
+        from django.core.cache import cache, caches
+        from shop.guest_carts import GUEST_CART_KEY_PREFIX
+
+        cache.clear()
+        self._add(ProductFactory())
+        assert not any(GUEST_CART_KEY_PREFIX in key for key in cache._cache)
+        assert any(GUEST_CART_KEY_PREFIX in key for key in caches["shared"]._cache)
+
+    def test_shared_cache_is_not_process_local(self):
+        """Test production settings give the shared cache a backend every worker sees"""
+        from syrupstore import settings as production
+
+        assert production.CACHES["shared"]["BACKEND"] in (
+            "django.core.cache.backends.db.DatabaseCache",
+            "django.core.cache.backends.redis.RedisCache",
+        )
+
+    def test_guest_cart_line_limit(self, monkeypatch):
+        """Test a guest cart is capped at MAX_CART_LINES distinct products"""
+        monkeypatch.setattr("shop.schema.MAX_CART_LINES", 2)
+        first, second, third = ProductFactory.create_batch(3)
+        token = self._add(first)["token"]
+        self._add(second, token=token)
+
+        client = GrapheneClient(schema)
+        result = client.execute(
+            self.add_mutation,
+            variables={"productId": third.id, "token": token},
+            context_value=MockContext(),
+        )
+        assert "at most 2 lines" in str(result["errors"])
+        # Adding more of a product already in the cart is still allowed
+        assert self._add(first, token=token)["itemCount"] == 2
+
+    def test_tampered_token_rejected(self):
+        """Test guest cart tokens must carry a valid signature"""
+        client = GrapheneClient(schema)
+        result = client.execute(
+            'query { guestCart(token: "forged:token") { itemCount } }',
+            context_value=MockContext(),
+        )
+        assert result.get("errors") is not None
+        assert "Invalid guest cart token" in str(result["errors"])
+
+    def test_register_merges_guest_cart(self):
+        """Test registering with a guest token moves the lines into a persistent cart"""
+        product = ProductFactory(price_cents=1200)
+        token = self._add(product, quantity=3)["token"]
+
+        client = GrapheneClient(schema)
+        result = client.execute(
+            """
+            mutation Register($token: String) {
+                registerUser(username: "guest", password: "testpass123", guestCartToken: $token) {
+                    user { id }
+                }
+            }
+            """,
+            variables={"token": token},
+            context_value=MockContext(),
+        )
+        assert result.get("errors") is None
+        cart = Cart.objects.get(owner__username="guest")
+        assert cart.subtotal_cents == 3600
+        assert cart.items.get().quantity == 3
+
+        guest = client.execute(
+            "query GuestCart($token: String!) { guestCart(token: $token) { itemCount } }",
+            variables={"token": token},
+            context_value=MockContext(),
+        )
+        assert guest["data"]["guestCart"]["itemCount"] == 0
+
+    def test_token_auth_merges_into_existing_cart(self, rf):
+        """Test logging in with a guest token sums quantities with the saved cart"""
+        user = UserFactory(username="returning")
+        user.set_password("testpass123")
+        user.save()
+        product = ProductFactory(price_cents=1000)
+        cart = CartFactory(owner=user)
+        CartItemFactory(cart=cart, product=product, quantity=1)
+        token = self._add(product, quantity=2)["token"]
+
+        request = rf.post("/graphql/")
+        request.user = User()
+        client = GrapheneClient(schema)
+        result = client.execute(
+            """
+            mutation Login($token: String) {
+                tokenAuth(username: "returning", password: "testpass123", guestCartToken: $token) {
+                    token
+                }
+            }
+            """,
+            variables={"token": token},
+            context_value=request,
+        )
+        assert result.get("errors") is None
+        cart.refresh_from_db()
+        assert cart.items.get().quantity == 3
+        assert cart.subtotal_cents == 3000
 
 
 @pytest.mark.django_db
@@ -271,6 +633,7 @@ class TestCheckoutMutation:
         # Verify cart is empty
         cart.refresh_from_db()
         assert cart.items.count() == 0
+        assert cart.subtotal_cents == 0
         
         # Verify inventory was decremented
         product.refresh_from_db()
@@ -409,6 +772,105 @@ class TestAdminMutations:
         assert order_data["status"] == "PAID"
 
 
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestBulkUpdateOrderStatus:
+    """Test bulk order status transitions"""
+
+    mutation = """
+        mutation Bulk($orderIds: [ID!]!, $status: String!) {
+            bulkUpdateOrderStatus(orderIds: $orderIds, status: $status) {
+                updatedCount
+                results { orderId outcome status ok }
+            }
+        }
+    """
+
+    def _execute(self, user, order_ids, status):
+        client = GrapheneClient(schema)
+        return client.execute(
+            self.mutation,
+            variables={"orderIds": order_ids, "status": status},
+            context_value=MockContext(user=user),
+        )
+
+    def test_bulk_ship_reports_each_order(self, mailoutbox, django_capture_on_commit_callbacks):
+        """Test per-order outcomes and one batch of shipment emails"""
+        staff_user = StaffUserFactory()
+        paid = OrderFactory.create_batch(2, status="PAID")
+        already = OrderFactory(status="SHIPPED")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            result = self._execute(staff_user, [paid[0].id, paid[1].id, already.id, 999999], "SHIPPED")
+        assert result.get("errors") is None
+        data = result["data"]["bulkUpdateOrderStatus"]
+        assert data["updatedCount"] == 2
+        outcomes = {int(r["orderId"]): r["outcome"] for r in data["results"]}
+        assert outcomes == {paid[0].id: "UPDATED", paid[1].id: "UPDATED", already.id: "UNCHANGED", 999999: "NOT_FOUND"}
+        assert Order.objects.filter(status="SHIPPED").count() == 3
+        assert sorted(m.subject for m in mailoutbox) == sorted(
+            f"Order #{o.id} Has Shipped - Maple Syrup Store" for o in paid
+        )
+
+    def test_concurrent_change_reported_as_conflict(self, monkeypatch):
+        """Test an order changed after being read is not overwritten"""
+        staff_user = StaffUserFactory()
+        racing, steady = OrderFactory.create_batch(2, status="PENDING_PAYMENT")
+        self._race(monkeypatch, racing, "CANCELLED")
+        result = self._execute(staff_user, [racing.id, steady.id], "PAID")
+        assert result.get("errors") is None
+        results = {int(r["orderId"]): r for r in result["data"]["bulkUpdateOrderStatus"]["results"]}
+        assert results[racing.id]["outcome"] == "CONFLICT"
+        assert results[racing.id]["status"] == "CANCELLED"
+        assert results[racing.id]["ok"] is False
+        assert results[steady.id]["outcome"] == "UPDATED"
+
+    def test_concurrent_move_to_target_not_counted(self, monkeypatch):
+        """Test an order another writer moved to the target status is a conflict, not our update"""
+        from shop import orders
+
+        staff_user = StaffUserFactory()
+        racing, steady = OrderFactory.create_batch(2, status="PENDING_PAYMENT")
+        recorded, published = [], []
+        monkeypatch.setattr(orders, "record_status_change", lambda ids, old, new: recorded.extend(ids))
+        monkeypatch.setattr(orders, "publish_status_changes", lambda changes: published.extend(changes))
+        self._race(monkeypatch, racing, "PAID")
+
+        result = self._execute(staff_user, [racing.id, steady.id], "PAID")
+        data = result["data"]["bulkUpdateOrderStatus"]
+        results = {int(r["orderId"]): r for r in data["results"]}
+        assert results[racing.id]["outcome"] == "CONFLICT"
+        assert results[racing.id]["status"] == "PAID"
+        assert data["updatedCount"] == 1
+        assert recorded == [steady.id]
+        assert [order_id for order_id, _, _ in published] == [steady.id]
+
+    def _race(self, monkeypatch, order, status):
+        """Have another writer move ``order`` to ``status`` just before the orders are locked"""
+        from django.db.models.query import QuerySet
+
+        original = QuerySet.select_for_update
+
+        def racing_lock(qs, *args, **kwargs):
+            if qs.model is Order:
+                Order.objects.filter(pk=order.pk).update(status=status)
+            return original(qs, *args, **kwargs)
+
+        monkeypatch.setattr(QuerySet, "select_for_update", racing_lock)
+
+    def test_requires_staff(self):
+        """Test regular users cannot bulk update"""
+        order = OrderFactory()
+        result = self._execute(UserFactory(), [order.id], "PAID")
+        assert "Admin access required" in str(result["errors"])
+
+    def test_invalid_status(self):
+        """Test unknown statuses are rejected"""
+        order = OrderFactory()
+        result = self._execute(StaffUserFactory(), [order.id], "LOST")
+        assert "Invalid order status" in str(result["errors"])
+
+
 @pytest.mark.django_db
 @pytest.mark.integration
 class TestShippingEstimate:
@@ -457,3 +919,43 @@ class TestShippingEstimate:
         estimate = result["data"]["shippingEstimate"]
         assert estimate["cents"] == 499
         assert estimate["zone"] == "LOCAL_RADIUS"
+
+    def test_shipping_estimates_batch(self):
+        """Test estimating several destinations in one query"""
+        client = GrapheneClient(schema)
+        query = """
+            query {
+                shippingEstimates(destinations: [
+                    {country: "Canada", region: "Ontario", postal: "P0R 1B0"},
+                    {country: "Canada", region: "Ontario", postal: "M5H 2N2"},
+                    {country: "Canada", region: "Quebec", postal: "H2X 3A2"},
+                    {country: "USA", region: "California", postal: "90210"}
+                ]) {
+                    cents
+                    zone
+                }
+            }
+        """
+
+        result = client.execute(query, context_value=MockContext())
+        assert result.get("errors") is None
+        estimates = result["data"]["shippingEstimates"]
+        assert [e["zone"] for e in estimates] == ["LOCAL_RADIUS", "ONTARIO", "CANADA", "INTERNATIONAL"]
+        assert [e["cents"] for e in estimates] == [499, 799, 1299, 2999]
+
+    def test_shipping_estimates_too_many_destinations(self):
+        """Test the batch size is capped"""
+        client = GrapheneClient(schema)
+        destinations = ", ".join(
+            '{country: "Canada", region: "Ontario", postal: "M5H 2N2"}' for _ in range(51)
+        )
+        query = f"""
+            query {{
+                shippingEstimates(destinations: [{destinations}]) {{ cents }}
+            }}
+        """
+
+        result = client.execute(query, context_value=MockContext())
+        assert result.get("errors") is not None
+        assert "At most 50 destinations" in str(result["errors"])
+
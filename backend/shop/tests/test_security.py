@@ -2,10 +2,13 @@
 Security tests for the Maple Syrup Store
 """
 import pytest
-from django.test import Client, override_settings
+from django.test import Client, RequestFactory, override_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
 from django.urls import reverse
+from graphql_jwt.shortcuts import get_token
 import json
+from types import SimpleNamespace
 
 User = get_user_model()
 
@@ -59,6 +62,142 @@ class TestRateLimiting:
         assert True  # Placeholder for rate limit integration test
 
 
+@pytest.mark.django_db
+class TestCostRateLimiting:
+    """Test cost-weighted token buckets on the GraphQL endpoint"""
+
+    @pytest.fixture(autouse=True)
+    def small_buckets(self, settings, monkeypatch):
+        # Freeze the clock so buckets do not refill mid-test
+        monkeypatch.setattr('syrupstore.ratelimit.time', SimpleNamespace(time=lambda: 1000.0))
+        caches['shared'].clear()
+        settings.RATELIMIT_ENABLE = True
+        settings.GRAPHQL_RATE_BUCKETS = {
+            "graphql": {"ip": (10, 10), "user": (10, 10)},
+            "checkout": {"ip": (5, 5), "user": (1, 1)},
+            "receipts": {"ip": (5, 5), "user": (1, 1)},
+        }
+        settings.GRAPHQL_FIELD_COSTS = {"adminOrders": 5, "checkout": 2}
+        yield
+        caches['shared'].clear()
+
+    def _post(self, client, query, user=None):
+        headers = {'HTTP_AUTHORIZATION': f'JWT {get_token(user)}'} if user else {}
+        return client.post('/graphql/', json.dumps({'query': query}), content_type='application/json', **headers)
+
+    def test_operation_charge(self):
+        """Test operations are priced by their root fields, fragments included"""
+        from syrupstore.ratelimit import operation_charge
+
+        assert operation_charge('{ products { id } }') == {'graphql': 1}
+        assert operation_charge('{ adminOrders { id } products { id } }') == {'graphql': 6}
+        assert operation_charge(
+            'mutation { ...Buy } fragment Buy on Mutation { checkout(paymentReference: "x") { order { id } } }'
+        ) == {'graphql': 2, 'checkout': 1}
+        assert operation_charge('query A { products { id } } query B { adminOrders { id } }', 'B') == {'graphql': 5}
+        assert operation_charge('not graphql') == {'graphql': 1}
+
+    def test_expensive_operations_spend_more(self, client):
+        """Test an expensive operation uses up the bucket faster than cheap reads"""
+        for _ in range(2):
+            assert self._post(client, '{ adminOrders { id } }').status_code != 429
+        response = self._post(client, '{ products { id } }')
+        assert response.status_code == 429
+        assert response.json()['errors'][0]['extensions']['code'] == 'RATE_LIMITED'
+        assert int(response['Retry-After']) >= 1
+
+    def test_cheap_reads_get_the_full_budget(self, client):
+        """Test one-token reads are allowed up to the bucket capacity"""
+        statuses = [self._post(client, '{ products { id } }').status_code for _ in range(11)]
+        assert statuses[:10] == [200] * 10
+        assert statuses[10] == 429
+
+    def test_buckets_live_in_shared_cache(self, client):
+        """Test buckets are kept where every worker sees them, not in the per-process cache"""
+        self._post(client, '{ products { id } }')
+        tokens, _ = caches['shared'].get('gqlrl:graphql:ip:127.0.0.1')
+        assert tokens == 9
+        assert cache.get('gqlrl:graphql:ip:127.0.0.1') is None
+
+    def test_checkout_has_its_own_bucket(self, client):
+        """Test a user's second checkout is refused while catalog reads still pass"""
+        user = User.objects.create_user(username='buyer', password='TestPass123!')
+        checkout = 'mutation { checkout(paymentReference: "EMT-1") { order { id } } }'
+
+        assert self._post(client, checkout, user).status_code != 429
+        assert self._post(client, checkout, user).status_code == 429
+        assert self._post(client, '{ products { id } }', user).status_code == 200
+
+    def test_refused_request_costs_nothing(self, client):
+        """Test a request over one bucket does not drain the others"""
+        user = User.objects.create_user(username='buyer', password='TestPass123!')
+        checkout = 'mutation { checkout(paymentReference: "EMT-1") { order { id } } }'
+
+        self._post(client, checkout, user)
+        for _ in range(3):
+            assert self._post(client, checkout, user).status_code == 429
+        # 10 - 2 for the one checkout that ran
+        statuses = [self._post(client, '{ products { id } }', user).status_code for _ in range(9)]
+        assert statuses == [200] * 8 + [429]
+
+    def test_batch_is_charged_in_full(self, client):
+        """Test a batch costs the sum of its operations"""
+        batch = [{'query': '{ products { id } }'}] * 5 + [{'query': '{ adminOrders { id } }'}]
+        response = client.post('/graphql/', json.dumps(batch), content_type='application/json')
+        assert response.status_code == 200
+        assert self._post(client, '{ products { id } }').status_code == 429
+
+
+@pytest.mark.django_db
+class TestGraphQLBatching:
+    """Test Apollo batch (JSON array) requests"""
+
+    def _post_batch(self, client, batch, user=None):
+        headers = {'HTTP_AUTHORIZATION': f'JWT {get_token(user)}'} if user else {}
+        return client.post('/graphql/', json.dumps(batch), content_type='application/json', **headers)
+
+    def test_results_come_back_in_order(self, client, django_assert_max_num_queries):
+        """Test a batch returns one result per operation and authenticates once"""
+        user = User.objects.create_user(username='batcher', password='TestPass123!')
+        batch = [
+            {'query': '{ me { username } }'},
+            {'query': 'query Cart { cart { itemCount } }', 'operationName': 'Cart'},
+            {'query': 'query($id: ID!) { product(id: $id) { id } }', 'variables': {'id': '999'}},
+            {'query': '{ products { id } }'},
+        ]
+
+        with django_assert_max_num_queries(10) as captured:
+            response = self._post_batch(client, batch, user)
+
+        assert response.status_code == 200
+        me, cart, product, products = response.json()
+        assert me == {'data': {'me': {'username': 'batcher'}}}
+        assert cart['data']['cart']['itemCount'] == 0
+        assert product['errors'] and product['data'] == {'product': None}
+        assert products == {'data': {'products': []}}
+        assert len([q for q in captured.captured_queries if 'FROM "auth_user"' in q['sql']]) == 1
+
+    def test_invalid_operation_only_fails_itself(self, client):
+        """Test a malformed operation returns errors without failing the batch"""
+        response = self._post_batch(client, [{'query': '{ nope }'}, {}, {'query': '{ __typename }'}])
+
+        assert response.status_code == 200
+        invalid, missing, ok = response.json()
+        assert 'nope' in invalid['errors'][0]['message']
+        assert missing['errors'][0]['message'] == 'Must provide query string.'
+        assert ok == {'data': {'__typename': 'Query'}}
+
+    def test_size_and_cost_caps(self, client, settings):
+        """Test empty, oversized and too expensive batches are refused"""
+        settings.GRAPHQL_BATCH_MAX_OPERATIONS = 3
+        settings.GRAPHQL_BATCH_MAX_COST = 20
+
+        for batch in ([], [{'query': '{ __typename }'}] * 4, [{'query': '{ adminOrders { id } }'}], ['x']):
+            response = self._post_batch(client, batch)
+            assert response.status_code == 400
+            assert response.json()['errors'][0]['extensions']['code'] == 'BATCH_REJECTED'
+
+
 @pytest.mark.django_db
 class TestSecurityHeaders:
     """Test security headers on responses"""
@@ -99,6 +238,99 @@ class TestSecurityHeaders:
         assert 'camera=()' in permissions_policy
         assert 'microphone=()' in permissions_policy
 
+    def test_query_count_header_is_opt_in(self, client, settings):
+        """Test X-DB-Queries is only reported when the load-test middleware is enabled"""
+        assert 'X-DB-Queries' not in client.get('/api/health/')
+
+        settings.MIDDLEWARE = ["syrupstore.middleware.QueryCountMiddleware", *settings.MIDDLEWARE]
+        response = Client().post(
+            '/graphql/', json.dumps({'query': '{ products { id } }'}), content_type='application/json'
+        )
+        assert response['X-DB-Queries'] == '1'
+
+    def test_csp_policy_is_precomputed(self, client):
+        """Test the CSP header matches the settings and honours per-response overrides"""
+        from csp.utils import build_policy
+        from django.http import HttpResponse
+        from syrupstore.middleware import PrecomputedCSPMiddleware
+
+        assert client.get('/api/health/')['Content-Security-Policy'] == build_policy()
+
+        def view(request):
+            response = HttpResponse()
+            response._csp_update = {'IMG_SRC': 'https://cdn.example.com'}
+            return response
+
+        response = PrecomputedCSPMiddleware(view)(RequestFactory().get('/'))
+        assert 'https://cdn.example.com' in response['Content-Security-Policy']
+
+
+class TestResponseCompression:
+    """Test gzip/brotli compression of API responses"""
+
+    BODY = json.dumps({'data': {'orders': [{'id': str(n), 'status': 'DELIVERED'} for n in range(200)]}}).encode()
+
+    def _respond(self, response, accept_encoding='gzip, deflate, br'):
+        from syrupstore.middleware import CompressionMiddleware
+
+        request = RequestFactory().get('/graphql/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def _json(self, body=None):
+        from django.http import HttpResponse
+        return HttpResponse(body or self.BODY, content_type='application/json')
+
+    def test_brotli_preferred_then_gzip(self):
+        """Test brotli is used when accepted and gzip otherwise"""
+        import brotli
+        import gzip
+
+        response = self._respond(self._json())
+        assert response['Content-Encoding'] == 'br'
+        assert brotli.decompress(response.content) == self.BODY
+        assert int(response['Content-Length']) == len(response.content) < len(self.BODY)
+        assert 'Accept-Encoding' in response['Vary']
+
+        response = self._respond(self._json(), 'gzip, br;q=0')
+        assert response['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.content) == self.BODY
+
+    def test_skips_small_excluded_and_unaccepted(self):
+        """Test small bodies, PDFs, event streams and identity clients are left alone"""
+        from django.http import HttpResponse, StreamingHttpResponse
+
+        assert not self._respond(self._json(b'{"data": {}}')).has_header('Content-Encoding')
+        assert not self._respond(HttpResponse(self.BODY, content_type='application/pdf')).has_header('Content-Encoding')
+        stream = StreamingHttpResponse(iter([b'data: {}\n\n']), content_type='text/event-stream')
+        assert not self._respond(stream).has_header('Content-Encoding')
+        assert not self._respond(self._json(), 'identity').has_header('Content-Encoding')
+
+    def test_streaming_responses(self):
+        """Test streaming bodies are compressed chunk by chunk"""
+        import gzip
+        from django.http import StreamingHttpResponse
+
+        chunks = [b'id,status\n'] + [f'{n},DELIVERED\n'.encode() for n in range(500)]
+        response = self._respond(StreamingHttpResponse(iter(chunks), content_type='text/csv'), 'gzip')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert not response.has_header('Content-Length')
+        assert gzip.decompress(b''.join(response.streaming_content)) == b''.join(chunks)
+
+    @pytest.mark.django_db
+    def test_graphql_responses_are_compressed(self, client):
+        """Test GraphQL JSON goes out compressed end to end"""
+        from shop.tests.factories import ProductFactory
+        import gzip
+
+        ProductFactory.create_batch(30)
+        response = client.post(
+            '/graphql/', json.dumps({'query': '{ products { id name description } }'}),
+            content_type='application/json', HTTP_ACCEPT_ENCODING='gzip',
+        )
+        assert response['Content-Encoding'] == 'gzip'
+        assert len(json.loads(gzip.decompress(response.content))['data']['products']) == 30
+
 
 @pytest.mark.django_db
 class TestSessionSecurity:
@@ -195,6 +427,124 @@ class TestAuthenticationSecurity:
         assert 'JWT_EXPIRATION_DELTA' in settings.GRAPHQL_JWT
 
 
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestJWTUserCache:
+    """Test JWT-authenticated users are served from the per-request memo and cache"""
+
+    @pytest.fixture(autouse=True)
+    def _empty_cache(self):
+        cache.clear()
+        caches['shared'].clear()
+        yield
+        cache.clear()
+        caches['shared'].clear()
+
+    def _user(self, **kwargs):
+        return User.objects.create_user(username=kwargs.pop('username', 'cacheduser'), password='MapleSyrup!2024', **kwargs)
+
+    def _post(self, client, user, query='{ me { username isStaff } }', token=None):
+        return client.post(
+            '/graphql/',
+            json.dumps({'query': query}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'JWT {token or get_token(user)}',
+        ).json()
+
+    def _user_queries(self, captured):
+        return [q for q in captured.captured_queries if 'FROM "auth_user"' in q['sql']]
+
+    def test_repeat_requests_skip_user_query(self, client, django_assert_num_queries):
+        """Test the second request with a token loads the user from cache"""
+        user = self._user()
+        token = get_token(user)
+
+        with django_assert_num_queries(1) as first:
+            assert self._post(client, user, token=token)['data']['me']['username'] == 'cacheduser'
+        assert len(self._user_queries(first)) == 1
+
+        with django_assert_num_queries(0):
+            assert self._post(client, user, token=token)['data']['me']['username'] == 'cacheduser'
+
+    def test_authenticate_is_memoized_per_request(self, rf, django_assert_num_queries):
+        """Test repeated authenticate() calls on one request decode and load once"""
+        from django.contrib.auth import authenticate
+        user = self._user()
+        request = rf.get('/', HTTP_AUTHORIZATION=f'JWT {get_token(user)}')
+
+        with django_assert_num_queries(1):
+            assert authenticate(request=request) == user
+            assert authenticate(request=request) == user
+
+    def test_staff_change_invalidates(self, client):
+        """Test revoking staff takes effect on the next request"""
+        user = self._user(is_staff=True)
+        token = get_token(user)
+        assert self._post(client, user, token=token)['data']['me']['isStaff'] is True
+
+        user.is_staff = False
+        user.save()
+        assert self._post(client, user, token=token)['data']['me']['isStaff'] is False
+
+    def test_password_change_invalidates(self, client, django_assert_num_queries):
+        """Test a password change forces a fresh user lookup"""
+        user = self._user()
+        token = get_token(user)
+        self._post(client, user, token=token)
+
+        user.set_password('AnotherMaple!2025')
+        user.save()
+        with django_assert_num_queries(1):
+            self._post(client, user, token=token)
+
+    def test_deactivated_user_rejected(self, client):
+        """Test a deactivated user's cached entry is not served"""
+        user = self._user()
+        token = get_token(user)
+        self._post(client, user, token=token)
+
+        user.is_active = False
+        user.save()
+        result = self._post(client, user, token=token)
+        assert result['errors'][0]['message'] == 'User is disabled'
+
+    def test_invalidation_reaches_other_processes(self, client, monkeypatch):
+        """Test a change saved by one worker stops every other worker serving its cached user"""
+        from django.core.cache.backends.locmem import LocMemCache
+        workers = {name: {'default': LocMemCache(name, {}), 'shared': caches['shared']} for name in ('a', 'b')}
+        user = self._user(is_staff=True)
+        token = get_token(user)
+
+        monkeypatch.setattr('shop.auth.caches', workers['a'])
+        assert self._post(client, user, token=token)['data']['me']['isStaff'] is True
+
+        monkeypatch.setattr('shop.auth.caches', workers['b'])
+        user.is_staff = False
+        user.save()
+
+        monkeypatch.setattr('shop.auth.caches', workers['a'])
+        assert self._post(client, user, token=token)['data']['me']['isStaff'] is False
+
+    def test_reinvalidated_on_commit(self, django_capture_on_commit_callbacks):
+        """Test the epoch is bumped again once the user change commits"""
+        from shop.auth import EPOCH_KEY
+        user = self._user()
+        with django_capture_on_commit_callbacks() as callbacks:
+            user.save()
+        epoch = caches['shared'].get(EPOCH_KEY.format(user_id=user.pk))
+        assert epoch is not None
+        for callback in callbacks:
+            callback()
+        assert caches['shared'].get(EPOCH_KEY.format(user_id=user.pk)) != epoch
+
+    def test_token_without_user_id_still_accepted(self, client):
+        """Test tokens issued before userId was added fall back to a username lookup"""
+        from graphql_jwt.utils import jwt_encode, jwt_payload
+        user = self._user()
+        token = jwt_encode(jwt_payload(user))
+        assert self._post(client, user, token=token)['data']['me']['username'] == 'cacheduser'
+
+
 @pytest.mark.django_db
 class TestProductionSettings:
     """Test production security settings"""
@@ -225,6 +575,67 @@ class TestProductionSettings:
         assert settings.SECURE_HSTS_INCLUDE_SUBDOMAINS is True
 
 
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestGraphQLDebugCapture:
+    """Test SQL capture (_debug) is opt-in per staff request in production"""
+
+    QUERY = json.dumps({'query': '{ products { id } _debug { sql { rawSql } } }'})
+
+    @pytest.fixture(autouse=True)
+    def production_middleware(self, settings, monkeypatch):
+        # The schema middleware GRAPHQL_DEBUG="staff" installs (no DjangoDebugMiddleware)
+        from graphene_django.views import graphene_settings
+        from graphql_jwt.middleware import JSONWebTokenMiddleware
+
+        monkeypatch.setattr(graphene_settings, 'MIDDLEWARE', [JSONWebTokenMiddleware])
+        settings.GRAPHQL_DEBUG = 'staff'
+        settings.RATELIMIT_ENABLE = False
+        # The catalogue may be served from the cache, leaving no SQL to capture
+        cache.clear()
+
+    def _debug(self, client, user=None, **headers):
+        if user:
+            headers['HTTP_AUTHORIZATION'] = f'JWT {get_token(user)}'
+        response = client.post('/graphql/', self.QUERY, content_type='application/json', **headers)
+        assert response.status_code == 200
+        return response.json()['data']['_debug']
+
+    def test_staff_flag_captures_sql(self, client):
+        """Test a staff request with X-GraphQL-Debug gets its SQL back"""
+        staff = User.objects.create_user(username='ops', password='TestPass123!', is_staff=True)
+        debug = self._debug(client, staff, HTTP_X_GRAPHQL_DEBUG='1')
+        assert any('shop_product' in query['rawSql'] for query in debug['sql']), debug
+
+    def test_capture_is_off_by_default(self, client):
+        """Test requests without the flag, or from customers, record nothing"""
+        staff = User.objects.create_user(username='ops', password='TestPass123!', is_staff=True)
+        customer = User.objects.create_user(username='customer', password='TestPass123!')
+
+        assert self._debug(client, staff) is None
+        assert self._debug(client, customer, HTTP_X_GRAPHQL_DEBUG='1') is None
+        assert self._debug(client, HTTP_X_GRAPHQL_DEBUG='1') is None
+
+    def test_capture_ends_with_the_request(self, client):
+        """Test a captured request that does not select _debug leaves the DB cursors unwrapped"""
+        from django.db import connection
+
+        staff = User.objects.create_user(username='ops', password='TestPass123!', is_staff=True)
+        response = client.post(
+            '/graphql/', json.dumps({'query': '{ products { id } }'}), content_type='application/json',
+            HTTP_AUTHORIZATION=f'JWT {get_token(staff)}', HTTP_X_GRAPHQL_DEBUG='1',
+        )
+        assert response.status_code == 200
+        assert not hasattr(connection, '_graphene_cursor')
+        assert self._debug(client, staff, HTTP_X_GRAPHQL_DEBUG='1')['sql']
+
+    def test_off_ignores_the_flag(self, client, settings):
+        """Test GRAPHQL_DEBUG=off never captures"""
+        settings.GRAPHQL_DEBUG = 'off'
+        staff = User.objects.create_user(username='ops', password='TestPass123!', is_staff=True)
+        assert self._debug(client, staff, HTTP_X_GRAPHQL_DEBUG='1') is None
+
+
 @pytest.mark.django_db  
 class TestHealthChecks:
     """Test health check endpoints"""
@@ -242,6 +653,75 @@ class TestHealthChecks:
         assert response.status_code == 200
 
 
+@pytest.fixture
+def readiness(monkeypatch):
+    """A fresh readiness monitor whose background thread never starts"""
+    from syrupstore.health import ReadinessMonitor
+
+    monitor = ReadinessMonitor()
+    monkeypatch.setattr(monitor, "start", lambda: None)
+    monkeypatch.setattr("syrupstore.views.readiness", monitor)
+    return monitor
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestProbes:
+    """/livez and /readyz never do I/O on the request"""
+
+    def test_livez_does_no_io(self, client, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            response = client.get('/livez')
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+    def test_readyz_not_ready_before_first_check(self, client, readiness):
+        response = client.get('/readyz')
+        assert response.status_code == 503
+        assert response.json() == {"status": "starting"}
+
+    def test_readyz_serves_last_check(self, client, readiness, settings, django_assert_num_queries):
+        readiness.refresh()
+        with django_assert_num_queries(0):
+            response = client.get('/readyz')
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "ok"
+        assert len(body["checks"]) == len(settings.CACHES) + 2  # database, each cache, storage
+        assert set(body["checks"].values()) == {"OK"}
+
+    def test_readyz_reports_failed_check(self, client, readiness, monkeypatch):
+        from health_check.exceptions import ServiceUnavailable
+
+        monkeypatch.setattr(readiness, "run_check", lambda subset=None: [ServiceUnavailable("down")])
+        readiness.refresh()
+        response = client.get('/readyz')
+        assert response.status_code == 503
+        assert response.json()["status"] == "unavailable"
+
+    def test_readyz_rejects_stale_result(self, client, readiness, settings):
+        readiness.refresh()
+        healthy, checks, checked_at = readiness._snapshot
+        readiness._snapshot = (healthy, checks, checked_at - settings.READINESS_MAX_AGE - 1)
+        response = client.get('/readyz')
+        assert response.status_code == 503
+        assert response.json()["status"] == "stale"
+
+    def test_checker_thread_starts_once(self):
+        import threading
+        from syrupstore.health import ReadinessMonitor
+
+        monitor = ReadinessMonitor()
+        release = threading.Event()
+        monitor._run = release.wait
+        monitor.start()
+        thread = monitor._thread
+        monitor.start()
+        assert monitor._thread is thread and thread.is_alive()
+        release.set()
+        thread.join(timeout=1)
+
+
 @pytest.mark.django_db
 class TestInputValidation:
     """Test input validation and sanitization"""
@@ -0,0 +1,89 @@
+"""
+Tests for the synthetic data generator behind seed_scale
+"""
+from datetime import datetime, timezone as dt_timezone
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Sum
+from shop.analytics import COUNTED_STATUSES
+from shop.models import Cart, CartItem, DailySalesRollup, Order, OrderItem, Product, User
+from shop.seeding import ZONE_CENTS, ScaleSeeder
+
+NOW = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _snapshot():
+    return (
+        list(Order.objects.order_by("pk").values_list(
+            "user__username", "status", "shipping_zone", "shipping_city", "total_cents", "created_at"
+        )),
+        list(OrderItem.objects.order_by("pk").values_list("order_id", "product_name", "quantity", "price_cents")),
+        list(CartItem.objects.order_by("pk").values_list("cart__owner__username", "product__name", "quantity")),
+    )
+
+
+def _reset():
+    for model in (OrderItem, Order, CartItem, Cart, User, Product):
+        model.objects.all().delete()
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestScaleSeeder:
+    def test_rows_are_consistent(self):
+        """Test totals, shipping and cart counters agree with the generated lines"""
+        counts = ScaleSeeder(users=50, orders=300, products=6, cart_ratio=0.5, seed=3, batch_size=64, now=NOW).run()
+
+        assert counts["orders"] == Order.objects.count() == 300
+        assert counts["order items"] == OrderItem.objects.count() >= 300
+        assert counts["users"] == User.objects.count() == 50
+
+        for order in Order.objects.prefetch_related("items"):
+            assert order.shipping_cents == ZONE_CENTS[order.shipping_zone]
+            assert order.total_cents == order.shipping_cents + sum(i.price_cents * i.quantity for i in order.items.all())
+            assert order.shipping_summary == order.build_shipping_summary()
+            assert order.created_at <= NOW
+            assert order.items.all()
+
+        for cart in Cart.objects.annotate(lines=Count("items")):
+            assert cart.item_count == cart.lines
+            assert cart.subtotal_cents == sum(i.product.price_cents * i.quantity for i in cart.items.all())
+
+    def test_same_seed_same_data(self):
+        """Test a seed reproduces the same rows and a different seed does not"""
+        ScaleSeeder(users=20, orders=100, products=4, seed=7, now=NOW).run()
+        first = _snapshot()
+        _reset()
+        ScaleSeeder(users=20, orders=100, products=4, seed=7, now=NOW).run()
+        assert _snapshot() == first
+        _reset()
+        ScaleSeeder(users=20, orders=100, products=4, seed=8, now=NOW).run()
+        assert _snapshot() != first
+
+    def test_old_orders_are_final(self):
+        """Test orders older than a few weeks are delivered or cancelled"""
+        ScaleSeeder(users=20, orders=500, products=4, days=365, now=NOW).run()
+        statuses = set(
+            Order.objects.filter(created_at__lt=datetime(2025, 12, 1, tzinfo=dt_timezone.utc))
+            .values_list("status", flat=True)
+        )
+        assert statuses <= {"DELIVERED", "CANCELLED"}
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestSeedScaleCommand:
+    def test_creates_data_and_rollups(self):
+        """Test the command writes the requested rows and rebuilds sales rollups"""
+        call_command("seed_scale", users=10, orders=40, products=3)
+
+        assert Order.objects.count() == 40
+        assert DailySalesRollup.objects.filter(kind=DailySalesRollup.KIND_ZONE).aggregate(n=Sum("orders"))["n"] == (
+            Order.objects.filter(status__in=COUNTED_STATUSES).count()
+        )
+
+    def test_copy_requires_postgres(self):
+        """Test --copy is refused on other databases"""
+        with pytest.raises(CommandError, match="PostgreSQL"):
+            call_command("seed_scale", users=1, orders=1, copy=True)
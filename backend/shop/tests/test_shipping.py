@@ -2,7 +2,26 @@
 Unit tests for shipping logic
 """
 import pytest
-from shop.shipping import estimate_shipping, calculate_shipping_cents
+from django.core.cache import caches
+from shop import shipping
+from shop.models import ShippingRate
+from shop.shipping import (
+    DEFAULT_RATES,
+    RATE_TABLE_CACHE,
+    RATE_TABLE_VERSION_KEY,
+    RateTable,
+    calculate_shipping_cents,
+    estimate_shipping,
+    invalidate_rate_table,
+)
+
+
+@pytest.fixture
+def fresh_rate_table():
+    """Rebuild the compiled table around a test so rolled-back rows don't leak."""
+    invalidate_rate_table()
+    yield
+    invalidate_rate_table()
 
 
 @pytest.mark.unit
@@ -154,3 +173,113 @@ class TestCalculateShippingCents:
         cents = calculate_shipping_cents("USA", "California", "90210")
         assert cents == 2999
 
+
+@pytest.mark.unit
+class TestRateTable:
+    """Test the compiled in-memory rate lookup"""
+
+    def _table(self, *extra):
+        return RateTable(DEFAULT_RATES + list(extra))
+
+    def test_defaults_match_builtin_zones(self):
+        """Test the default rates reproduce the original four zones"""
+        table = self._table()
+        assert table.lookup("CA", "ON", "P0R1B0") == (499, "LOCAL_RADIUS")
+        assert table.lookup("CA", "ON", "M5H2N2") == (799, "ONTARIO")
+        assert table.lookup("CA", "QC", "H2X3A2") == (1299, "CANADA")
+        assert table.lookup("US", "CA", "90210") == (2999, "INTERNATIONAL")
+
+    def test_province_specific_rate(self):
+        """Test a per-province row overrides the country rate"""
+        table = self._table({"zone": "QUEBEC", "country": "CA", "region": "QC", "postal_prefix": "", "cents": 999})
+        assert table.lookup("CA", "QC", "H2X3A2") == (999, "QUEBEC")
+        assert table.lookup("CA", "BC", "V6B2W9") == (1299, "CANADA")
+
+    def test_longest_postal_prefix_wins(self):
+        """Test the trie returns the most specific postal prefix"""
+        table = self._table(
+            {"zone": "TOWN", "country": "CA", "region": "ON", "postal_prefix": "P0R1", "cents": 299},
+        )
+        assert table.lookup("CA", "ON", "P0R1B0") == (299, "TOWN")
+        assert table.lookup("CA", "ON", "P0R2A1") == (499, "LOCAL_RADIUS")
+
+    def test_country_wide_postal_prefix(self):
+        """Test a postal prefix without a region applies across the country"""
+        table = self._table({"zone": "NORTH", "country": "CA", "region": "", "postal_prefix": "X", "cents": 3999})
+        assert table.lookup("CA", "NU", "X0A0H0") == (3999, "NORTH")
+        assert table.lookup("CA", "ON", "X0A0H0") == (3999, "NORTH")
+        assert table.lookup("CA", "ON", "P0R1B0") == (499, "LOCAL_RADIUS")
+
+    def test_weight_tiers(self):
+        """Test the heaviest tier not above the parcel weight is used"""
+        table = self._table(
+            {"zone": "CANADA", "country": "CA", "region": "", "postal_prefix": "", "min_weight_grams": 2000, "cents": 1899},
+            {"zone": "CANADA", "country": "CA", "region": "", "postal_prefix": "", "min_weight_grams": 5000, "cents": 2499},
+        )
+        assert table.lookup("CA", "QC", "H2X3A2", 0) == (1299, "CANADA")
+        assert table.lookup("CA", "QC", "H2X3A2", 2000) == (1899, "CANADA")
+        assert table.lookup("CA", "QC", "H2X3A2", 9000) == (2499, "CANADA")
+
+    def test_province_names_and_codes_are_equivalent(self):
+        """Test full province names resolve to the same rates as codes"""
+        assert estimate_shipping("CA", "ON", "M5H 2N2") == estimate_shipping("Canada", "Ontario", "M5H 2N2")
+
+    def test_memoized_per_normalized_prefix(self):
+        """Test postal codes sharing the significant prefix share a memo entry"""
+        table = self._table()
+        assert table.prefix_length == 3
+        table.cached_lookup("CA", "ON", "P0R", 0)
+        table.cached_lookup("CA", "ON", "P0R", 0)
+        info = table.cached_lookup.cache_info()
+        assert info.hits == 1
+        assert info.misses == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestShippingRateTable:
+    """Test rates are read from the ShippingRate table"""
+
+    def test_default_rates_seeded(self):
+        """Test the migration seeds the built-in rates"""
+        assert ShippingRate.objects.filter(is_active=True).count() == len(DEFAULT_RATES)
+
+    def test_new_rate_rebuilds_table(self, fresh_rate_table, django_capture_on_commit_callbacks):
+        """Test saving a rate is picked up by the next estimate"""
+        assert estimate_shipping("Canada", "Quebec", "H2X 3A2") == (1299, "CANADA")
+        with django_capture_on_commit_callbacks(execute=True):
+            ShippingRate.objects.create(zone="QUEBEC", country="CA", region="QC", cents=999)
+        assert estimate_shipping("Canada", "Quebec", "H2X 3A2") == (999, "QUEBEC")
+
+    def test_inactive_rate_ignored(self, fresh_rate_table, django_capture_on_commit_callbacks):
+        """Test deactivating a rate removes it from the table"""
+        rate = ShippingRate.objects.get(postal_prefix="P0R")
+        rate.is_active = False
+        with django_capture_on_commit_callbacks(execute=True):
+            rate.save()
+        assert estimate_shipping("Canada", "Ontario", "P0R 1B0") == (799, "ONTARIO")
+
+    def test_invalidated_after_commit(self, fresh_rate_table, django_capture_on_commit_callbacks):
+        """Test the version only changes once the rate's transaction commits"""
+        version = caches[RATE_TABLE_CACHE].get(RATE_TABLE_VERSION_KEY)
+        with django_capture_on_commit_callbacks() as callbacks:
+            ShippingRate.objects.create(zone="QUEBEC", country="CA", region="QC", cents=999)
+            assert caches[RATE_TABLE_CACHE].get(RATE_TABLE_VERSION_KEY) == version
+        assert callbacks == [invalidate_rate_table]
+
+    def test_other_processes_see_changes(self, fresh_rate_table, monkeypatch):
+        """Test a version bumped elsewhere rebuilds this process's table at its next check"""
+        assert estimate_shipping("Canada", "Quebec", "H2X 3A2") == (1299, "CANADA")
+        ShippingRate.objects.create(zone="QUEBEC", country="CA", region="QC", cents=999)
+        # Another process committed the rate and bumped the shared version
+        caches[RATE_TABLE_CACHE].set(RATE_TABLE_VERSION_KEY, "elsewhere", None)
+        assert estimate_shipping("Canada", "Quebec", "H2X 3A2") == (1299, "CANADA")
+        monkeypatch.setattr(shipping, "_next_version_check", 0.0)
+        assert estimate_shipping("Canada", "Quebec", "H2X 3A2") == (999, "QUEBEC")
+
+    def test_estimates_do_not_query_database(self, fresh_rate_table, django_assert_num_queries):
+        """Test only the first estimate after a change loads the table"""
+        with django_assert_num_queries(1):
+            estimate_shipping("Canada", "Ontario", "M5H 2N2")
+            estimate_shipping("Canada", "Ontario", "P0R 1B0")
+            estimate_shipping("USA", "California", "90210")
@@ -0,0 +1,42 @@
+"""
+Tests for the in-process background task runner
+"""
+import threading
+
+import pytest
+from shop import tasks
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestTaskPool:
+    @pytest.fixture(autouse=True)
+    def pooled(self, settings):
+        settings.SHOP_TASKS_EAGER = False
+        settings.SHOP_TASK_WORKERS = 1
+        yield
+        tasks.shutdown()
+
+    def test_shutdown_drains_queued_tasks(self, django_capture_on_commit_callbacks):
+        """Test shutting the pool down runs tasks still waiting in its queue"""
+        release = threading.Event()
+        ran = []
+        with django_capture_on_commit_callbacks(execute=True):
+            tasks.enqueue(release.wait, 5)
+            for n in range(3):
+                tasks.enqueue(ran.append, n)
+        assert ran == []
+
+        release.set()
+        tasks.shutdown()
+        assert ran == [0, 1, 2]
+
+    def test_failures_do_not_stop_the_pool(self, django_capture_on_commit_callbacks, caplog):
+        """Test a failing task is logged and later tasks still run"""
+        ran = []
+        with django_capture_on_commit_callbacks(execute=True):
+            tasks.enqueue(lambda: 1 / 0)
+            tasks.enqueue(ran.append, "after")
+        tasks.shutdown()
+        assert ran == ["after"]
+        assert "Background task" in caplog.text
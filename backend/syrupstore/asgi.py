@@ -0,0 +1,9 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "syrupstore.settings")
+# Served over ASGI, /graphql/ uses the async view unless explicitly disabled.
+os.environ.setdefault("GRAPHQL_ASYNC", "true")
+
+application = get_asgi_application()
@@ -0,0 +1,81 @@
+"""
+Kubernetes probes that never touch the database or disk on the request path.
+
+``/livez`` answers from memory: a process that can run a view is alive.
+``/readyz`` serves the last result of the django-health-check plugins
+(database, cache, storage), which a daemon thread re-runs every
+``READINESS_CHECK_INTERVAL`` seconds. However often the kubelet probes, the
+deep checks run once per interval per process.
+
+The thread is started by the first ``/readyz`` request rather than at
+import, so each worker process (forked after import under gunicorn) gets
+its own.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from health_check.mixins import CheckMixin
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessMonitor(CheckMixin):
+    """Runs the registered health checks in the background and remembers the outcome."""
+
+    # Already off the request thread; run the plugins one after another.
+    use_threading = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        # (healthy, {plugin: status}, monotonic time of the check), or None before the first run.
+        self._snapshot = None
+
+    def refresh(self):
+        """Run every health check now and keep the result."""
+        try:
+            errors = self.run_check()
+            checks = {label: str(plugin.pretty_status()) for label, plugin in self.plugins.items()}
+            healthy = not errors
+        except Exception:
+            logger.exception("Readiness check failed")
+            checks, healthy = {"checker": "unexpected error"}, False
+        self._snapshot = (healthy, checks, time.monotonic())
+
+    def start(self):
+        """Start the background checker once per process."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="readiness-checker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self.refresh()
+            # The checks ran on this thread's own connections; do not hold them between runs.
+            connections.close_all()
+            time.sleep(settings.READINESS_CHECK_INTERVAL)
+
+    def status(self):
+        """``(ready, body)`` from the last check; never runs a check itself."""
+        self.start()
+        snapshot = self._snapshot
+        if snapshot is None:
+            return False, {"status": "starting"}
+        healthy, checks, checked_at = snapshot
+        age = time.monotonic() - checked_at
+        if age > settings.READINESS_MAX_AGE:
+            # The checker is stuck (e.g. a hung DB connect); do not keep reporting an old success.
+            state = "stale"
+            healthy = False
+        else:
+            state = "ok" if healthy else "unavailable"
+        return healthy, {"status": state, "checks": checks, "age": round(age, 1)}
+
+
+readiness = ReadinessMonitor()
@@ -1,11 +1,48 @@
 """
-Custom middleware for additional security headers
+Custom middleware for security headers, response compression, profiling and load-test instrumentation
 """
+import zlib
+from types import MappingProxyType
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from csp.middleware import CSPMiddleware
+from csp.utils import build_policy
+from django.conf import settings
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+from whitenoise.middleware import WhiteNoiseMiddleware
 
-class SecurityHeadersMiddleware:
+from syrupstore.profiling import aprofile_request, profile_request, token_user
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+SECURITY_HEADERS = MappingProxyType({
+    # Permissions Policy - restrict access to sensitive features
+    "Permissions-Policy": (
+        "geolocation=(), "
+        "microphone=(), "
+        "camera=(), "
+        "payment=(), "
+        "usb=(), "
+        "magnetometer=(), "
+        "gyroscope=(), "
+        "accelerometer=()"
+    ),
+    # Referrer Policy - protect user privacy
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    # Additional protection headers
+    "X-Content-Type-Options": "nosniff",
+})
+
+
+class SecurityHeadersMiddleware(MiddlewareMixin):
     """
-    Adds additional security headers to all responses.
+    Adds additional security headers (``SECURITY_HEADERS``) to all responses.
     
     Headers added:
     - Permissions-Policy: Controls browser feature access
@@ -13,28 +50,243 @@ class SecurityHeadersMiddleware:
     - X-Content-Type-Options: Prevents MIME sniffing
     """
     
+    def process_response(self, request, response):
+        for name, value in SECURITY_HEADERS.items():
+            response[name] = value
+        return response
+
+
+class PrecomputedCSPMiddleware(CSPMiddleware):
+    """
+    django-csp's middleware with the settings-only policy built once.
+
+    Responses that customise their policy (``csp_update``/``csp_replace``
+    decorators) or used a nonce still get a policy built for them.
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.default_policy = build_policy()
+
+    def build_policy(self, request, response):
+        customised = any(getattr(response, attr, None) for attr in ("_csp_config", "_csp_update", "_csp_replace"))
+        if customised or getattr(request, "_csp_nonce", None):
+            return super().build_policy(request, response)
+        return self.default_policy
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs in async middleware chains.
+
+    WhiteNoise is sync-only, and one sync middleware makes Django run the
+    whole chain, async views included, on a thread per request. File lookups
+    and opens go to a thread instead; everything else is awaited directly.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+def _accepted_encodings(header):
+    """Content codings from an Accept-Encoding header with a non-zero q-value."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _gzip_stream():
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return compressor.compress, compressor.flush
+
+
+def _brotli_stream():
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compressor.process, compressor.finish
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses responses with brotli (when installed and accepted) or gzip.
+
+    Bodies under ``COMPRESSION_MIN_BYTES`` and content types starting with
+    an entry of ``COMPRESSION_EXCLUDED_TYPES`` (PDFs, event streams, images)
+    are sent as is. Streaming responses are compressed chunk by chunk
+    without buffering. gzip output carries Django's random filename padding
+    against BREACH, like ``GZipMiddleware``.
+    """
+
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or response.has_header("Content-Range"):
+            return response
+        if response.get("Content-Type", "").startswith(settings.COMPRESSION_EXCLUDED_TYPES):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        accepted = _accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if brotli is not None and "br" in accepted:
+            encoding, stream = "br", _brotli_stream
+        elif "gzip" in accepted:
+            encoding, stream = "gzip", _gzip_stream
+        else:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self._compress_stream(response, stream)
+            del response.headers["Content-Length"]
+        else:
+            if encoding == "br":
+                compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # A strong ETag no longer matches the encoded bytes (RFC 9110 8.8.1).
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def _compress_stream(self, response, stream):
+        # Bind the original iterator now; streaming_content is replaced below.
+        chunks = response.streaming_content
+        compress, finish = stream()
+
+        if response.is_async:
+            async def compressed():
+                async for chunk in chunks:
+                    data = compress(chunk)
+                    if data:
+                        yield data
+                yield finish()
+        else:
+            def compressed():
+                for chunk in chunks:
+                    data = compress(chunk)
+                    if data:
+                        yield data
+                yield finish()
+        return compressed()
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a single request end to end for staff (see syrupstore.profiling).
+
+    Only requests with an ``X-Profile-Token`` header are looked at; an invalid
+    or expired token is ignored and the request runs unprofiled.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
-    
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = request.headers.get("X-Profile-Token")
+        user = token_user(token) if token else None
+        if user is None:
+            return self.get_response(request)
+        return profile_request(request, self.get_response, user)
+
+    async def __acall__(self, request):
+        token = request.headers.get("X-Profile-Token")
+        user = await sync_to_async(token_user)(token) if token else None
+        if user is None:
+            return await self.get_response(request)
+        return await aprofile_request(request, self.get_response, user)
+
+
+class QueryCountMiddleware:
+    """
+    Reports how many database queries a request ran in an X-DB-Queries header.
+
+    Only installed when QUERY_COUNT_HEADER is enabled (load tests); it lets
+    external load generators attribute query counts to each operation.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
     def __call__(self, request):
-        response = self.get_response(request)
-        
-        # Permissions Policy - restrict access to sensitive features
-        response["Permissions-Policy"] = (
-            "geolocation=(), "
-            "microphone=(), "
-            "camera=(), "
-            "payment=(), "
-            "usb=(), "
-            "magnetometer=(), "
-            "gyroscope=(), "
-            "accelerometer=()"
-        )
-        
-        # Referrer Policy - protect user privacy
-        response["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        # Additional protection headers
-        response["X-Content-Type-Options"] = "nosniff"
-        
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        response["X-DB-Queries"] = str(counter.count)
+        return response
+
+    async def __acall__(self, request):
+        # Connections are per thread and the loop thread runs no queries: count
+        # on the thread every thread-sensitive sync_to_async call of the request uses.
+        counter = _QueryCounter()
+        await sync_to_async(counter.install)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(counter.uninstall)()
+        response["X-DB-Queries"] = str(counter.count)
         return response
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        connection.execute_wrappers.append(self)
+
+    def uninstall(self):
+        connection.execute_wrappers.remove(self)
@@ -0,0 +1,209 @@
+"""
+On-demand sampling profiles of single requests, for staff.
+
+A request carrying a valid ``X-Profile-Token`` header (minted for a staff
+user by ``manage.py profiles token``) is profiled end to end by
+``ProfilingMiddleware``: while it runs, a sampler thread records the
+request thread's stack every ``PROFILE_SAMPLE_INTERVAL`` seconds. The
+samples are saved as a speedscope file (https://www.speedscope.app) in
+``PROFILE_DIR``, a ring buffer of the last ``PROFILE_BUFFER_SIZE``
+profiles shared by every worker of the pod, and the response carries the
+profile's id in ``X-Profile-Id``. ``manage.py profiles list|get`` reads
+them back, as speedscope JSON or as collapsed stacks for flamegraph.pl.
+
+Only the thread that serves the request is sampled: under ASGI that is the
+event loop thread, so work handed to other threads (``sync_to_async``) is not
+in the profile, and coroutines of other requests interleaved on the loop are.
+"""
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+
+TOKEN_SALT = "syrupstore.profiling"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+PROFILE_SUFFIX = ".speedscope.json"
+
+
+def issue_token(user):
+    """A signed profiling token for a staff user."""
+    if not user.is_staff:
+        raise ValueError(f"{user.username} is not staff")
+    return signing.dumps({"user": user.pk}, salt=TOKEN_SALT)
+
+
+def token_user(token):
+    """The active staff user a profiling token was issued to, or None."""
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=payload.get("user"), is_staff=True, is_active=True).first()
+
+
+class Sampler:
+    """Samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = {}  # (name, file, line) -> index
+        self.samples = []  # root-first frame indexes
+        self.weights = []  # milliseconds each sample stands for
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.duration = (time.perf_counter() - self.started) * 1000
+
+    def _run(self):
+        last = self.started
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.samples.append(self._stack(frame))
+                self.weights.append((now - last) * 1000)
+            last = now
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_qualname, code.co_filename, code.co_firstlineno)
+            stack.append(self.frames.setdefault(key, len(self.frames)))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def speedscope(self, name, metadata):
+        """The samples as a speedscope file; ``metadata`` is kept alongside for listing."""
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "syrupstore.profiling",
+            "metadata": metadata,
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [{"name": n, "file": f, "line": line} for n, f, line in self.frames],
+            },
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+def collapsed_stacks(profile):
+    """A speedscope profile as collapsed stacks (``a;b;c <microseconds>``) for flamegraph.pl."""
+    frames = [
+        f"{frame['name']} ({os.path.basename(frame['file'])}:{frame['line']})".replace(";", ":")
+        for frame in profile["shared"]["frames"]
+    ]
+    totals = {}
+    for sample, weight in zip(profile["profiles"][0]["samples"], profile["profiles"][0]["weights"]):
+        key = ";".join(frames[index] for index in sample)
+        totals[key] = totals.get(key, 0) + weight
+    return "".join(f"{stack} {round(weight * 1000)}\n" for stack, weight in totals.items())
+
+
+def save_profile(profile):
+    """Store a profile in the ring buffer, dropping the oldest beyond ``PROFILE_BUFFER_SIZE``; returns its id."""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    # Ids sort by creation time, so the directory listing is the buffer order.
+    profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{secrets.token_hex(3)}"
+    path = os.path.join(settings.PROFILE_DIR, profile_id + PROFILE_SUFFIX)
+    with open(path + ".tmp", "w") as f:
+        json.dump(profile, f)
+    os.replace(path + ".tmp", path)
+
+    for stale in profile_ids()[:-settings.PROFILE_BUFFER_SIZE]:
+        try:
+            os.remove(os.path.join(settings.PROFILE_DIR, stale + PROFILE_SUFFIX))
+        except FileNotFoundError:  # another worker trimmed it first
+            pass
+    return profile_id
+
+
+def profile_ids():
+    """Ids of the stored profiles, oldest first."""
+    try:
+        names = os.listdir(settings.PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len(PROFILE_SUFFIX)] for name in names if name.endswith(PROFILE_SUFFIX))
+
+
+def load_profile(profile_id):
+    """A stored profile, or None if it has left the buffer."""
+    if os.path.basename(profile_id) != profile_id:
+        return None
+    try:
+        with open(os.path.join(settings.PROFILE_DIR, profile_id + PROFILE_SUFFIX)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def operation_names(request):
+    """GraphQL operation names in a JSON POST body (one per batched operation), for labelling."""
+    if request.content_type != "application/json":
+        return []
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return []
+    operations = data if isinstance(data, list) else [data]
+    return [o.get("operationName") or "anonymous" for o in operations if isinstance(o, dict)]
+
+
+def profile_request(request, get_response, user):
+    """Run the request under the sampler, store the profile and tag the response with its id."""
+    names = operation_names(request)
+    with Sampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL) as sampler:
+        response = get_response(request)
+    return _tag_response(request, response, sampler, names, user)
+
+
+async def aprofile_request(request, get_response, user):
+    """``profile_request`` for async middleware chains, sampling the event loop thread."""
+    names = operation_names(request)
+    with Sampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL) as sampler:
+        response = await get_response(request)
+    return await sync_to_async(_tag_response)(request, response, sampler, names, user)
+
+
+def _tag_response(request, response, sampler, names, user):
+    metadata = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "method": request.method,
+        "path": request.path,
+        "operations": names,
+        "status": response.status_code,
+        "duration_ms": round(sampler.duration, 1),
+        "samples": len(sampler.samples),
+        "user": user.get_username(),
+    }
+    label = f"{request.method} {request.path}" + (f" {','.join(names)}" if names else "")
+    response["X-Profile-Id"] = save_profile(sampler.speedscope(label, metadata))
+    return response
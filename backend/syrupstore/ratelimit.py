@@ -0,0 +1,128 @@
+"""
+Cost-weighted token-bucket rate limiting for the GraphQL endpoint.
+
+Every POST is parsed once (documents are memoised by query text) and its
+root fields are priced from ``GRAPHQL_FIELD_COSTS``: a catalogue read costs
+one token, ``adminOrders`` or ``checkout`` many more. The cost is taken from
+the ``graphql`` bucket of the client IP and, for authenticated requests,
+of the user. Fields listed in ``GRAPHQL_FIELD_BUCKETS`` additionally draw one
+token per use from a dedicated, stricter bucket (checkout, receipts).
+
+Buckets live in the ``shared`` cache as ``(tokens, updated_at)`` pairs and
+refill continuously, so every worker draws from the same buckets; pointed at
+a process-local backend, each process enforces its own limits. Reads and
+writes are not atomic, so simultaneous requests from one client can get
+slightly more than their share.
+"""
+import math
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django_ratelimit.core import _get_ip
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    get_operation_ast,
+    parse,
+)
+
+PARSE_CACHE_SIZE = 512
+RATE_LIMIT_CACHE = "shared"
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_query(query):
+    """``graphql.parse`` memoised by query text; clients send the same few documents."""
+    return parse(query)
+
+
+def _root_fields(selection_set, fragments):
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            yield selection.name.value
+        elif isinstance(selection, InlineFragmentNode):
+            yield from _root_fields(selection.selection_set, fragments)
+        elif isinstance(selection, FragmentSpreadNode) and selection.name.value in fragments:
+            yield from _root_fields(fragments[selection.name.value].selection_set, fragments)
+
+
+def operation_charge(query, operation_name=None):
+    """
+    ``{bucket: tokens}`` an operation costs, priced by its root fields.
+
+    Unparseable documents and unknown operations cost the default field cost:
+    they fail before any resolver runs.
+    """
+    default = settings.GRAPHQL_DEFAULT_FIELD_COST
+    try:
+        document = parse_query(query)
+    except Exception:
+        return {"graphql": default}
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return {"graphql": default}
+
+    fragments = {d.name.value: d for d in document.definitions if isinstance(d, FragmentDefinitionNode)}
+    costs = {"graphql": 0}
+    for name in _root_fields(operation.selection_set, fragments):
+        if name.startswith("__"):
+            continue
+        costs["graphql"] += settings.GRAPHQL_FIELD_COSTS.get(name, default)
+        bucket = settings.GRAPHQL_FIELD_BUCKETS.get(name)
+        if bucket:
+            costs[bucket] = costs.get(bucket, 0) + 1
+    costs["graphql"] = max(costs["graphql"], default)
+    return costs
+
+
+def combine_charges(charges):
+    """Sum several operations' charges (a batch)."""
+    total = {"graphql": 0}
+    for charge in charges:
+        for bucket, cost in charge.items():
+            total[bucket] = total.get(bucket, 0) + cost
+    return total
+
+
+def request_identities(request, user=None):
+    """``[(scope, identifier)]`` a request is limited under: its IP, plus the user if known."""
+    identities = [("ip", _get_ip(request))]
+    if user is not None and user.is_authenticated:
+        identities.append(("user", str(user.pk)))
+    return identities
+
+
+def consume(charge, identities, now=None):
+    """
+    Take ``charge`` from every bucket of every identity, or from none.
+
+    Returns 0 when allowed, otherwise the seconds until the emptiest bucket
+    has refilled enough.
+    """
+    now = time.time() if now is None else now
+    limits = []
+    for bucket, cost in charge.items():
+        for scope, identifier in identities:
+            capacity, per_minute = settings.GRAPHQL_RATE_BUCKETS[bucket][scope]
+            # Never ask for more than a full bucket, or the operation could never run.
+            limits.append((f"gqlrl:{bucket}:{scope}:{identifier}", min(cost, capacity), capacity, per_minute / 60))
+
+    cache = caches[RATE_LIMIT_CACHE]
+    stored = cache.get_many([key for key, _, _, _ in limits])
+    updates, wait, timeout = {}, 0.0, 0
+    for key, cost, capacity, per_second in limits:
+        tokens, updated_at = stored.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * per_second)
+        if tokens < cost:
+            wait = max(wait, (cost - tokens) / per_second)
+        updates[key] = (tokens - cost, now)
+        timeout = max(timeout, math.ceil(capacity / per_second))
+
+    if wait:
+        return wait
+    cache.set_many(updates, timeout)
+    return 0
@@ -1,14 +1,16 @@
 import graphene
 import graphql_jwt
-from shop.schema import Query as ShopQuery, Mutation as ShopMutation
+from graphene_django.debug import DjangoDebug
+from shop.schema import Query as ShopQuery, Mutation as ShopMutation, ObtainJSONWebToken
 
 
 class Query(ShopQuery, graphene.ObjectType):
-    pass
+    # SQL and exceptions of the request so far; null unless capture is on (settings.GRAPHQL_DEBUG)
+    debug = graphene.Field(DjangoDebug, name="_debug")
 
 
 class Mutation(ShopMutation, graphene.ObjectType):
-    token_auth = graphql_jwt.ObtainJSONWebToken.Field()
+    token_auth = ObtainJSONWebToken.Field()
     verify_token = graphql_jwt.Verify.Field()
     refresh_token = graphql_jwt.Refresh.Field()
 
@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "graphene_django",
     "corsheaders",
     "health_check",
@@ -35,8 +36,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "syrupstore.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "syrupstore.middleware.AsyncWhiteNoiseMiddleware",
+    "syrupstore.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -44,10 +47,15 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "csp.middleware.CSPMiddleware",
+    "syrupstore.middleware.PrecomputedCSPMiddleware",
     "syrupstore.middleware.SecurityHeadersMiddleware",
 ]
 
+# Report per-request DB query counts in an X-DB-Queries header (load tests only)
+QUERY_COUNT_HEADER = os.environ.get("QUERY_COUNT_HEADER", "false").lower() == "true"
+if QUERY_COUNT_HEADER:
+    MIDDLEWARE.insert(0, "syrupstore.middleware.QueryCountMiddleware")
+
 ROOT_URLCONF = "syrupstore.urls"
 
 TEMPLATES = [
@@ -66,6 +74,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "syrupstore.wsgi.application"
+ASGI_APPLICATION = "syrupstore.asgi.application"
 
 # Database configuration with SQLite support for testing
 DB_ENGINE = os.environ.get("DB_ENGINE", "django.db.backends.postgresql")
@@ -132,26 +141,46 @@ CSRF_TRUSTED_ORIGINS = [
     if origin.strip()
 ]
 
+# SQL/exception capture for the _debug query field (graphene_django.debug): "always" records every
+# request, "staff" only staff requests sent with an X-GraphQL-Debug: 1 header, "off" never.
+# Capture wraps every resolver and cursor, so production only turns it on when asked.
+GRAPHQL_DEBUG = os.environ.get("GRAPHQL_DEBUG", "always" if DEBUG else "staff")
+
 GRAPHENE = {
     "SCHEMA": "syrupstore.schema.schema",
     "MIDDLEWARE": [
-        "graphene_django.debug.DjangoDebugMiddleware",
+        *(["graphene_django.debug.DjangoDebugMiddleware"] if GRAPHQL_DEBUG == "always" else []),
         "graphql_jwt.middleware.JSONWebTokenMiddleware",
     ],
 }
 
 AUTHENTICATION_BACKENDS = [
-    "graphql_jwt.backends.JSONWebTokenBackend",
+    "shop.auth.CachedJSONWebTokenBackend",
     "django.contrib.auth.backends.ModelBackend",
 ]
 
 GRAPHQL_JWT = {
     "JWT_VERIFY_EXPIRATION": True,
     "JWT_EXPIRATION_DELTA": timedelta(hours=6),
+    "JWT_PAYLOAD_HANDLER": "shop.auth.jwt_payload",
 }
 
+# Serve /graphql/ with AsyncGraphQLView (set by asgi.py; only useful under ASGI)
+GRAPHQL_ASYNC = os.environ.get("GRAPHQL_ASYNC", "false").lower() == "true"
+
+# Seconds a JWT-authenticated user may be served from cache (shop.auth)
+JWT_USER_CACHE_TTL = int(os.environ.get("JWT_USER_CACHE_TTL", "60"))
+
+# Order status SSE stream (/api/orders/events/): lifetime before the client
+# reconnects, keepalive comment interval, the reconnect delay sent to it, and
+# seconds an orderEventsTicket may be used to open a stream
+ORDER_EVENTS_MAX_SECONDS = int(os.environ.get("ORDER_EVENTS_MAX_SECONDS", "300"))
+ORDER_EVENTS_KEEPALIVE_SECONDS = int(os.environ.get("ORDER_EVENTS_KEEPALIVE_SECONDS", "15"))
+ORDER_EVENTS_RETRY_MS = int(os.environ.get("ORDER_EVENTS_RETRY_MS", "3000"))
+ORDER_EVENTS_TICKET_MAX_AGE = int(os.environ.get("ORDER_EVENTS_TICKET_MAX_AGE", "60"))
+
 # Email configuration
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
 EMAIL_HOST = os.environ.get("EMAIL_HOST", "smtp.gmail.com")
 EMAIL_PORT = int(os.environ.get("EMAIL_PORT", "587"))
 EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "true").lower() == "true"
@@ -167,6 +196,8 @@ ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL", "admin@maplesyrup.co")
 # HTTPS/SSL Configuration (enabled in production)
 SECURE_SSL_REDIRECT = os.environ.get("SECURE_SSL_REDIRECT", "false").lower() == "true"
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https") if not DEBUG else None
+# Kubelet probes call the pod over plain HTTP
+SECURE_REDIRECT_EXEMPT = [r"^livez$", r"^readyz$"]
 SESSION_COOKIE_SECURE = os.environ.get("SESSION_COOKIE_SECURE", "false").lower() == "true"
 CSRF_COOKIE_SECURE = os.environ.get("CSRF_COOKIE_SECURE", "false").lower() == "true"
 
@@ -200,18 +231,91 @@ CSP_FONT_SRC = ("'self'", "data:")
 CSP_CONNECT_SRC = ("'self'",)
 CSP_FRAME_ANCESTORS = ("'none'",)
 
+# Response compression (syrupstore.middleware.CompressionMiddleware)
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSION_EXCLUDED_TYPES = ("application/pdf", "text/event-stream", "image/", "application/zip", "application/gzip")
+
 # Rate Limiting Configuration
 RATELIMIT_ENABLE = os.environ.get("RATELIMIT_ENABLE", "true").lower() == "true"
 RATELIMIT_USE_CACHE = "default"
 
-# Cache Configuration (for rate limiting)
+# GraphQL token buckets (syrupstore.ratelimit): bucket -> scope -> (capacity, refill per minute).
+# Authenticated requests draw from both their IP's and their user's bucket.
+GRAPHQL_RATE_BUCKETS = {
+    "graphql": {"ip": (300, 300), "user": (600, 600)},
+    "checkout": {"ip": (10, 10), "user": (5, 5)},
+    "receipts": {"ip": (30, 30), "user": (20, 20)},
+}
+# Tokens taken from the "graphql" bucket per root field; unlisted fields cost the default
+GRAPHQL_DEFAULT_FIELD_COST = 1
+GRAPHQL_FIELD_COSTS = {
+    "orders": 5,
+    "searchProducts": 3,
+    "shippingEstimates": 5,
+    "adminProducts": 5,
+    "adminOrders": 50,
+    "salesReport": 20,
+    "tokenAuth": 10,
+    "registerUser": 10,
+    "checkout": 20,
+    "generateReceipt": 20,
+    "bulkUpdateOrderStatus": 20,
+}
+# Root fields that also take one token from a dedicated bucket
+GRAPHQL_FIELD_BUCKETS = {
+    "checkout": "checkout",
+    "generateReceipt": "receipts",
+}
+# Apollo batch requests: most operations per POST, and most "graphql" tokens one batch may cost
+GRAPHQL_BATCH_MAX_OPERATIONS = int(os.environ.get("GRAPHQL_BATCH_MAX_OPERATIONS", "10"))
+GRAPHQL_BATCH_MAX_COST = int(os.environ.get("GRAPHQL_BATCH_MAX_COST", "100"))
+
+# Cache Configuration
+# "default" is per process (cached JWT users). "shared" is seen by every worker and survives
+# restarts; it holds guest carts, the GraphQL rate-limit buckets, and the versions that tell
+# every process its cached JWT users or shipping rate table are stale. It is Redis when
+# REDIS_URL is set (needs the redis package), otherwise the database cache table made by
+# `manage.py createcachetable`. The database cache counts its rows on every write, so busy sites
+# should use Redis.
+REDIS_URL = os.environ.get("REDIS_URL", "")
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "unique-snowflake",
-    }
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    } if REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "shop_shared_cache",
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("SHARED_CACHE_MAX_ENTRIES", "100000"))},
+    },
 }
 
+# Anonymous carts live only in the cache; seconds of inactivity before expiry
+GUEST_CART_TTL = int(os.environ.get("GUEST_CART_TTL", str(7 * 24 * 3600)))
+
+# Background tasks (shop.tasks): worker threads, or run inline when eager
+SHOP_TASK_WORKERS = int(os.environ.get("SHOP_TASK_WORKERS", "2"))
+SHOP_TASKS_EAGER = os.environ.get("SHOP_TASKS_EAGER", "false").lower() == "true"
+
+# Delivered/cancelled orders older than this move to the archive tables (manage.py archive_orders)
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get("ORDER_ARCHIVE_AFTER_DAYS", str(2 * 365)))
+
+# Readiness probe (/readyz, syrupstore.health): seconds between background health checks, and
+# how old the last result may get before the pod reports not ready
+READINESS_CHECK_INTERVAL = int(os.environ.get("READINESS_CHECK_INTERVAL", "10"))
+READINESS_MAX_AGE = int(os.environ.get("READINESS_MAX_AGE", str(3 * READINESS_CHECK_INTERVAL)))
+
+# Staff request profiling (syrupstore.profiling): lifetime of X-Profile-Token tokens, seconds between
+# stack samples, and the ring buffer of saved profiles (under logs/, shared by the pod's workers)
+PROFILE_TOKEN_MAX_AGE = int(os.environ.get("PROFILE_TOKEN_MAX_AGE", "3600"))
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.001"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(BASE_DIR, "logs", "profiles"))
+PROFILE_BUFFER_SIZE = int(os.environ.get("PROFILE_BUFFER_SIZE", "50"))
+
 # Logging Configuration
 LOGGING = {
     "version": 1,
@@ -8,4 +8,15 @@ DATABASES = {
     }
 }
 
-EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
\ No newline at end of file
+# Process-local stand-in for the shared cache; keeps per-test query counts free of cache I/O
+CACHES = {
+    **CACHES,
+    "shared": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shared",
+    },
+}
+
+EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+SHOP_TASKS_EAGER = True
@@ -1,13 +1,20 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from syrupstore.schema import schema
-from syrupstore.views import RateLimitedGraphQLView, health_check
-from shop.views import download_receipt
+from syrupstore.views import AsyncGraphQLView, RateLimitedGraphQLView, health_check, livez, readyz
+from shop.views import download_receipt, export_orders, order_events
+
+GraphQLViewClass = AsyncGraphQLView if settings.GRAPHQL_ASYNC else RateLimitedGraphQLView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("graphql/", RateLimitedGraphQLView.as_view(schema=schema, graphiql=True)),
+    path("graphql/", GraphQLViewClass.as_view(schema=schema, graphiql=True)),
     path("api/receipts/download/<int:order_id>/", download_receipt, name="download_receipt"),
+    path("api/admin/orders/export/", export_orders, name="export_orders"),
+    path("api/orders/events/", order_events, name="order_events"),
     path("health/", include("health_check.urls")),
     path("api/health/", health_check, name="health_check"),
+    path("livez", livez, name="livez"),
+    path("readyz", readyz, name="readyz"),
 ]
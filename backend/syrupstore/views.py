@@ -1,41 +1,251 @@
 """
 Custom views with security enhancements for the Maple Syrup Store
 """
-from graphene_django.views import GraphQLView
+import inspect
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from graphene_django.settings import graphene_settings
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.debug import DjangoDebugMiddleware
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, OperationType, execute, get_operation_ast
+from graphql.language import FieldNode
+from graphql.validation import validate
 from django_ratelimit.decorators import ratelimit
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+
+from shop.views import get_authenticated_user
+from syrupstore.health import readiness
+from syrupstore.ratelimit import combine_charges, consume, operation_charge, parse_query, request_identities
+
+
+def rate_limited_response(retry_after=None):
+    response = JsonResponse(
+        {
+            "errors": [{
+                "message": "Rate limit exceeded. Please try again later.",
+                "extensions": {
+                    "code": "RATE_LIMITED"
+                }
+            }]
+        },
+        status=429
+    )
+    if retry_after:
+        response["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
+
+def batch_rejected_response(message):
+    return JsonResponse({"errors": [{"message": message, "extensions": {"code": "BATCH_REJECTED"}}]}, status=400)
 
 
 class RateLimitedGraphQLView(GraphQLView):
     """
-    GraphQL view with rate limiting protection.
-    
-    Limits:
-    - 100 requests per minute per IP for anonymous users
-    - 300 requests per minute per user for authenticated users
+    GraphQL view with cost-weighted rate limiting (see syrupstore.ratelimit).
+
+    Each POST is charged by the root fields it selects against per-IP and
+    per-user token buckets; checkout and receipt generation also draw from
+    their own stricter buckets. Limits live in ``GRAPHQL_RATE_BUCKETS``.
+
+    A JSON array body is an Apollo batch (BatchHttpLink): the operations run
+    one after another on the same request, so they share its user lookup and
+    anything cached on the context, and their results come back as one
+    array. Batches are capped at ``GRAPHQL_BATCH_MAX_OPERATIONS`` operations
+    and ``GRAPHQL_BATCH_MAX_COST`` tokens.
+
+    In production DjangoDebugMiddleware is not installed; ``get_middleware``
+    adds it only to staff requests sent with ``X-GraphQL-Debug: 1``.
     """
-    
+
     @method_decorator(csrf_exempt)
-    @method_decorator(ratelimit(key='ip', rate='100/m', method='POST'))
-    @method_decorator(ratelimit(key='user', rate='300/m', method='POST'))
     def dispatch(self, request, *args, **kwargs):
-        # Check if request was rate limited
-        if getattr(request, 'limited', False):
-            return JsonResponse(
-                {
-                    "errors": [{
-                        "message": "Rate limit exceeded. Please try again later.",
-                        "extensions": {
-                            "code": "RATE_LIMITED"
-                        }
-                    }]
-                },
-                status=429
-            )
+        operations = self.get_batch(request)
+        if operations is not None:
+            return self.dispatch_batch(request, operations)
+
+        retry_after = self.rate_limit(request, self.request_charge(request))
+        if retry_after:
+            return rate_limited_response(retry_after)
         return super().dispatch(request, *args, **kwargs)
 
+    def get_batch(self, request):
+        """The operations of a batched POST (a JSON array body), else None."""
+        if request.method != "POST" or self.get_content_type(request) != "application/json":
+            return None
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            return None
+        return data if isinstance(data, list) else None
+
+    def dispatch_batch(self, request, operations):
+        max_operations = settings.GRAPHQL_BATCH_MAX_OPERATIONS
+        if not operations or len(operations) > max_operations or not all(isinstance(o, dict) for o in operations):
+            return batch_rejected_response(f"A batch must hold 1 to {max_operations} operations.")
+        charge = combine_charges(
+            operation_charge(operation.get("query") or "", operation.get("operationName"))
+            for operation in operations
+        )
+        if charge["graphql"] > settings.GRAPHQL_BATCH_MAX_COST:
+            return batch_rejected_response("Batch is too expensive; send its operations separately.")
+        retry_after = self.rate_limit(request, charge)
+        if retry_after:
+            return rate_limited_response(retry_after)
+
+        results = []
+        for operation in operations:
+            # A failed form mutation flags the request; do not let it leak into the next operation.
+            setattr(request, MUTATION_ERRORS_FLAG, False)
+            try:
+                result, _ = self.get_response(request, operation)
+            except HttpError as e:
+                result = self.json_encode(request, {"errors": [self.format_error(e)]})
+            results.append(result)
+        # Per-operation errors are in each result; the batch itself succeeded.
+        return HttpResponse(content=f"[{','.join(results)}]", content_type="application/json")
+
+    def get_middleware(self, request):
+        """Schema middleware, plus SQL capture for staff requests that ask for it (``GRAPHQL_DEBUG = "staff"``)."""
+        if settings.GRAPHQL_DEBUG != "staff" or request.headers.get("X-GraphQL-Debug") != "1":
+            return self.middleware
+        user = get_authenticated_user(request)
+        if user is None or not user.is_staff:
+            return self.middleware
+        return [DjangoDebugMiddleware(), *(self.middleware or ())]
+
+    def get_response(self, request, data, show_graphiql=False):
+        try:
+            return super().get_response(request, data, show_graphiql)
+        finally:
+            # DjangoDebugMiddleware only unwraps the DB cursors when _debug is resolved;
+            # otherwise the connection would keep recording into this request's context.
+            django_debug = getattr(request, "django_debug", None)
+            if django_debug is not None:
+                django_debug.disable_instrumentation()
+                del request.django_debug
+
+    def request_charge(self, request):
+        """Tokens a single-operation request costs."""
+        try:
+            data = self.parse_body(request)
+            query, _, operation_name, _ = self.get_graphql_params(request, data)
+        except HttpError:
+            # Rejected by the view before execution anyway; charge the minimum.
+            query, operation_name = None, None
+        return operation_charge(query or "", operation_name)
+
+    def rate_limit(self, request, charge):
+        """Take ``charge`` for the request; seconds to wait if over the limit, else 0."""
+        if not settings.RATELIMIT_ENABLE or request.method != "POST":
+            return 0
+        # Resolve the JWT user once here; the JWT middleware then reuses it.
+        user = get_authenticated_user(request)
+        if user is not None:
+            request.user = user
+        return consume(charge, request_identities(request, user))
+
+
+class AsyncGraphQLView(RateLimitedGraphQLView):
+    """
+    GraphQL view for ASGI deployments.
+
+    Operations whose root fields are all listed in ``async_root_fields`` are
+    executed on the event loop, so their resolvers can await slow outbound
+    I/O (pdf-service, rate table refreshes) without holding a thread. Their
+    resolvers must not touch the ORM directly on the loop. Every other
+    operation runs in a worker thread through the regular synchronous view,
+    exactly as under WSGI.
+    """
+
+    view_is_async = True
+    async_root_fields = frozenset({"generateReceipt", "shippingEstimate", "shippingEstimates", "__typename"})
+
+    @method_decorator(csrf_exempt)
+    async def dispatch(self, request, *args, **kwargs):
+        operation = self.get_async_operation(request)
+        if operation is None:
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+        retry_after = await sync_to_async(self.rate_limit)(request, self.request_charge(request))
+        if retry_after:
+            return rate_limited_response(retry_after)
+        # Resolve the JWT user up front (off the loop); resolvers then only
+        # read info.context.user.
+        request.user = await sync_to_async(get_authenticated_user)(request) or AnonymousUser()
+
+        document, variables, operation_name = operation
+        result = await self.execute_async(request, document, variables, operation_name)
+        status_code = 200
+        response = {}
+        if result.errors:
+            response["errors"] = [self.format_error(e) for e in result.errors]
+        if result.errors and any(not getattr(e, "path", None) for e in result.errors):
+            status_code = 400
+        else:
+            response["data"] = result.data
+        return HttpResponse(
+            status=status_code,
+            content=self.json_encode(request, response),
+            content_type="application/json",
+        )
+
+    def get_async_operation(self, request):
+        """``(document, variables, operation_name)`` if the request can run on the loop, else None."""
+        if request.method != "POST":
+            return None
+        try:
+            data = self.parse_body(request)
+            query, variables, operation_name, _ = self.get_graphql_params(request, data)
+        except HttpError:
+            return None
+        if not query or not isinstance(data, dict):
+            return None
+        try:
+            document = parse_query(query)
+        except Exception:
+            return None
+
+        operation = get_operation_ast(document, operation_name)
+        if operation is None or operation.operation == OperationType.SUBSCRIPTION:
+            return None
+        for selection in operation.selection_set.selections:
+            if not isinstance(selection, FieldNode) or selection.name.value not in self.async_root_fields:
+                return None
+        return document, variables, operation_name
+
+    async def execute_async(self, request, document, variables, operation_name):
+        schema = self.schema.graphql_schema
+        validation_errors = validate(
+            schema,
+            document,
+            self.validation_rules,
+            graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+
+        try:
+            result = execute(
+                schema,
+                document,
+                root_value=self.get_root_value(request),
+                context_value=self.get_context(request),
+                variable_values=variables,
+                operation_name=operation_name,
+            )
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
 
 @ratelimit(key='ip', rate='10/h', method='POST')
 def health_check(request):
@@ -43,3 +253,14 @@ def health_check(request):
     if getattr(request, 'limited', False):
         return JsonResponse({"status": "rate_limited"}, status=429)
     return JsonResponse({"status": "healthy"})
+
+
+def livez(request):
+    """Liveness probe: no database, cache or disk access"""
+    return JsonResponse({"status": "ok"})
+
+
+def readyz(request):
+    """Readiness probe: the last background health check result (syrupstore.health)"""
+    ready, body = readiness.status()
+    return JsonResponse(body, status=200 if ready else 503)
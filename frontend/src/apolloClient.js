@@ -1,4 +1,5 @@
-import { ApolloClient, InMemoryCache, HttpLink } from "@apollo/client";
+import { ApolloClient, InMemoryCache } from "@apollo/client";
+import { BatchHttpLink } from "@apollo/client/link/batch-http";
 import { setContext } from "@apollo/client/link/context";
 import { onError } from "@apollo/client/link/error";
 
@@ -34,8 +35,13 @@ function handleAuthFailure() {
   }
 }
 
-const httpLink = new HttpLink({
+// Operations issued within batchInterval ms (e.g. me, cart, products and
+// orders on page load) go out as one POST. Keep batchMax at or below the
+// backend's GRAPHQL_BATCH_MAX_OPERATIONS.
+const httpLink = new BatchHttpLink({
   uri: process.env.REACT_APP_GRAPHQL_URL || "/graphql/",
+  batchMax: Number(process.env.REACT_APP_GRAPHQL_BATCH_MAX || 10),
+  batchInterval: 10,
 });
 
 const authLink = setContext((_, { headers }) => {
@@ -7,9 +7,7 @@ const GET_CART = gql`
   query Cart {
     cart {
       id
-      items {
-        id
-      }
+      itemCount
     }
   }
 `;
@@ -27,7 +25,7 @@ export default function Navbar() {
   const { isLoggedIn, logout } = useAuth();
   const { data } = useQuery(GET_CART, { skip: !isLoggedIn, fetchPolicy: "cache-and-network" });
   const { data: meData } = useQuery(ME, { skip: !isLoggedIn });
-  const cartCount = data?.cart?.items?.length || 0;
+  const cartCount = data?.cart?.itemCount || 0;
   const isStaff = meData?.me?.isStaff;
 
   return (
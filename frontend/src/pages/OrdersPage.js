@@ -1,5 +1,5 @@
-import React, { useState } from "react";
-import { useQuery, gql } from "@apollo/client";
+import React, { useEffect, useState } from "react";
+import { useApolloClient, useLazyQuery, useQuery, gql } from "@apollo/client";
 
 const GET_ORDERS = gql`
   query Orders {
@@ -13,9 +13,98 @@ const GET_ORDERS = gql`
   }
 `;
 
+// Archived orders are final, so they are fetched on request and never streamed
+const GET_ARCHIVED_ORDERS = gql`
+  query ArchivedOrders($limit: Int, $offset: Int) {
+    archivedOrders(limit: $limit, offset: $offset) {
+      id
+      status
+      totalCents
+      createdAt
+      items { id quantity priceCents product { name } }
+    }
+  }
+`;
+
+const ARCHIVED_PAGE_SIZE = 20;
+
+const ORDER_EVENTS_TICKET = gql`
+  mutation OrderEventsTicket {
+    orderEventsTicket { ticket }
+  }
+`;
+
+// Milliseconds before reopening a closed stream with a fresh ticket
+const RECONNECT_DELAY_MS = 3000;
+
+// Apply pushed status changes to cached orders instead of re-polling the list
+function useOrderStatusEvents() {
+  const client = useApolloClient();
+
+  useEffect(() => {
+    if (!localStorage.getItem("token") || typeof EventSource === "undefined") return undefined;
+
+    let source = null;
+    let reconnectTimer = null;
+    let closed = false;
+    const applyStatus = ({ id, status }) => {
+      client.cache.modify({
+        id: client.cache.identify({ __typename: "OrderType", id: String(id) }),
+        fields: { status: () => status },
+      });
+    };
+    const reconnect = () => {
+      if (!closed) reconnectTimer = setTimeout(open, RECONNECT_DELAY_MS);
+    };
+
+    // EventSource cannot send headers and its own reconnects reuse the URL,
+    // so each connection gets a fresh short-lived ticket instead of the JWT.
+    async function open() {
+      try {
+        const { data } = await client.mutate({ mutation: ORDER_EVENTS_TICKET });
+        if (closed) return;
+        source = new EventSource(
+          `/api/orders/events/?ticket=${encodeURIComponent(data.orderEventsTicket.ticket)}`
+        );
+      } catch (e) {
+        reconnect();
+        return;
+      }
+      source.addEventListener("snapshot", (e) => JSON.parse(e.data).forEach(applyStatus));
+      source.addEventListener("status", (e) => applyStatus(JSON.parse(e.data)));
+      source.onerror = () => {
+        source.close();
+        reconnect();
+      };
+    }
+
+    open();
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      if (source) source.close();
+    };
+  }, [client]);
+}
+
 export default function OrdersPage() {
   const { loading, error, data } = useQuery(GET_ORDERS, { fetchPolicy: "network-only" });
   const [downloadStatus, setDownloadStatus] = useState({});
+  const [archivedOrders, setArchivedOrders] = useState([]);
+  const [archiveExhausted, setArchiveExhausted] = useState(false);
+  const [fetchArchived, { loading: archivedLoading }] = useLazyQuery(GET_ARCHIVED_ORDERS, {
+    fetchPolicy: "network-only",
+  });
+  useOrderStatusEvents();
+
+  const loadOlderOrders = async () => {
+    const { data: page } = await fetchArchived({
+      variables: { limit: ARCHIVED_PAGE_SIZE, offset: archivedOrders.length },
+    });
+    const more = page?.archivedOrders || [];
+    setArchivedOrders(prev => [...prev, ...more]);
+    if (more.length < ARCHIVED_PAGE_SIZE) setArchiveExhausted(true);
+  };
 
   const handleDownloadReceipt = async (orderId) => {
     console.log("Download clicked for order:", orderId);
@@ -81,15 +170,14 @@ export default function OrdersPage() {
   if (loading) return <p>Loading orders...</p>;
   if (error) return <p>Error: {error.message}</p>;
 
-  if (!data?.orders || data.orders.length === 0) {
-    return <p>You have no orders yet.</p>;
-  }
+  const orders = [...(data?.orders || []), ...archivedOrders];
 
   return (
     <div>
       <h2>Your Orders</h2>
+      {orders.length === 0 && <p>You have no recent orders.</p>}
       <div className="grid">
-        {data.orders.map((order) => (
+        {orders.map((order) => (
           <div key={order.id} className="card">
             <div className="row space-between">
               <strong>Order #{order.id}</strong>
@@ -130,6 +218,11 @@ export default function OrdersPage() {
           </div>
         ))}
       </div>
+      {!archiveExhausted && (
+        <button onClick={loadOlderOrders} disabled={archivedLoading} style={{ marginTop: "15px" }}>
+          {archivedLoading ? "Loading..." : "Show older orders"}
+        </button>
+      )}
     </div>
   );
 }
@@ -1,4 +1,6 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from io import BytesIO
 from pydantic import BaseModel
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -6,13 +8,16 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
-import os
+import re
+
+from storage import ReceiptNotFound, storage_from_env
 
 app = FastAPI(title="PDF Receipt Service")
 
-# Directory to store PDFs
-PDF_STORAGE_DIR = os.getenv("PDF_STORAGE_DIR", "/tmp/receipts")
-os.makedirs(PDF_STORAGE_DIR, exist_ok=True)
+# Where receipts live: PDF_STORAGE_DIR locally, or an S3-compatible bucket
+storage = storage_from_env()
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
 
 
 class OrderItem(BaseModel):
@@ -33,7 +38,32 @@ class ReceiptRequest(BaseModel):
     shipping_country: str = ""
 
 
-def generate_pdf_receipt(order_data: ReceiptRequest, pdf_path: str) -> None:
+def receipt_filename(order_id: int) -> str:
+    return f"receipt-order-{order_id}.pdf"
+
+
+def parse_range(header: str, size: int):
+    """(start, end) for a single-range ``Range`` header, None to send everything; raises ValueError if unsatisfiable"""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def generate_pdf_receipt(order_data: ReceiptRequest, pdf_path) -> None:
     """Generate PDF receipt using ReportLab"""
     doc = SimpleDocTemplate(pdf_path, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
     
@@ -135,19 +165,20 @@ def generate_pdf_receipt(order_data: ReceiptRequest, pdf_path: str) -> None:
     doc.build(story)
 
 
+# Plain ``def`` endpoints: rendering and storage I/O block, so FastAPI runs
+# them in its threadpool instead of on the event loop.
 @app.post("/generate-receipt")
-async def generate_receipt(order_data: ReceiptRequest):
+def generate_receipt(order_data: ReceiptRequest):
     """Generate a PDF receipt for an order"""
     try:
-        pdf_filename = f"receipt-order-{order_data.order_id}.pdf"
-        pdf_path = os.path.join(PDF_STORAGE_DIR, pdf_filename)
-
-        generate_pdf_receipt(order_data, pdf_path)
+        pdf_filename = receipt_filename(order_data.order_id)
+        buffer = BytesIO()
+        generate_pdf_receipt(order_data, buffer)
+        storage.save(pdf_filename, buffer.getvalue())
 
         return {
             "success": True,
             "filename": pdf_filename,
-            "path": pdf_path,
             "order_id": order_data.order_id,
         }
     except Exception as e:
@@ -155,15 +186,47 @@ async def generate_receipt(order_data: ReceiptRequest):
 
 
 @app.get("/receipt/{order_id}")
-async def get_receipt(order_id: int):
-    """Get a previously generated receipt"""
-    pdf_filename = f"receipt-order-{order_id}.pdf"
-    pdf_path = os.path.join(PDF_STORAGE_DIR, pdf_filename)
+def get_receipt(order_id: int):
+    """Get a previously generated receipt's metadata"""
+    pdf_filename = receipt_filename(order_id)
+    try:
+        size = storage.size(pdf_filename)
+    except ReceiptNotFound:
+        raise HTTPException(status_code=404, detail="Receipt not found")
 
-    if not os.path.exists(pdf_path):
+    return {"filename": pdf_filename, "size": size, "url": f"/receipt/{order_id}/pdf"}
+
+
+@app.get("/receipt/{order_id}/pdf")
+def download_receipt(order_id: int, request: Request):
+    """Stream a stored receipt, honouring a single byte ``Range``"""
+    pdf_filename = receipt_filename(order_id)
+    try:
+        size = storage.size(pdf_filename)
+    except ReceiptNotFound:
         raise HTTPException(status_code=404, detail="Receipt not found")
 
-    return {"filename": pdf_filename, "path": pdf_path}
+    headers = {"Accept-Ranges": "bytes"}
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    # An empty object has no byte range to read (S3 rejects "bytes=0--1")
+    body = storage.iter_range(pdf_filename, start, end) if size else iter(())
+    return StreamingResponse(
+        body,
+        status_code=status_code,
+        media_type="application/pdf",
+        headers=headers,
+    )
 
 
 @app.get("/health")
@@ -0,0 +1,116 @@
+"""Receipt storage backends: local filesystem or an S3-compatible bucket"""
+import os
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ReceiptNotFound(Exception):
+    pass
+
+
+class LocalStorage:
+    """Receipts as files under ``root`` (pod-local unless ``root`` is a mounted volume)"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def save(self, name, data):
+        # Write then rename so readers never see a half-written receipt.
+        tmp_path = self._path(f".{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(name))
+
+    def size(self, name):
+        try:
+            return os.path.getsize(self._path(name))
+        except FileNotFoundError:
+            raise ReceiptNotFound(name)
+
+    def iter_range(self, name, start, end):
+        """Yield bytes ``start``..``end`` (inclusive) of the receipt in chunks"""
+        try:
+            f = open(self._path(name), "rb")
+        except FileNotFoundError:
+            raise ReceiptNotFound(name)
+        with f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class S3Storage:
+    """
+    Receipts as objects in an S3-compatible bucket.
+
+    ``endpoint_url`` points at any S3 API (MinIO, LocalStack, Ceph) for
+    local runs; leave it unset for AWS.
+    """
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, client=None):
+        if client is None:
+            import boto3
+
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, name):
+        return f"{self.prefix}{name}"
+
+    def _missing(self, error):
+        code = error.response.get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def save(self, name, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(name), Body=data, ContentType="application/pdf")
+
+    def size(self, name):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(name))["ContentLength"]
+        except ClientError as e:
+            if self._missing(e):
+                raise ReceiptNotFound(name)
+            raise
+
+    def iter_range(self, name, start, end):
+        """Yield bytes ``start``..``end`` (inclusive) of the receipt in chunks"""
+        from botocore.exceptions import ClientError
+
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._key(name), Range=f"bytes={start}-{end}")
+        except ClientError as e:
+            if self._missing(e):
+                raise ReceiptNotFound(name)
+            raise
+        body = obj["Body"]
+        try:
+            yield from body.iter_chunks(CHUNK_SIZE)
+        finally:
+            body.close()
+
+
+def storage_from_env():
+    """Build the backend selected by ``RECEIPT_STORAGE`` (``local`` or ``s3``)"""
+    backend = os.getenv("RECEIPT_STORAGE", "local").lower()
+    if backend == "s3":
+        return S3Storage(
+            bucket=os.environ["RECEIPT_S3_BUCKET"],
+            prefix=os.getenv("RECEIPT_S3_PREFIX", "receipts/"),
+            endpoint_url=os.getenv("RECEIPT_S3_ENDPOINT_URL") or None,
+        )
+    if backend != "local":
+        raise ValueError(f"Unknown RECEIPT_STORAGE: {backend}")
+    return LocalStorage(os.getenv("PDF_STORAGE_DIR", "/tmp/receipts"))
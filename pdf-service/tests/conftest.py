@@ -0,0 +1,70 @@
+"""
+Shared fixtures for the pdf-service tests
+"""
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as pdf_app
+from storage import LocalStorage, S3Storage
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client calls S3Storage makes"""
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+
+    def _get(self, operation, Bucket, Key):
+        from botocore.exceptions import ClientError
+
+        self.calls.append((operation, Bucket, Key))
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey" if operation == "GetObject" else "404"}}, operation)
+        return self.objects[(Bucket, Key)]
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.calls.append(("PutObject", Bucket, Key))
+        self.objects[(Bucket, Key)] = bytes(Body)
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self._get("HeadObject", Bucket, Key))}
+
+    def get_object(self, Bucket, Key, Range):
+        from botocore.response import StreamingBody
+
+        data = self._get("GetObject", Bucket, Key)
+        start, end = (int(n) for n in Range[len("bytes="):].split("-"))
+        chunk = data[start:end + 1]
+        return {"Body": StreamingBody(io.BytesIO(chunk), len(chunk)), "ContentRange": f"bytes {start}-{end}/{len(data)}"}
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    return LocalStorage(str(tmp_path / "receipts"))
+
+
+@pytest.fixture
+def s3_client():
+    pytest.importorskip("botocore")
+    return FakeS3Client()
+
+
+@pytest.fixture
+def s3_storage(s3_client):
+    return S3Storage(bucket="receipts", prefix="receipts/", client=s3_client)
+
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request):
+    """Each storage backend in turn"""
+    return request.getfixturevalue(f"{request.param}_storage")
+
+
+@pytest.fixture
+def client(storage, monkeypatch):
+    """The app serving receipts from ``storage``"""
+    monkeypatch.setattr(pdf_app, "storage", storage)
+    return TestClient(pdf_app.app)
@@ -0,0 +1,145 @@
+"""
+Tests for the receipt endpoints and Range handling
+"""
+import pytest
+
+from app import parse_range, receipt_filename
+
+DATA = bytes(range(256)) * 300
+
+
+@pytest.fixture
+def stored(storage):
+    """A receipt for order 1 holding DATA"""
+    storage.save(receipt_filename(1), DATA)
+    return DATA
+
+
+@pytest.mark.unit
+class TestParseRange:
+    @pytest.mark.parametrize("header, expected", [
+        (None, None),
+        ("", None),
+        ("bytes=-", None),
+        ("items=0-10", None),
+        ("bytes=0-10,20-30", None),
+        ("bytes=0-9", (0, 9)),
+        ("bytes=10-", (10, 99)),
+        ("bytes=90-500", (90, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=-500", (0, 99)),
+    ])
+    def test_satisfiable(self, header, expected):
+        """Test ranges resolve to inclusive offsets, or None for the whole file"""
+        assert parse_range(header, 100) == expected
+
+    @pytest.mark.parametrize("header, size", [
+        ("bytes=100-", 100),
+        ("bytes=50-10", 100),
+        ("bytes=-0", 100),
+        ("bytes=0-", 0),
+        ("bytes=-10", 0),
+    ])
+    def test_unsatisfiable(self, header, size):
+        """Test ranges outside the file raise ValueError"""
+        with pytest.raises(ValueError):
+            parse_range(header, size)
+
+
+@pytest.mark.integration
+class TestDownloadReceipt:
+    def test_full(self, client, stored):
+        """Test a plain GET returns the whole receipt with 200"""
+        response = client.get("/receipt/1/pdf")
+        assert response.status_code == 200
+        assert response.content == stored
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-length"] == str(len(stored))
+        assert response.headers["content-type"] == "application/pdf"
+        assert "content-range" not in response.headers
+
+    def test_partial(self, client, stored):
+        """Test a byte range returns 206 with just that slice"""
+        response = client.get("/receipt/1/pdf", headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.content == stored[100:200]
+        assert response.headers["content-range"] == f"bytes 100-199/{len(stored)}"
+        assert response.headers["content-length"] == "100"
+
+    def test_open_ended(self, client, stored):
+        """Test ``bytes=N-`` returns the rest of the receipt"""
+        response = client.get("/receipt/1/pdf", headers={"Range": "bytes=70000-"})
+        assert response.status_code == 206
+        assert response.content == stored[70000:]
+
+    def test_suffix(self, client, stored):
+        """Test ``bytes=-N`` returns the final N bytes"""
+        response = client.get("/receipt/1/pdf", headers={"Range": "bytes=-500"})
+        assert response.status_code == 206
+        assert response.content == stored[-500:]
+        assert response.headers["content-range"] == f"bytes {len(stored) - 500}-{len(stored) - 1}/{len(stored)}"
+
+    def test_suffix_longer_than_receipt(self, client, stored):
+        """Test a suffix past the start is clamped to the whole receipt"""
+        response = client.get("/receipt/1/pdf", headers={"Range": f"bytes=-{len(stored) * 2}"})
+        assert response.status_code == 206
+        assert response.content == stored
+
+    def test_unsatisfiable(self, client, stored):
+        """Test a range past the end returns 416 with the receipt size"""
+        response = client.get("/receipt/1/pdf", headers={"Range": f"bytes={len(stored)}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(stored)}"
+        assert response.content == b""
+
+    def test_malformed_range_ignored(self, client, stored):
+        """Test a Range header we don't understand falls back to the whole receipt"""
+        response = client.get("/receipt/1/pdf", headers={"Range": "bytes=0-1,5-6"})
+        assert response.status_code == 200
+        assert response.content == stored
+
+    def test_empty_receipt(self, client, storage):
+        """Test an empty object downloads as an empty 200"""
+        storage.save(receipt_filename(1), b"")
+        response = client.get("/receipt/1/pdf")
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["content-length"] == "0"
+
+    @pytest.mark.parametrize("header", ["bytes=0-", "bytes=-10"])
+    def test_empty_receipt_range(self, client, storage, header):
+        """Test no range of an empty object is satisfiable"""
+        storage.save(receipt_filename(1), b"")
+        response = client.get("/receipt/1/pdf", headers={"Range": header})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */0"
+
+    def test_missing(self, client):
+        """Test an unknown receipt is a 404"""
+        assert client.get("/receipt/404/pdf").status_code == 404
+
+
+@pytest.mark.integration
+class TestGenerateReceipt:
+    def test_round_trip(self, client):
+        """Test a generated receipt is stored and served back as a PDF"""
+        response = client.post("/generate-receipt", json={
+            "order_id": 7,
+            "user_email": "buyer@example.com",
+            "total_cents": 2500,
+            "shipping_cents": 500,
+            "created_at": "2026-01-01",
+            "items": [{"name": "Amber Syrup", "quantity": 2, "price_cents": 1000}],
+        })
+        assert response.status_code == 200
+        assert response.json()["filename"] == "receipt-order-7.pdf"
+
+        meta = client.get("/receipt/7").json()
+        assert meta["url"] == "/receipt/7/pdf"
+        pdf = client.get(meta["url"])
+        assert pdf.content.startswith(b"%PDF")
+        assert len(pdf.content) == meta["size"]
+
+    def test_metadata_missing(self, client):
+        """Test metadata for an unknown receipt is a 404"""
+        assert client.get("/receipt/404").status_code == 404
@@ -0,0 +1,98 @@
+"""
+Tests for the receipt storage backends
+"""
+import os
+
+import pytest
+
+from storage import LocalStorage, ReceiptNotFound, S3Storage, storage_from_env
+
+DATA = bytes(range(256)) * 300  # spans several CHUNK_SIZE chunks
+
+
+@pytest.mark.unit
+class TestStorageBackends:
+    """Behaviour both backends share"""
+
+    def test_round_trip(self, storage):
+        """Test a saved receipt reports its size and reads back whole"""
+        storage.save("receipt-order-1.pdf", DATA)
+        assert storage.size("receipt-order-1.pdf") == len(DATA)
+        assert b"".join(storage.iter_range("receipt-order-1.pdf", 0, len(DATA) - 1)) == DATA
+
+    def test_range(self, storage):
+        """Test a byte range yields exactly the inclusive slice"""
+        storage.save("receipt-order-1.pdf", DATA)
+        assert b"".join(storage.iter_range("receipt-order-1.pdf", 100, 70000)) == DATA[100:70001]
+
+    def test_overwrite(self, storage):
+        """Test saving again replaces the receipt"""
+        storage.save("receipt-order-1.pdf", DATA)
+        storage.save("receipt-order-1.pdf", b"%PDF-new")
+        assert storage.size("receipt-order-1.pdf") == 8
+
+    def test_missing(self, storage):
+        """Test unknown receipts raise ReceiptNotFound"""
+        with pytest.raises(ReceiptNotFound):
+            storage.size("receipt-order-404.pdf")
+        with pytest.raises(ReceiptNotFound):
+            list(storage.iter_range("receipt-order-404.pdf", 0, 10))
+
+
+@pytest.mark.unit
+class TestLocalStorage:
+    def test_no_temp_files_left(self, local_storage):
+        """Test the write-then-rename leaves only the receipt behind"""
+        local_storage.save("receipt-order-1.pdf", DATA)
+        assert os.listdir(local_storage.root) == ["receipt-order-1.pdf"]
+
+
+@pytest.mark.unit
+class TestS3Storage:
+    def test_keys_are_prefixed(self, s3_storage, s3_client):
+        """Test objects are written under the configured prefix and bucket"""
+        s3_storage.save("receipt-order-1.pdf", DATA)
+        assert ("receipts", "receipts/receipt-order-1.pdf") in s3_client.objects
+
+    def test_ranged_get(self, s3_storage, s3_client):
+        """Test reads ask S3 for just the requested range"""
+        s3_storage.save("receipt-order-1.pdf", DATA)
+        list(s3_storage.iter_range("receipt-order-1.pdf", 5, 9))
+        assert s3_client.calls[-1] == ("GetObject", "receipts", "receipts/receipt-order-1.pdf")
+
+    def test_other_errors_propagate(self, s3_storage, s3_client, monkeypatch):
+        """Test errors other than a missing key are not mistaken for 404s"""
+        from botocore.exceptions import ClientError
+
+        def denied(**kwargs):
+            raise ClientError({"Error": {"Code": "AccessDenied"}}, "HeadObject")
+
+        monkeypatch.setattr(s3_client, "head_object", denied)
+        with pytest.raises(ClientError):
+            s3_storage.size("receipt-order-1.pdf")
+
+
+@pytest.mark.unit
+class TestStorageFromEnv:
+    def test_local_by_default(self, monkeypatch, tmp_path):
+        monkeypatch.delenv("RECEIPT_STORAGE", raising=False)
+        monkeypatch.setenv("PDF_STORAGE_DIR", str(tmp_path))
+        storage = storage_from_env()
+        assert isinstance(storage, LocalStorage) and storage.root == str(tmp_path)
+
+    def test_s3(self, monkeypatch):
+        pytest.importorskip("boto3")
+        monkeypatch.setenv("RECEIPT_STORAGE", "s3")
+        monkeypatch.setenv("RECEIPT_S3_BUCKET", "receipts")
+        monkeypatch.setenv("RECEIPT_S3_ENDPOINT_URL", "http://minio:9000")
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        storage = storage_from_env()
+        assert isinstance(storage, S3Storage)
+        assert storage.prefix == "receipts/"
+        assert storage.client.meta.endpoint_url == "http://minio:9000"
+        assert storage.client.meta.service_model.service_name == "s3"
+
+    def test_unknown_backend(self, monkeypatch):
+        monkeypatch.setenv("RECEIPT_STORAGE", "ftp")
+        with pytest.raises(ValueError, match="ftp"):
+            storage_from_env()